@@ -0,0 +1,49 @@
+"""llm usage
+
+Revision ID: cb7d520237e6
+Revises: e601117d846b
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cb7d520237e6'
+down_revision: Union[str, Sequence[str], None] = 'e601117d846b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_usage',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.Column('function_name', sa.String(), nullable=False),
+    sa.Column('client_name', sa.String(), nullable=True),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('input_tokens', sa.Integer(), nullable=False),
+    sa.Column('output_tokens', sa.Integer(), nullable=False),
+    sa.Column('latency_ms', sa.Float(), nullable=False),
+    sa.Column('retries', sa.Integer(), nullable=False),
+    sa.Column('success', sa.Boolean(), nullable=False),
+    sa.Column('cost_usd', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.CheckConstraint('input_tokens >= 0 AND output_tokens >= 0', name='chk_llm_usage_positive_tokens'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_llm_usage_created_at', 'llm_usage', ['created_at'], unique=False)
+    op.create_index('idx_llm_usage_user_created', 'llm_usage', ['user_id', 'created_at'], unique=False)
+    op.create_index('idx_llm_usage_function_created', 'llm_usage', ['function_name', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_llm_usage_function_created', table_name='llm_usage')
+    op.drop_index('idx_llm_usage_user_created', table_name='llm_usage')
+    op.drop_index('idx_llm_usage_created_at', table_name='llm_usage')
+    op.drop_table('llm_usage')
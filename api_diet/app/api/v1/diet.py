@@ -1,10 +1,10 @@
 """Diet API endpoints"""
 
-from fastapi import APIRouter, Depends, Path
+from fastapi import APIRouter, Depends, Header, Path
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Annotated, List, Optional
 
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, get_read_db, resolve_user_id
 from app.database import get_db
 from app.services import DietService
 from app.schemas import DietSummary, DietaConLista
@@ -20,11 +20,10 @@ router = APIRouter(prefix="/diet", tags=["diet"])
     summary="List all weekly diets for the current user",
 )
 def list_user_diets(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    user_id: str = Depends(resolve_user_id),
 ):
     """Get all diets for the current user"""
-    user_id = current_user["id"]
     diet_service = DietService(db)
     return diet_service.get_user_diets(user_id)
 
@@ -35,11 +34,10 @@ def list_user_diets(
     summary="Retrieve the weekly diet plan + grocery list for the current week",
 )
 def get_current_week_diet(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    user_id: str = Depends(resolve_user_id),
 ):
     """Get the diet plan for the current week. Returns null if no diet exists for this week."""
-    user_id = current_user["id"]
     diet_service = DietService(db)
     return diet_service.get_current_week_diet(user_id)
 
@@ -50,13 +48,19 @@ def get_current_week_diet(
     summary="Generate, save, and return a weekly diet plan + grocery list based on the user's saved settings",
 )
 async def create_diet(
+    idempotency_key: Annotated[Optional[str], Header(max_length=255)] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """Create a new weekly diet plan with grocery list"""
+    """
+    Create a new weekly diet plan with grocery list.
+
+    Concurrent requests share one generation; a retry carrying the same
+    ``Idempotency-Key`` header returns the stored result.
+    """
     user_id = current_user["id"]
     diet_service = DietService(db)
-    return await diet_service.create_diet(user_id)
+    return await diet_service.create_diet_once(user_id, idempotency_key)
 
 
 @router.get(
@@ -66,11 +70,10 @@ async def create_diet(
 )
 def get_diet_by_id(
     diet_id: str = Path(..., description="The UUID of the weekly diet"),
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    user_id: str = Depends(resolve_user_id),
 ):
     """Get a specific diet by ID"""
-    user_id = current_user["id"]
     diet_service = DietService(db)
     return diet_service.get_diet_by_id(diet_id, user_id)
 
@@ -82,10 +85,9 @@ def get_diet_by_id(
 )
 def get_diet_grocery_list(
     diet_id: str = Path(..., description="The UUID of the weekly diet"),
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    user_id: str = Depends(resolve_user_id),
 ):
     """Get grocery list with ingredients, quantities, and units for a specific diet"""
-    user_id = current_user["id"]
     diet_service = DietService(db)
     return diet_service.get_grocery_list_by_diet_id(diet_id, user_id)
\ No newline at end of file
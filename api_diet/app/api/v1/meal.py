@@ -3,8 +3,7 @@
 from fastapi import APIRouter, Depends, Path
 from sqlalchemy.orm import Session
 
-from app.dependencies import get_current_user
-from app.database import get_db
+from app.dependencies import get_read_db, resolve_user_id
 from app.services import MealService
 from app.schemas import RecipeResponse
 from baml_client.types import Pasto as PastoSchema
@@ -19,11 +18,10 @@ router = APIRouter(prefix="/meals", tags=["meals"])
 )
 def get_meal_details(
     meal_id: str = Path(..., description="The UUID of the meal"),
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    user_id: str = Depends(resolve_user_id),
 ):
     """Get detailed information about a specific meal"""
-    user_id = current_user["id"]
     meal_service = MealService(db)
     return meal_service.get_meal_details(meal_id, user_id)
 
@@ -35,11 +33,10 @@ def get_meal_details(
 )
 async def get_meal_recipe(
     meal_id: str = Path(..., description="UUID of the meal"),
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    user_id: str = Depends(resolve_user_id),
 ):
     """Generate a full recipe for the specified meal"""
-    user_id = current_user["id"]
     meal_service = MealService(db)
     recipe = await meal_service.get_meal_recipe(meal_id, user_id)
     return RecipeResponse(recipe=recipe)
\ No newline at end of file
@@ -1,7 +1,7 @@
 """API v1 router - aggregates all API endpoints"""
 
 from fastapi import APIRouter
-from app.api.v1 import settings, diet, meal
+from app.api.v1 import settings, diet, meal, usage
 
 # Create the main API router
 api_router = APIRouter()
@@ -10,3 +10,4 @@ api_router = APIRouter()
 api_router.include_router(settings.router)
 api_router.include_router(diet.router)
 api_router.include_router(meal.router)
+api_router.include_router(usage.router)
@@ -3,7 +3,7 @@
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, get_read_db, resolve_user_id
 from app.database import get_db
 from app.services import UserService
 from app.schemas import UserSettingsIn, UserSettingsOut
@@ -17,11 +17,10 @@ router = APIRouter(prefix="/settings", tags=["settings"])
     status_code=status.HTTP_200_OK,
 )
 def get_user_settings(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    user_id: str = Depends(resolve_user_id),
 ):
     """Retrieve the current user's settings (404 if none exist)"""
-    user_id = current_user["id"]
     user_service = UserService(db)
     return user_service.get_user_settings(user_id)
 
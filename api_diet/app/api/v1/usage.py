@@ -0,0 +1,27 @@
+"""LLM usage API endpoints"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.dependencies import get_read_db, resolve_user_id
+from app.services import UsageService
+from app.schemas import LLMUsageSummary, UsageGroupBy
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+
+@router.get(
+    "/summary",
+    response_model=List[LLMUsageSummary],
+    summary="Aggregate the current user's LLM token usage, cost and latency per function or day",
+)
+def get_usage_summary(
+    group_by: UsageGroupBy = Query("function", description="Aggregation dimension"),
+    days: int = Query(30, ge=1, le=365, description="Look-back window in days"),
+    db: Session = Depends(get_read_db),
+    user_id: str = Depends(resolve_user_id),
+):
+    """Get the current user's aggregated LLM usage. Records are flushed in batches, so the last few seconds may be missing."""
+    usage_service = UsageService(db)
+    return usage_service.get_summary(user_id, group_by, days)
@@ -2,7 +2,7 @@
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -36,6 +36,33 @@ class Settings(BaseSettings):
     database_pool_pre_ping: bool = Field(default=True)
     database_echo: bool = Field(default=False)
     database_pool_reset_on_return: str = Field(default="rollback")
+    database_driver: str = Field(default="psycopg2")  # psycopg2 or psycopg (psycopg 3, pipelines the diet inserts)
+
+    # Transaction-mode pooler (PgBouncer) between the API and Postgres
+    database_transaction_pooler: bool = Field(default=False)  # No prepared statements or session state
+    database_pooler_pool_size: int = Field(default=0)  # Connections per worker to the pooler, without overflow; 0 = NullPool
+
+    # Pool and threadpool autotuner (recommends only, unless POOL_AUTOTUNE_APPLY is set)
+    pool_autotune_enabled: bool = Field(default=False)
+    pool_autotune_apply: bool = Field(default=False)  # Resize the pool and threadpool to the recommendation
+    pool_autotune_interval: float = Field(default=1.0)  # Seconds between samples
+    pool_autotune_window: int = Field(default=300)  # Samples a recommendation is based on
+    pool_autotune_min_pool_size: int = Field(default=2)
+    pool_autotune_min_checkouts: int = Field(default=300)  # Checkouts per window below which nothing is recommended
+    pool_autotune_max_connections: int = Field(default=30)  # Upper bound of pool_size + max_overflow per worker
+    pool_autotune_min_threads: int = Field(default=20)
+    pool_autotune_max_threads: int = Field(default=100)
+
+    # Read replicas for GET endpoints (comma-separated URLs; empty = everything on the primary)
+    database_replica_urls: str = Field(default="")
+    database_read_your_writes_window: float = Field(default=5.0)  # Seconds a user's reads stay on the primary after a write
+    database_replica_retry_interval: float = Field(default=30.0)  # Seconds a failed replica is skipped
+
+    @property
+    def database_replica_urls_list(self) -> List[str]:
+        """Get replica database URLs as a list"""
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
     cache_ttl_default: int = Field(default=300)
     cache_ttl_users: int = Field(default=600)
     cache_ttl_leagues: int = Field(default=1800)
@@ -62,6 +89,38 @@ class Settings(BaseSettings):
     rate_limit_requests: int = Field(default=100)
     rate_limit_window: int = Field(default=60)
     
+    # Request deadlines ("METHOD /template=seconds"); these routes are also cancelled on client disconnect
+    request_deadline_routes: str = Field(
+        default="POST /api/v1/diet/create_diet=240,GET /api/v1/meals/{meal_id}/recipe=120"
+    )
+    request_max_deadline: float = Field(default=300.0)  # Upper bound for the X-Request-Timeout header
+    cancel_on_disconnect: bool = Field(default=True)
+
+    @property
+    def request_deadline_routes_map(self) -> Dict[str, float]:
+        """Get per-route deadlines as a {"METHOD /template": seconds} mapping"""
+        deadlines = {}
+        for entry in self.request_deadline_routes.split(","):
+            route, _, seconds = entry.rpartition("=")
+            if route.strip() and seconds.strip():
+                deadlines[route.strip()] = float(seconds)
+        return deadlines
+
+    # Load shedding (503 + Retry-After for low-priority work under overload)
+    enable_load_shedding: bool = Field(default=True)
+    load_shedding_low_priority_routes: str = Field(
+        default="POST /api/v1/diet/create_diet,GET /api/v1/meals/{meal_id}/recipe"
+    )
+    load_shedding_max_pool_wait: float = Field(default=0.5)  # Seconds (smoothed) waiting for a pooled connection
+    load_shedding_max_loop_lag: float = Field(default=0.2)  # Seconds (smoothed) of event-loop lag
+    load_shedding_max_llm_in_flight: int = Field(default=20)  # Concurrent BAML calls per worker
+    load_shedding_retry_after: int = Field(default=5)  # Seconds suggested to shed clients
+
+    @property
+    def load_shedding_low_priority_routes_list(self) -> List[str]:
+        """Get low-priority routes ("METHOD /template") as a list"""
+        return [route.strip() for route in self.load_shedding_low_priority_routes.split(",") if route.strip()]
+    
     # Logging
     log_level: str = Field(default="INFO")
     log_format: str = Field(default="json")
@@ -69,7 +128,79 @@ class Settings(BaseSettings):
     # Monitoring
     enable_metrics: bool = Field(default=True)
     metrics_path: str = Field(default="/metrics")
+    db_query_budget: int = Field(default=50)  # Warn when a request runs more SQL statements than this
+    db_repeated_query_threshold: int = Field(default=10)  # Warn when one statement fingerprint repeats this often (N+1)
+    event_loop_monitor_interval: float = Field(default=0.1)  # Seconds between event-loop lag probes
+    event_loop_block_threshold: float = Field(default=0.25)  # Lag counted as blocking (stack captured in debug)
+    system_sample_interval: float = Field(default=5.0)  # Seconds between snapshots served by /health/deep and /fly/system
+
+    # Tracing (OTLP/JSON spans, written to a file unless a collector endpoint is set)
+    enable_tracing: bool = Field(default=False)
+    tracing_service_name: str = Field(default="diet-generator-api")
+    tracing_file_path: str = Field(default="traces.jsonl")
+    tracing_otlp_endpoint: Optional[str] = Field(default=None)  # e.g. http://localhost:4318/v1/traces
+    tracing_export_interval: float = Field(default=5.0)
+    tracing_max_queue_size: int = Field(default=10000)  # Spans beyond this are dropped
+
+    # On-demand profiling of requests sent with an X-Profile header (ignored in production)
+    enable_profiling: bool = Field(default=False)
+    profiling_dir: str = Field(default="profiles")
+    profiling_interval: float = Field(default=0.005)  # Seconds between stack samples
     
+    # LLM usage ledger
+    llm_usage_flush_interval: float = Field(default=5.0)  # Seconds between batched inserts
+    llm_usage_batch_size: int = Field(default=200)  # Flush early once this many records are buffered
+    llm_usage_max_buffer: int = Field(default=10000)  # Oldest records are dropped beyond this
+    llm_input_cost_per_million: float = Field(default=0.15)  # USD per 1M prompt tokens
+    llm_output_cost_per_million: float = Field(default=0.60)  # USD per 1M completion tokens
+
+    # Idempotency-Key support for diet generation
+    idempotency_key_ttl: int = Field(default=86400)  # Seconds a stored result is replayed
+
+    # OpenAI-compatible endpoint of the BAML clients (e.g. the mock_llm server for load tests)
+    openai_base_url: str = Field(default="https://api.openai.com/v1")
+
+    # Record/replay of BAML calls for development and benchmarks: off, record or replay
+    llm_replay_mode: str = Field(default="off")
+    llm_replay_dir: str = Field(default="llm_recordings")
+    llm_replay_latency_scale: float = Field(default=0.0)  # Replay delay as a fraction of the recorded latency
+
+    # Hedged BAML calls: a duplicate starts once a call outlives its observed latency quantile
+    enable_llm_hedging: bool = Field(default=False)  # Opt-in: hedges add up to llm_hedge_max_rate extra LLM spend
+    llm_hedge_quantile: float = Field(default=0.95)
+    llm_hedge_min_samples: int = Field(default=20)  # Successful calls observed before a function is hedged
+    llm_hedge_max_rate: float = Field(default=0.1)  # Long-run hedges per call
+    llm_hedge_clients: str = Field(
+        default="GeneraDietaSettimanale=DietModelNoRetry,GeneraListaSpesa=ReceipeModelNoRetry,GeneraRicetta=ReceipeModelNoRetry"
+    )
+
+    @property
+    def llm_hedge_clients_map(self) -> Dict[str, str]:
+        """Get the BAML client used for hedges as a {function: client} mapping"""
+        clients = {}
+        for entry in self.llm_hedge_clients.split(","):
+            function, _, client = entry.partition("=")
+            if function.strip() and client.strip():
+                clients[function.strip()] = client.strip()
+        return clients
+
+    # Circuit breaker per BAML client and retry budget shared by all calls
+    llm_circuit_failure_threshold: int = Field(default=5)  # Consecutive upstream failures that open a circuit
+    llm_circuit_reset_timeout: float = Field(default=30.0)  # Seconds open before a half-open probe
+    llm_retry_budget_ratio: float = Field(default=0.1)  # Retries earned per successful call
+    llm_retry_budget_burst: float = Field(default=10.0)
+    llm_no_retry_clients: str = Field(default="DietModel=DietModelNoRetry,ReceipeModel=ReceipeModelNoRetry")
+
+    @property
+    def llm_no_retry_clients_map(self) -> Dict[str, str]:
+        """Get the no-retry variant of each BAML client as a {client: variant} mapping"""
+        clients = {}
+        for entry in self.llm_no_retry_clients.split(","):
+            client, _, variant = entry.partition("=")
+            if client.strip() and variant.strip():
+                clients[client.strip()] = variant.strip()
+        return clients
+
     # Performance
     connection_timeout: int = Field(default=10)
     read_timeout: int = Field(default=30)
@@ -98,6 +229,11 @@ class Settings(BaseSettings):
         """Check if running in production or staging mode"""
         return self.environment in ("production", "staging")
 
+    @property
+    def profiling_enabled(self) -> bool:
+        """Check if request profiling is on; never in production, where profiles would be public"""
+        return self.enable_profiling and not self.is_production
+
 
 # Create global settings instance
 settings = Settings()
\ No newline at end of file
@@ -2,8 +2,10 @@
 Synchronous database management for FastAPI with local PostgreSQL.
 
 This module provides:
-- Synchronous SQLAlchemy engine with psycopg2 driver
-- Connection pooling for local PostgreSQL
+- Synchronous SQLAlchemy engine with the psycopg2 or psycopg 3 driver
+- Pipelined statements on psycopg 3, for write-heavy transactions
+- Connection pooling for local PostgreSQL, or a transaction-mode pooler (PgBouncer)
+- Optional read replicas for read-only sessions, with read-your-writes stickiness
 - Health check functionality with timeout protection
 - Session management utilities
 - Error handling and automatic recovery
@@ -14,19 +16,114 @@ import logging
 import time
 import threading
 from contextlib import contextmanager
-from typing import Optional, Generator, Dict, Any
+from typing import Optional, Generator, Dict, Any, List
 
-from sqlalchemy import create_engine, Engine, text
+from sqlalchemy import create_engine, Engine, event, make_url, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool, NullPool
+from sqlalchemy.util import queue as sqla_queue
 from sqlalchemy.exc import SQLAlchemyError, OperationalError, DisconnectionError
 
 from app.config import settings
 from app.models.base import Base
+from app.observability.metrics import DB_READ_SESSIONS, instrument_engine, observe_pool_wait
+from app.observability.tracing import trace_engine
+from app.observability.load import load_signals
+from app.deadline import apply_statement_timeout
+from app.pool_tuning import pool_autotuner
+from app.replicas import (
+    SESSION_REPLICA_KEY,
+    SESSION_USER_KEY,
+    SESSION_WRITES_KEY,
+    ReadYourWrites,
+    Replica,
+    ReplicaSet,
+)
 
 # Configure module logger
 logger = logging.getLogger(__name__)
 
+# DATABASE_DRIVER values, by SQLAlchemy dialect name
+DRIVERS = ("psycopg2", "psycopg")
+
+
+def with_driver(url: str, driver: str) -> str:
+    """
+    Point a PostgreSQL URL at the given driver.
+
+    Plain ``postgresql://`` URLs resolve to a different driver depending
+    on the SQLAlchemy version, so the driver is always spelled out.
+    """
+    if driver not in DRIVERS:
+        raise ValueError(f"Unknown database driver {driver!r}, expected one of {', '.join(DRIVERS)}")
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return url
+    return parsed.set(drivername=f"postgresql+{driver}").render_as_string(hide_password=False)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that reports how long callers wait for a connection.
+
+    It also counts checkouts, remembers the peak number of checked-out
+    connections and can be resized in place, for the pool autotuner.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._peak_checked_out = 0
+        self._checkouts = 0
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            record = super()._do_get()
+        finally:
+            duration = time.perf_counter() - start_time
+            observe_pool_wait(duration)
+            load_signals.observe_pool_wait(duration)
+        self._peak_checked_out = max(self._peak_checked_out, self.checkedout())
+        self._checkouts += 1
+        return record
+
+    @property
+    def max_overflow(self) -> int:
+        return self._max_overflow
+
+    def take_checkouts(self) -> int:
+        """Checkouts since the previous call"""
+        checkouts, self._checkouts = self._checkouts, 0
+        return checkouts
+
+    def take_peak_checked_out(self) -> int:
+        """Peak checked-out connections since the previous call"""
+        peak = max(self._peak_checked_out, self.checkedout())
+        self._peak_checked_out = self.checkedout()
+        return peak
+
+    def resize(self, pool_size: int, max_overflow: int) -> None:
+        """
+        Change pool_size and max_overflow without closing any connection.
+
+        ``_overflow`` counts the open connections beyond ``pool_size``, so it
+        moves by the opposite of the size change. When shrinking, idle
+        connections beyond the new size are closed now, and checked-out ones
+        as they come back.
+        """
+        with self._overflow_lock:
+            self._overflow -= pool_size - self._pool.maxsize
+            self._pool.maxsize = pool_size
+            self._max_overflow = max_overflow
+
+        while self._pool.qsize() > pool_size:
+            try:
+                record = self._pool.get(False)
+            except sqla_queue.Empty:
+                break
+            record.close()
+            self._dec_overflow()
+
 
 class DatabaseManager:
     """
@@ -37,15 +134,19 @@ class DatabaseManager:
     - Health checking with timeout protection
     - Thread-safe session management
     - Local PostgreSQL optimized configuration
+    - Read-only sessions on replicas, when configured
     """
 
     def __init__(self):
         self._engine: Optional[Engine] = None
         self._session_factory: Optional[sessionmaker] = None
+        self._read_session_factory: Optional[sessionmaker] = None
         self._is_initialized: bool = False
         self._lock = threading.RLock()
         self._last_health_check: float = 0
         self._health_check_interval: float = 30.0  # Cache health checks for 30 seconds
+        self._replicas = ReplicaSet(retry_interval=settings.database_replica_retry_interval)
+        self.read_your_writes = ReadYourWrites(window=settings.database_read_your_writes_window)
 
     def initialize(self) -> None:
         """
@@ -64,6 +165,7 @@ class DatabaseManager:
                 self._create_engine()
                 self._create_session_factory()
                 self._test_connection()
+                self._create_replicas()
                 self._is_initialized = True
                 logger.info("Database initialization successful")
 
@@ -72,18 +174,13 @@ class DatabaseManager:
                 self._cleanup_resources()
                 raise
 
-    def _create_engine(self) -> None:
-        """Create SQLAlchemy engine with standard settings."""
-
-        # Build connection arguments for local PostgreSQL
-        connect_args = self._build_connect_args()
-
-        # Configure engine with standard settings
-        engine_kwargs = {
-            "url": settings.database_url,
-            "poolclass": QueuePool,
+    def _engine_kwargs(self, url: str) -> Dict[str, Any]:
+        """Engine arguments shared by the primary and the replicas."""
+        kwargs = {
+            "url": with_driver(url, settings.database_driver),
+            "poolclass": InstrumentedQueuePool,
             "echo": settings.database_echo,
-            "connect_args": connect_args,
+            "connect_args": self._build_connect_args(),
             "future": True,  # Use SQLAlchemy 2.0 style
             "pool_size": settings.database_pool_size,
             "max_overflow": settings.database_max_overflow,
@@ -93,18 +190,35 @@ class DatabaseManager:
             "pool_reset_on_return": settings.database_pool_reset_on_return,
         }
 
-        self._engine = create_engine(**engine_kwargs)
+        if settings.database_transaction_pooler:
+            # The pooler bounds server connections; only keep a few open to it, if any
+            if settings.database_pooler_pool_size > 0:
+                kwargs["pool_size"] = settings.database_pooler_pool_size
+                kwargs["max_overflow"] = 0
+            else:
+                kwargs["poolclass"] = NullPool
+                for name in ("pool_size", "max_overflow", "pool_timeout", "pool_pre_ping"):
+                    kwargs.pop(name)
+
+        return kwargs
+
+    def _create_engine(self) -> None:
+        """Create SQLAlchemy engine with standard settings."""
+        self._engine = create_engine(**self._engine_kwargs(settings.database_url))
+        instrument_engine(self._engine)
+        trace_engine(self._engine)
 
         logger.info(f"Database engine created:")
-        logger.info(f"  - Pool class: QueuePool")
-        logger.info(f"  - Pool size: {settings.database_pool_size}")
-        logger.info(f"  - Max overflow: {settings.database_max_overflow}")
+        logger.info(f"  - Driver: {settings.database_driver}")
+        logger.info(f"  - Transaction pooler: {settings.database_transaction_pooler}")
+        logger.info(f"  - Pool class: {self._engine.pool.__class__.__name__}")
+        logger.info(f"  - Pool status: {self._engine.pool.status()}")
         logger.info(f"  - Pool recycle: {settings.database_pool_recycle}s")
         logger.info(f"  - Pre-ping enabled: {settings.database_pool_pre_ping}")
 
     def _build_connect_args(self) -> Dict[str, Any]:
-        """Build psycopg2-specific connection arguments."""
-        connect_args = {
+        """Build libpq connection arguments, passed through by both drivers."""
+        connect_args: Dict[str, Any] = {
             "application_name": f"diet-api-{settings.environment}",
             "connect_timeout": 10,  # Connection timeout in seconds
         }
@@ -119,6 +233,11 @@ class DatabaseManager:
             }
         )
 
+        # A prepared statement lives on one server connection, which a transaction
+        # pooler hands to other clients; psycopg 3 prepares repeated queries by default
+        if settings.database_transaction_pooler and settings.database_driver == "psycopg":
+            connect_args["prepare_threshold"] = None
+
         return connect_args
 
     def _create_session_factory(self) -> None:
@@ -133,8 +252,70 @@ class DatabaseManager:
             expire_on_commit=False,  # Keep objects usable after commit
         )
 
+        # Bound each transaction's statements by the request deadline, if any
+        event.listen(self._session_factory, "after_begin", apply_statement_timeout)
+
+        # Remember which users just wrote, so their next reads skip the replicas
+        event.listen(self._session_factory, "after_flush", self._note_flush)
+        event.listen(self._session_factory, "after_commit", self._note_commit)
+        event.listen(self._session_factory, "after_rollback", self._note_rollback)
+
+        self._read_session_factory = self._create_read_session_factory(self._engine)
+
         logger.debug("Session factory created")
 
+    def _create_read_session_factory(self, engine: Engine) -> sessionmaker:
+        """
+        Create a factory of read-only sessions.
+
+        Their transactions start as ``BEGIN READ ONLY``: psycopg2 folds the
+        mode into the BEGIN it sends anyway, so it costs no extra round trip.
+        Nothing is ever flushed or committed through them.
+        """
+        session_factory = sessionmaker(
+            bind=engine.execution_options(postgresql_readonly=True),
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+        )
+        event.listen(session_factory, "after_begin", apply_statement_timeout)
+        event.listen(session_factory, "before_flush", self._reject_flush)
+        return session_factory
+
+    @staticmethod
+    def _reject_flush(session: Session, flush_context, instances) -> None:
+        raise RuntimeError("Cannot write through a read-only session, use get_db instead")
+
+    def _note_flush(self, session: Session, flush_context) -> None:
+        session.info[SESSION_WRITES_KEY] = True
+
+    def _note_commit(self, session: Session) -> None:
+        user_id = session.info.get(SESSION_USER_KEY)
+        if session.info.pop(SESSION_WRITES_KEY, False) and user_id is not None:
+            self.read_your_writes.mark_write(user_id)
+
+    def _note_rollback(self, session: Session) -> None:
+        session.info.pop(SESSION_WRITES_KEY, None)
+
+    def _create_replicas(self) -> None:
+        """Create an engine and session factory per configured replica."""
+        for index, url in enumerate(settings.database_replica_urls_list):
+            name = f"replica-{index}"
+            engine = create_engine(**self._engine_kwargs(url))
+            # Pool gauges describe the primary pool; replica queries are still counted and traced
+            instrument_engine(engine, pool=False)
+            trace_engine(engine)
+
+            def on_error(context, name=name) -> None:
+                # No connection yet means the replica could not be reached at all
+                if context.is_disconnect or context.connection is None:
+                    self._replicas.mark_down(name)
+
+            event.listen(engine, "handle_error", on_error)
+
+            self._replicas.add(Replica(name, engine, self._create_read_session_factory(engine)))
+            logger.info(f"Read replica {name} configured")
+
     def _test_connection(self) -> None:
         """Test database connectivity with timeout protection."""
         if not self._engine:
@@ -174,9 +355,11 @@ class DatabaseManager:
             return False
 
         try:
-            with self.get_session() as session:
-                # Quick health check query
-                result = session.execute(text("SELECT 1 as health_check"))
+            # A lone autocommit statement: no BEGIN/ROLLBACK round trips and no
+            # session hooks, and a transaction pooler frees its server connection
+            # as soon as the statement completes
+            with self._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                result = conn.execute(text("SELECT 1 as health_check"))
                 row = result.fetchone()
 
                 if row is not None and row[0] == 1:
@@ -211,30 +394,52 @@ class DatabaseManager:
                 "max_overflow": settings.database_max_overflow,
                 "pool_timeout": settings.database_pool_timeout,
                 "pool_recycle": settings.database_pool_recycle,
+                "driver": settings.database_driver,
+                "transaction_pooler": settings.database_transaction_pooler,
                 "environment": settings.environment,
             },
+            "replicas": self.replica_status(),
+            "read_your_writes_users": self.read_your_writes.tracked(),
         }
 
-        if self._engine and hasattr(self._engine.pool, "status"):
+        if self._engine:
             try:
-                # pool.status() returns a formatted string
-                pool_status_str = self._engine.pool.status()
-
-                # Access pool attributes directly (they're properties, not methods)
-                pool_info = {
-                    "status_string": pool_status_str,
-                }
-
-                status["pool_status"] = pool_info
+                status["pool_status"] = self.pool_status()
             except Exception as e:
                 logger.debug(f"Could not get pool status: {e}")
                 status["pool_status"] = "unavailable"
+            status["autotune"] = pool_autotuner.snapshot()
 
         # Perform health check
         status["healthy"] = self.health_check()
 
         return status
 
+    def pool_status(self) -> Dict[str, Any]:
+        """Checked-out, idle and overflow connections of the primary pool."""
+        pool = self._engine.pool
+        pool_info: Dict[str, Any] = {
+            "pool_class": pool.__class__.__name__,
+            "status_string": pool.status(),
+        }
+        if isinstance(pool, InstrumentedQueuePool):
+            pool_info.update(
+                {
+                    "size": pool.size(),
+                    "max_overflow": pool.max_overflow,
+                    "checked_out": pool.checkedout(),
+                    "idle": pool.checkedin(),
+                    "overflow": max(0, pool.overflow()),
+                    "timeout": pool.timeout(),
+                }
+            )
+        pool_info["wait_seconds_avg"] = load_signals.snapshot()["pool_wait_seconds"]
+        return pool_info
+
+    def replica_status(self) -> List[Dict[str, Any]]:
+        """Availability and pool status of each read replica."""
+        return self._replicas.snapshot()
+
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
         """
@@ -256,8 +461,46 @@ class DatabaseManager:
         if not self._is_initialized or not self._session_factory:
             raise RuntimeError("Database not initialized. Call initialize() first.")
 
-        session = self._session_factory()
+        with self._session_scope(self._session_factory()) as session:
+            yield session
+
+    @contextmanager
+    def get_read_session(self, user_id: Optional[str] = None) -> Generator[Session, None, None]:
+        """
+        Get a read-only session, on a replica when one is available.
+
+        Reads stay on the primary when no replica is configured or available,
+        and for a short window after ``user_id`` committed a write. Flushing
+        the session raises ``RuntimeError``.
+
+        Yields:
+            Session: SQLAlchemy database session
+
+        Raises:
+            RuntimeError: If database is not initialized
+            SQLAlchemyError: For database-related errors
+        """
+        if not self._is_initialized or not self._read_session_factory:
+            raise RuntimeError("Database not initialized. Call initialize() first.")
+
+        replica = None
+        if self.read_your_writes.is_sticky(user_id):
+            DB_READ_SESSIONS.labels("primary_sticky").inc()
+        else:
+            replica = self._replicas.pick()
+            DB_READ_SESSIONS.labels("replica" if replica else "primary_no_replica").inc()
+
+        session = replica.session_factory() if replica else self._read_session_factory()
+        if replica:
+            session.info[SESSION_REPLICA_KEY] = replica.name
+        session.info[SESSION_USER_KEY] = user_id
+
+        with self._session_scope(session) as session:
+            yield session
 
+    @contextmanager
+    def _session_scope(self, session: Session) -> Generator[Session, None, None]:
+        """Error handling and cleanup shared by every kind of session."""
         try:
             yield session
 
@@ -326,6 +569,8 @@ class DatabaseManager:
 
     def _cleanup_resources(self) -> None:
         """Internal method to cleanup database resources."""
+        self._replicas.dispose()
+
         if self._engine:
             try:
                 self._engine.dispose()
@@ -336,6 +581,7 @@ class DatabaseManager:
                 self._engine = None
 
         self._session_factory = None
+        self._read_session_factory = None
         self._is_initialized = False
         self._last_health_check = 0
 
@@ -471,6 +717,44 @@ def test_database_connection() -> bool:
         return False
 
 
+def pipeline_supported(driver: Optional[str] = None) -> bool:
+    """Whether the driver (default: DATABASE_DRIVER) can pipeline statements: psycopg 3 on libpq 14+"""
+    if (driver or settings.database_driver) != "psycopg":
+        return False
+    try:
+        import psycopg
+    except ImportError:
+        return False
+    return psycopg.Pipeline.is_supported()
+
+
+@contextmanager
+def pipelined(session: Session) -> Generator[None, None, None]:
+    """
+    Send the statements issued inside the block as one psycopg 3 pipeline.
+
+    The driver queues each statement without waiting for its result, so a
+    flush of many INSERTs costs about one round trip instead of one per
+    statement. A statement that needs its result back (``RETURNING``)
+    still waits for everything queued before it. Errors may only surface
+    when the block exits. On psycopg2, or a libpq without pipeline mode,
+    this is a no-op.
+
+    Usage:
+        with pipelined(session):
+            session.flush()
+    """
+    dbapi_connection = session.connection().connection.dbapi_connection
+    pipeline = getattr(dbapi_connection, "pipeline", None)
+    # Only psycopg 3 connections have pipeline()
+    if pipeline is None or not pipeline_supported("psycopg"):
+        yield
+        return
+
+    with pipeline():
+        yield
+
+
 # Context manager for manual transaction management
 @contextmanager
 def database_transaction() -> Generator[Session, None, None]:
@@ -507,5 +791,8 @@ __all__ = [
     "execute_raw_sql",
     "test_database_connection",
     "database_transaction",
+    "pipelined",
+    "pipeline_supported",
+    "with_driver",
     "DatabaseManager",
 ]
@@ -0,0 +1,85 @@
+"""
+Request deadlines and client-disconnect cancellation state.
+
+``DeadlineMiddleware`` stores an absolute deadline (``time.monotonic()``)
+for the request in a context variable; BAML calls turn the remaining time
+into an abort timeout and database transactions into a Postgres
+``statement_timeout``. Requests that may be cancelled when the client
+disconnects also get a ``RequestCancellation``; work that must finish
+regardless (e.g. a generation other callers are waiting on) calls
+``shield_from_disconnect()``.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.exceptions import DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+# Statement timeouts below this are not worth a round trip; the deadline check fails first
+MIN_STATEMENT_TIMEOUT_MS = 10
+
+
+class RequestCancellation:
+    """Whether a disconnect may cancel the current request"""
+
+    __slots__ = ("shielded",)
+
+    def __init__(self):
+        self.shielded = False
+
+
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+current_cancellation: ContextVar[Optional[RequestCancellation]] = ContextVar("current_cancellation", default=None)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the request deadline, or ``None`` without a deadline"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline(operation: str) -> Optional[float]:
+    """
+    Raise if the request deadline has passed.
+
+    Returns:
+        Seconds left, or ``None`` without a deadline
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError(operation)
+    return remaining
+
+
+@contextmanager
+def suspend_deadline() -> Iterator[None]:
+    """Run the block without the request deadline, for bookkeeping on work that already completed"""
+    token = current_deadline.set(None)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def shield_from_disconnect() -> None:
+    """Let the current request run to completion even if the client disconnects"""
+    cancellation = current_cancellation.get()
+    if cancellation is not None:
+        cancellation.shielded = True
+
+
+def apply_statement_timeout(session, transaction, connection) -> None:
+    """Session ``after_begin`` hook bounding the transaction's statements by the request deadline"""
+    remaining = check_deadline("database transaction")
+    if remaining is None or connection.dialect.name != "postgresql":
+        return
+
+    timeout_ms = max(MIN_STATEMENT_TIMEOUT_MS, int(remaining * 1000))
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
@@ -1,7 +1,7 @@
 """Global dependencies for the application"""
 
 import time
-from typing import Optional, Annotated, Any
+from typing import Optional, Annotated, Any, Generator
 from fastapi import Depends, Header, Request
 from sqlalchemy.orm import Session
 import logging
@@ -9,7 +9,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 # Database session dependencies - imported from database module
-from app.database import get_db
+from app.database import database_manager, get_db
+from app.replicas import SESSION_USER_KEY
 
 
 # ===========================
@@ -69,16 +70,31 @@ def get_default_user_from_db(db: Session) -> dict:
     return _DEFAULT_USER_CACHE.copy()
 
 
-def get_current_user(
-    x_user_id: Annotated[Optional[str], Header()] = None,
-    db: Session = Depends(get_db)
+def get_default_user() -> dict:
+    """
+    Get the default user, looking it up in a short session of its own until it is cached.
+
+    Returns:
+        User data dictionary
+    """
+    if _DEFAULT_USER_CACHE is not None:
+        return _DEFAULT_USER_CACHE.copy()
+
+    with database_manager.get_session() as db:
+        return get_default_user_from_db(db)
+
+
+def resolve_user(
+    x_user_id: Annotated[Optional[str], Header()] = None
 ) -> dict:
     """
-    Get current user - simplified for local development.
+    Resolve the user a request acts for - simplified for local development.
+
+    Takes no request session, so read endpoints resolve their user without
+    opening one on the primary.
 
     Args:
         x_user_id: Optional user ID from X-User-Id header
-        db: Database session
 
     Returns:
         User data dictionary (defaults to first user in database)
@@ -94,7 +110,61 @@ def get_current_user(
         }
 
     # Otherwise get default user from database
-    return get_default_user_from_db(db)
+    return get_default_user()
+
+
+def resolve_user_id(
+    user: dict = Depends(resolve_user)
+) -> str:
+    """
+    Get the ID of the user a request acts for, without marking any session.
+
+    Args:
+        user: User from resolve_user
+
+    Returns:
+        User ID as string
+    """
+    return str(user["id"])
+
+
+def get_current_user(
+    user: dict = Depends(resolve_user),
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    Get current user - simplified for local development.
+
+    Args:
+        user: User from resolve_user
+        db: Database session
+
+    Returns:
+        User data dictionary (defaults to first user in database)
+    """
+    # Writes committed by this session keep the user's reads on the primary for a while
+    db.info[SESSION_USER_KEY] = user["id"]
+    return user
+
+
+def get_read_db(
+    user_id: str = Depends(resolve_user_id)
+) -> Generator[Session, None, None]:
+    """
+    FastAPI dependency for sessions of read-only endpoints.
+
+    Transactions are READ ONLY, which lets Postgres skip transaction ID
+    assignment and makes the session safe to route to a replica or a
+    pooler. Sessions run on a read replica when one is configured, except
+    for a short window after the requesting user committed a write. The
+    user is resolved like ``get_current_user``, so the window also applies
+    to requests without an X-User-Id header.
+
+    Yields:
+        Session: SQLAlchemy database session
+    """
+    with database_manager.get_read_session(user_id) as session:
+        yield session
 
 
 def get_optional_user(
@@ -112,7 +182,7 @@ def get_optional_user(
         User data if provided, None otherwise
     """
     if x_user_id:
-        return get_current_user(x_user_id=x_user_id, db=db)
+        return get_current_user(resolve_user(x_user_id=x_user_id), db=db)
     return None
 
 
@@ -104,12 +104,27 @@ class RateLimitError(BaseAPIException):
 class ExternalServiceError(BaseAPIException):
     """Raised when an external service fails"""
 
-    def __init__(self, service: str, message: str):
+    def __init__(self, service: str, message: str, retry_after: Optional[int] = None):
+        details: Dict[str, Any] = {"service": service}
+        if retry_after:
+            details["retry_after"] = retry_after
         super().__init__(
             message=f"{service}: {message}",
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             error_code="EXTERNAL_SERVICE_ERROR",
-            details={"service": service},
+            details=details,
+        )
+
+
+class DeadlineExceededError(BaseAPIException):
+    """Raised when a request runs out of its time budget"""
+
+    def __init__(self, operation: str, deadline: Optional[float] = None):
+        super().__init__(
+            message=f"Request deadline exceeded during {operation}",
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            error_code="DEADLINE_EXCEEDED",
+            details={"operation": operation, "deadline_seconds": deadline} if deadline else {"operation": operation},
         )
 
 
@@ -530,6 +545,8 @@ def setup_exception_handlers(app: FastAPI) -> None:
         )
 
         response.headers["X-Service-Error"] = exc.details.get("service", "unknown")
+        if "retry_after" in exc.details:
+            response.headers["Retry-After"] = str(exc.details["retry_after"])
 
         return response
 
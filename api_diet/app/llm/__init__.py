@@ -0,0 +1,7 @@
+"""LLM package - instrumented access to the generated BAML client"""
+
+from .client import call_baml
+
+__all__ = [
+    "call_baml",
+]
@@ -0,0 +1,186 @@
+"""Instrumented entry point for BAML function calls"""
+
+import asyncio
+import logging
+import time
+from typing import Any, List, Optional
+
+from baml_py import AbortController, ClientRegistry, Collector, FunctionLog
+from baml_py.errors import BamlAbortError, BamlTimeoutError
+
+from app.config import settings
+from app.deadline import check_deadline, remaining_time
+from app.exceptions import DeadlineExceededError
+from app.llm.hedging import hedger
+from app.llm.ledger import usage_ledger
+from app.llm.replay import replay_store
+from app.llm.resilience import client_resilience, is_upstream_failure
+from app.observability.load import load_signals
+from app.observability.metrics import LLM_CALL_DURATION, LLM_CALL_FAILURES, LLM_CALL_RETRIES, LLM_CALLS_IN_PROGRESS
+from app.observability.tracing import SPAN_KIND_CLIENT, tracer
+from baml_client.async_client import b
+
+logger = logging.getLogger(__name__)
+
+
+def _count_retries(log: Optional[FunctionLog]) -> int:
+    """Number of attempts beyond the first one made by the BAML retry policy"""
+    if log is None:
+        return 0
+    return max(0, len(log.calls) - 1)
+
+
+def _attempt_latency(log: Optional[FunctionLog], started: float, finished: float) -> float:
+    """Latency of one attempt as timed by BAML, or since it started when BAML has no timing (aborted)"""
+    timing = log.timing if log is not None else None
+    if timing is not None and timing.duration_ms is not None:
+        return timing.duration_ms / 1000
+    return finished - started
+
+
+def _client_name(log: Optional[FunctionLog]) -> Optional[str]:
+    """BAML client the call was made with"""
+    if log is None or not log.calls:
+        return None
+    return log.calls[0].client_name
+
+
+async def call_baml(function_name: str, *, user_id: Optional[str] = None, **arguments: Any) -> Any:
+    """
+    Call a BAML function of the async client by name and record its metrics and usage.
+
+    The call is aborted when the request deadline passes (raising
+    ``DeadlineExceededError``) or when the calling task is cancelled, e.g.
+    because the client disconnected. Calls slower than usual are hedged
+    (see ``app.llm.hedging``); every attempt is recorded in the usage ledger.
+    Calls to a client whose circuit is open fail fast with
+    ``ExternalServiceError`` (see ``app.llm.resilience``). In replay mode the
+    result comes from the record/replay store (see ``app.llm.replay``).
+
+    Args:
+        function_name: BAML function name, e.g. ``GeneraDietaSettimanale``
+        user_id: User the call is made for (recorded in the usage ledger)
+        **arguments: Keyword arguments of the BAML function
+
+    Returns:
+        The parsed BAML result
+    """
+    function = getattr(b, function_name)
+    if replay_store.replaying:
+        return await replay_store.replay(function_name, arguments)
+
+    check_deadline(f"BAML {function_name}")
+    breaker = client_resilience.acquire(function_name)
+    collectors: List[Collector] = []
+    attempt_starts: List[float] = []
+
+    # Without retry budget left, the first attempt goes to the client's no-retry variant
+    primary_registry = None
+    no_retry_client = client_resilience.no_retry_client(function_name)
+    if no_retry_client is not None:
+        primary_registry = ClientRegistry()
+        primary_registry.set_primary(no_retry_client)
+
+    def start_attempt(client_registry: Optional[ClientRegistry]):
+        client_registry = client_registry or primary_registry
+        remaining = remaining_time()
+        abort_controller = AbortController(timeout_ms=max(1, int(remaining * 1000)) if remaining is not None else None)
+        collector = Collector(name=function_name)
+        collectors.append(collector)
+        attempt_starts.append(time.perf_counter())
+        baml_options = {
+            "collector": collector,
+            "abort_controller": abort_controller,
+            "env": {"OPENAI_BASE_URL": settings.openai_base_url},
+        }
+        if client_registry is not None:
+            baml_options["client_registry"] = client_registry
+        return function(**arguments, baml_options=baml_options), abort_controller
+
+    outcome = "cancelled"
+    error: Optional[BaseException] = None
+    hedge_won = False
+    start_time = time.perf_counter()
+    LLM_CALLS_IN_PROGRESS.inc()
+    load_signals.llm_call_started()
+
+    with tracer.span(
+        f"baml {function_name}",
+        kind=SPAN_KIND_CLIENT,
+        attributes={"llm.function": function_name},
+    ) as span:
+        try:
+            # Cancellation aborts the in-flight attempts instead of paying for unused answers
+            result, hedge_won = await hedger.run(function_name, start_attempt)
+            outcome = "success"
+            if replay_store.recording:
+                await replay_store.record(function_name, arguments, result, time.perf_counter() - start_time)
+            return result
+
+        except (BamlAbortError, BamlTimeoutError) as e:
+            deadline_left = remaining_time()
+            if deadline_left is not None and deadline_left <= 0:
+                outcome = "timeout"
+                raise DeadlineExceededError(f"BAML {function_name}") from e
+            outcome = "failure"
+            error = e
+            LLM_CALL_FAILURES.labels(function_name).inc()
+            raise
+
+        except Exception as e:
+            outcome = "failure"
+            error = e
+            LLM_CALL_FAILURES.labels(function_name).inc()
+            raise
+
+        finally:
+            finished = time.perf_counter()
+            duration = finished - start_time
+            LLM_CALLS_IN_PROGRESS.dec()
+            load_signals.llm_call_finished()
+            LLM_CALL_DURATION.labels(function_name, outcome).observe(duration)
+            if outcome == "success":
+                hedger.observe(function_name, duration)
+
+            winner = len(collectors) - 1 if hedge_won else 0
+            retries = 0
+            for index, attempt_collector in enumerate(collectors):
+                attempt_log = attempt_collector.last
+                attempt_retries = _count_retries(attempt_log)
+                retries += attempt_retries
+                usage_ledger.record(
+                    function_name=function_name,
+                    log=attempt_log,
+                    latency=_attempt_latency(attempt_log, attempt_starts[index], finished),
+                    success=outcome == "success" and index == winner,
+                    retries=attempt_retries,
+                    user_id=user_id,
+                )
+            if retries:
+                LLM_CALL_RETRIES.labels(function_name).inc(retries)
+
+            log = collectors[winner].last if collectors else None
+            client_name = _client_name(log)
+            if client_name is not None:
+                client_resilience.learn_client(function_name, client_name)
+                if breaker is None:
+                    breaker = client_resilience.breaker(client_name)
+            if outcome == "success":
+                client_resilience.retry_budget.record_success()
+            client_resilience.retry_budget.record_retries(retries)
+            if breaker is not None:
+                if outcome == "success":
+                    breaker.record_success()
+                elif error is not None and is_upstream_failure(error):
+                    breaker.record_failure()
+                else:
+                    breaker.record_inconclusive()
+            if span is not None:
+                span.set_attribute("llm.outcome", outcome)
+                span.set_attribute("llm.retries", retries)
+                span.set_attribute("llm.hedged", len(collectors) > 1)
+                if log is not None and log.usage is not None:
+                    span.set_attribute("llm.usage.input_tokens", log.usage.input_tokens)
+                    span.set_attribute("llm.usage.output_tokens", log.usage.output_tokens)
+
+            logger.debug(f"BAML {function_name} finished with {outcome} in {duration:.2f}s ({retries} retries)")
@@ -0,0 +1,151 @@
+"""
+Hedged BAML calls for tail latency.
+
+A call still running after the observed latency quantile (p95 by default)
+of its function gets a duplicate, optionally on a dedicated hedge client.
+The first successful result wins and the other attempt is aborted. Hedges
+are paid for from a token bucket filled by every call, so at most about
+``max_rate`` extra calls per call are made even when the upstream slows
+down for everyone.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from baml_py import AbortController, ClientRegistry
+
+from app.config import settings
+from app.observability.latency import LatencyTracker
+from app.observability.metrics import LLM_HEDGES, LLM_HEDGES_THROTTLED
+
+logger = logging.getLogger(__name__)
+
+# Starts one attempt, on the given client registry if any, and returns it with its abort controller
+StartAttempt = Callable[[Optional[ClientRegistry]], Tuple[Awaitable[Any], AbortController]]
+
+
+class HedgeBudget:
+    """Token bucket allowing ``rate`` hedges per call, with a small burst"""
+
+    __slots__ = ("rate", "burst", "tokens")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+
+    def deposit(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.rate)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class Hedger:
+    """Runs BAML calls with a delayed duplicate once they exceed their usual latency"""
+
+    def __init__(
+        self,
+        enabled: bool,
+        quantile: float,
+        min_samples: int,
+        max_rate: float,
+        hedge_clients: Dict[str, str],
+    ):
+        self.enabled = enabled
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.budget = HedgeBudget(rate=max_rate, burst=max(1.0, 10 * max_rate))
+        self.hedge_clients = hedge_clients
+        self.latency = LatencyTracker()
+
+    def observe(self, function_name: str, duration: float) -> None:
+        """Record the latency of a successful call"""
+        self.latency.record("BAML", function_name, duration)
+
+    def hedge_delay(self, function_name: str) -> Optional[float]:
+        """Seconds after which a call is hedged, or None while there is too little data"""
+        if not self.enabled:
+            return None
+        observed = self.latency.quantile("BAML", function_name, self.quantile)
+        if observed is None or observed[0] < self.min_samples:
+            return None
+        return observed[1]
+
+    def _hedge_registry(self, function_name: str) -> Optional[ClientRegistry]:
+        client = self.hedge_clients.get(function_name)
+        if client is None:
+            return None
+        registry = ClientRegistry()
+        registry.set_primary(client)
+        return registry
+
+    async def run(self, function_name: str, start_attempt: StartAttempt) -> Tuple[Any, bool]:
+        """
+        Run a call, hedging it if it outlives the function's latency quantile.
+
+        Returns:
+            The first successful result and whether the hedge produced it
+        """
+        self.budget.deposit()
+        delay = self.hedge_delay(function_name)
+
+        attempts: List[Tuple[asyncio.Future, AbortController]] = []
+        call, controller = start_attempt(None)
+        primary = asyncio.ensure_future(call)
+        attempts.append((primary, controller))
+
+        try:
+            if delay is None:
+                return await primary, False
+
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done:
+                if self.budget.try_spend():
+                    call, controller = start_attempt(self._hedge_registry(function_name))
+                    attempts.append((asyncio.ensure_future(call), controller))
+                    logger.debug(f"Hedging BAML {function_name} after {delay:.2f}s")
+                else:
+                    LLM_HEDGES_THROTTLED.labels(function_name).inc()
+
+            pending = {task for task, _ in attempts}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        hedge_won = task is not primary
+                        if len(attempts) > 1:
+                            LLM_HEDGES.labels(function_name, "hedge" if hedge_won else "primary").inc()
+                        return task.result(), hedge_won
+
+            # Every attempt failed: surface the original call's error
+            if len(attempts) > 1:
+                LLM_HEDGES.labels(function_name, "none").inc()
+            return primary.result(), False
+
+        finally:
+            for task, controller in attempts:
+                if not task.done():
+                    # The loser (or everything, on cancellation): stop paying for it
+                    controller.abort()
+                    task.cancel()
+                    task.add_done_callback(_discard_result)
+
+
+def _discard_result(task: asyncio.Future) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+# Global hedger instance
+hedger = Hedger(
+    enabled=settings.enable_llm_hedging,
+    quantile=settings.llm_hedge_quantile,
+    min_samples=settings.llm_hedge_min_samples,
+    max_rate=settings.llm_hedge_max_rate,
+    hedge_clients=settings.llm_hedge_clients_map,
+)
@@ -0,0 +1,177 @@
+"""
+In-memory LLM usage ledger with batched persistence.
+
+Every BAML call appends one record to a bounded buffer; a background task
+drains the buffer into the ``llm_usage`` table with a single executemany
+insert, so requests never wait on an accounting write.
+"""
+
+import asyncio
+import logging
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from baml_py import FunctionLog
+
+from app.config import settings
+from app.database import database_manager
+from app.repositories import LLMUsageRepository
+
+logger = logging.getLogger(__name__)
+
+
+def _extract_model(log: Optional[FunctionLog]) -> Optional[str]:
+    """Read the model name from the selected LLM call (response first, then request)"""
+    call = log.selected_call if log is not None else None
+    if call is None:
+        return None
+
+    for message in (call.http_response, call.http_request):
+        if message is None:
+            continue
+        try:
+            model = message.body.json().get("model")
+        except Exception:
+            continue
+        if model:
+            return str(model)
+
+    return None
+
+
+def estimate_cost(input_tokens: int, output_tokens: int) -> float:
+    """Estimate the USD cost of a call from its token counts"""
+    return (
+        input_tokens * settings.llm_input_cost_per_million
+        + output_tokens * settings.llm_output_cost_per_million
+    ) / 1_000_000
+
+
+class UsageLedger:
+    """Bounded buffer of LLM usage records flushed to the database in batches"""
+
+    def __init__(self, max_buffer: int, batch_size: int, flush_interval: float):
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max_buffer)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def record(
+        self,
+        function_name: str,
+        log: Optional[FunctionLog],
+        latency: float,
+        success: bool,
+        retries: int = 0,
+        user_id: Optional[str] = None,
+    ) -> None:
+        """Buffer one BAML call. Never raises and never touches the database."""
+        try:
+            usage = log.usage if log is not None else None
+            input_tokens = (usage.input_tokens if usage else None) or 0
+            output_tokens = (usage.output_tokens if usage else None) or 0
+            selected_call = log.selected_call if log is not None else None
+
+            row = {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "function_name": function_name,
+                "client_name": selected_call.client_name if selected_call else None,
+                "model": _extract_model(log),
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "latency_ms": round(latency * 1000, 2),
+                "retries": retries,
+                "success": success,
+                "cost_usd": estimate_cost(input_tokens, output_tokens),
+                "created_at": datetime.now(timezone.utc),
+            }
+        except Exception as e:
+            logger.warning(f"Could not build LLM usage record for {function_name}: {e}")
+            return
+
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(row)
+            pending = len(self._buffer)
+
+        if pending >= self._batch_size and self._flush_requested is not None:
+            self._flush_requested.set()
+
+    def flush(self) -> int:
+        """
+        Write all buffered records in one batch.
+
+        Returns:
+            Number of records written
+        """
+        with self._lock:
+            rows: List[Dict[str, Any]] = list(self._buffer)
+            self._buffer.clear()
+
+        if not rows:
+            return 0
+
+        try:
+            with database_manager.get_session() as session:
+                LLMUsageRepository(session).bulk_insert(rows)
+                session.commit()
+        except Exception as e:
+            logger.error(f"Failed to flush {len(rows)} LLM usage records: {e}")
+            # Put the batch back for the next attempt; overflow beyond the bound is discarded
+            with self._lock:
+                self._buffer.extendleft(reversed(rows))
+            return 0
+
+        logger.debug(f"Flushed {len(rows)} LLM usage records")
+        return len(rows)
+
+    async def _run(self) -> None:
+        """Background loop flushing on interval or when the batch size is reached"""
+        assert self._flush_requested is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        """Start the background flush task on the running event loop"""
+        if self._task is not None:
+            return
+        self._flush_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="llm-usage-ledger")
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await asyncio.to_thread(self.flush)
+
+    @property
+    def pending(self) -> int:
+        """Number of records waiting to be flushed"""
+        return len(self._buffer)
+
+
+# Global usage ledger instance
+usage_ledger = UsageLedger(
+    max_buffer=settings.llm_usage_max_buffer,
+    batch_size=settings.llm_usage_batch_size,
+    flush_interval=settings.llm_usage_flush_interval,
+)
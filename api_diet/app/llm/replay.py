@@ -0,0 +1,177 @@
+"""
+Record/replay store for BAML calls.
+
+With ``LLM_REPLAY_MODE=record`` every successful BAML call is written to
+``LLM_REPLAY_DIR/<function>/<key>.json``, keyed by the function name and a
+hash of its canonicalized arguments, leaving out arguments that change
+between otherwise identical calls (``VOLATILE_ARGUMENTS``). With ``LLM_REPLAY_MODE=replay`` calls
+are answered from those files instead of the LLM, optionally delayed by the
+recorded latency times ``LLM_REPLAY_LATENCY_SCALE``. Outputs that echo a
+volatile argument are adjusted to the requested value (``REPLAY_ADJUSTMENTS``). Benchmarks of
+persistence and serialization then run against deterministic, real-shaped
+output in milliseconds.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.exceptions import ExternalServiceError
+from baml_client import types as baml_types
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# Arguments left out of the call key, per function: the diet's start date is
+# today's date, so keying on it would make every recording miss the next day
+VOLATILE_ARGUMENTS: Dict[str, FrozenSet[str]] = {
+    "GeneraDietaSettimanale": frozenset({"dataInizio"}),
+}
+
+
+def shift_diet_dates(output: Dict[str, Any], arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Move a recorded weekly diet to the requested start date, keeping its length"""
+    try:
+        recorded_start = date.fromisoformat(output["dataInizio"])
+        recorded_end = date.fromisoformat(output["dataFine"])
+        start = date.fromisoformat(arguments["dataInizio"])
+    except (KeyError, TypeError, ValueError):
+        return output
+    end = start + (recorded_end - recorded_start)
+    return {**output, "dataInizio": start.isoformat(), "dataFine": end.isoformat()}
+
+
+# Adjustments of replayed outputs to the call's volatile arguments, per function
+REPLAY_ADJUSTMENTS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = {
+    "GeneraDietaSettimanale": shift_diet_dates,
+}
+
+
+def canonicalize(value: Any) -> Any:
+    """JSON-compatible form of BAML arguments (pydantic models, lists, enums, scalars)"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): canonicalize(item) for key, item in value.items()}
+    return value
+
+
+def call_key(function_name: str, arguments: Dict[str, Any]) -> str:
+    """Stable key of a call: hash of the function name and its canonical, non-volatile arguments"""
+    volatile = VOLATILE_ARGUMENTS.get(function_name, frozenset())
+    keyed = {name: value for name, value in arguments.items() if name not in volatile}
+    payload = json.dumps(
+        {"function": function_name, "arguments": canonicalize(keyed)},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReplayStore:
+    """On-disk store of BAML call results, one JSON file per call key"""
+
+    def __init__(self, mode: str, directory: str, latency_scale: float):
+        if mode not in (MODE_OFF, MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Invalid LLM replay mode: {mode!r}")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.latency_scale = latency_scale
+        self._cache: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == MODE_RECORD
+
+    def _path(self, function_name: str, key: str) -> Path:
+        return self.directory / function_name / f"{key}.json"
+
+    def _load(self, function_name: str, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            try:
+                entry = json.loads(self._path(function_name, key).read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                return None
+            self._cache[key] = entry
+        return entry
+
+    def _write(self, function_name: str, key: str, entry: Dict[str, Any]) -> None:
+        path = self._path(function_name, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so concurrent replays never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def replay(self, function_name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Serve a call from the store.
+
+        Raises:
+            ExternalServiceError: No recording exists for these arguments
+        """
+        key = call_key(function_name, arguments)
+        entry = self._cache.get(key) or await asyncio.to_thread(self._load, function_name, key)
+        if entry is None:
+            raise ExternalServiceError("LLM replay", f"no recording of {function_name} for key {key[:12]}")
+
+        if self.latency_scale > 0:
+            await asyncio.sleep(entry.get("latency", 0.0) * self.latency_scale)
+
+        output = entry["output"]
+        adjust = REPLAY_ADJUSTMENTS.get(function_name)
+        if adjust is not None:
+            output = adjust(output, arguments)
+        output_type = getattr(baml_types, entry.get("type") or "", None)
+        if isinstance(output_type, type) and issubclass(output_type, BaseModel):
+            return output_type.model_validate(output)
+        return output
+
+    async def record(self, function_name: str, arguments: Dict[str, Any], result: Any, latency: float) -> None:
+        """Store the result of a successful call; failures to write are logged, never raised"""
+        key = call_key(function_name, arguments)
+        entry = {
+            "function": function_name,
+            "arguments": canonicalize(arguments),
+            "type": type(result).__name__ if isinstance(result, BaseModel) else None,
+            "output": canonicalize(result),
+            "latency": round(latency, 4),
+        }
+        try:
+            await asyncio.to_thread(self._write, function_name, key, entry)
+            self._cache[key] = entry
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not record BAML {function_name} call: {e}")
+
+
+# Global replay store instance
+replay_store = ReplayStore(
+    mode=settings.llm_replay_mode,
+    directory=settings.llm_replay_dir,
+    latency_scale=settings.llm_replay_latency_scale,
+)
@@ -0,0 +1,214 @@
+"""
+Circuit breakers and a retry budget for BAML clients.
+
+Each BAML client (``DietModel``, ``ReceipeModel``) has a circuit breaker:
+after ``failure_threshold`` consecutive upstream failures it opens and
+calls fail fast with ``ExternalServiceError`` (503, with ``Retry-After`` set
+to the time left until the circuit half-opens) instead of running the full
+retry policy. After ``reset_timeout`` seconds one probe call is let
+through (half-open); its success closes the circuit, its failure opens it
+again.
+
+Retries happen inside the BAML runtime, so the retry budget is accounted
+after the fact: every successful call deposits ``ratio`` tokens and every
+retry BAML made withdraws one. While the budget is empty, calls run on the
+client's no-retry variant, so a degraded upstream is not hit with
+multiplied load.
+"""
+
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+
+from baml_py.errors import BamlClientError, BamlClientHttpError
+
+from app.config import settings
+from app.exceptions import ExternalServiceError
+from app.observability.metrics import LLM_CIRCUIT_REJECTED, LLM_CIRCUIT_STATE, LLM_RETRY_BUDGET_EXHAUSTED
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_HALF_OPEN = "half_open"
+STATE_OPEN = "open"
+
+STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error says the LLM upstream is unhealthy (not the request or the output)"""
+    if isinstance(error, BamlClientHttpError):
+        status_code = getattr(error, "status_code", None)
+        return status_code is None or status_code == 429 or status_code >= 500
+    return isinstance(error, BamlClientError)
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one BAML client"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        LLM_CIRCUIT_STATE.labels(name).set(STATE_VALUES[STATE_CLOSED])
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"Circuit for BAML client {self.name} is now {state}")
+            self.state = state
+            LLM_CIRCUIT_STATE.labels(self.name).set(STATE_VALUES[state])
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now; a half-open circuit admits a limited number of probes"""
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._transition(STATE_HALF_OPEN)
+            self.probes_in_flight = 0
+
+        if self.state == STATE_HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_max_calls:
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        if self.state == STATE_HALF_OPEN:
+            self.probes_in_flight = 0
+            self._transition(STATE_CLOSED)
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.probes_in_flight = 0
+            self._transition(STATE_OPEN)
+
+    def record_inconclusive(self) -> None:
+        """The call ended without saying anything about the upstream (cancelled, bad output)"""
+        if self.state == STATE_HALF_OPEN and self.probes_in_flight > 0:
+            self.probes_in_flight -= 1
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through"""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(self.retry_in(), 1),
+        }
+
+
+class RetryBudget:
+    """Retries allowed as a fraction of successful calls, shared by all clients"""
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+
+    def record_success(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def record_retries(self, retries: int) -> None:
+        # May go negative: retries already made are paid back by later successes
+        self.tokens = max(-self.burst, self.tokens - retries)
+
+    def exhausted(self) -> bool:
+        return self.tokens < 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"tokens": round(self.tokens, 2), "exhausted": self.exhausted()}
+
+
+class ClientResilience:
+    """Circuit breakers per BAML client plus the global retry budget"""
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        retry_budget_ratio: float,
+        retry_budget_burst: float,
+        no_retry_clients: Dict[str, str],
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.retry_budget = RetryBudget(ratio=retry_budget_ratio, burst=retry_budget_burst)
+        self.no_retry_clients = no_retry_clients
+        self._base_clients = {variant: base for base, variant in no_retry_clients.items()}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Learned from call logs: the client each function is declared with
+        self._function_clients: Dict[str, str] = {}
+
+    def breaker(self, client_name: str) -> CircuitBreaker:
+        client_name = self._base_clients.get(client_name, client_name)
+        breaker = self._breakers.get(client_name)
+        if breaker is None:
+            breaker = self._breakers[client_name] = CircuitBreaker(
+                client_name, self.failure_threshold, self.reset_timeout
+            )
+        return breaker
+
+    def client_for(self, function_name: str) -> Optional[str]:
+        """Client of a function, once one of its calls has been seen"""
+        return self._function_clients.get(function_name)
+
+    def learn_client(self, function_name: str, client_name: str) -> None:
+        self._function_clients.setdefault(function_name, self._base_clients.get(client_name, client_name))
+
+    def acquire(self, function_name: str) -> Optional[CircuitBreaker]:
+        """
+        Admit a call through its client's circuit breaker.
+
+        Raises:
+            ExternalServiceError: The client's circuit is open
+        """
+        client_name = self.client_for(function_name)
+        if client_name is None:
+            return None
+        breaker = self.breaker(client_name)
+        if not breaker.allow_request():
+            LLM_CIRCUIT_REJECTED.labels(client_name).inc()
+            retry_after = max(1, math.ceil(breaker.retry_in()))
+            raise ExternalServiceError(
+                "LLM", f"{client_name} is unavailable, retry in {retry_after}s", retry_after=retry_after
+            )
+        return breaker
+
+    def no_retry_client(self, function_name: str) -> Optional[str]:
+        """No-retry client to use instead of the function's own while the retry budget is empty"""
+        if not self.retry_budget.exhausted():
+            return None
+        client_name = self.client_for(function_name)
+        variant = self.no_retry_clients.get(client_name) if client_name else None
+        if variant is not None:
+            LLM_RETRY_BUDGET_EXHAUSTED.labels(function_name).inc()
+        return variant
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "circuits": {name: breaker.snapshot() for name, breaker in sorted(self._breakers.items())},
+            "retry_budget": self.retry_budget.snapshot(),
+        }
+
+
+# Global resilience state of this worker
+client_resilience = ClientResilience(
+    failure_threshold=settings.llm_circuit_failure_threshold,
+    reset_timeout=settings.llm_circuit_reset_timeout,
+    retry_budget_ratio=settings.llm_retry_budget_ratio,
+    retry_budget_burst=settings.llm_retry_budget_burst,
+    no_retry_clients=settings.llm_no_retry_clients_map,
+)
@@ -15,18 +15,33 @@ from contextlib import asynccontextmanager
 from typing import Dict, Any
 
 from fastapi import FastAPI, Depends, HTTPException, status, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from fastapi.openapi.utils import get_openapi
 from sqlalchemy import text
 
 from app.config import settings
-from app.database import database_manager, init_db, close_db
+from app.database import database_manager, init_db, close_db, pipeline_supported
 from app.exceptions import setup_exception_handlers
 from app.middleware.security import SecurityHeadersMiddleware
 from app.middleware.logging import LoggingMiddleware
 from app.middleware.rate_limiting import RateLimitingMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.tracing import TracingMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.load_shedding import LoadSheddingMiddleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.observability.metrics import render_metrics, mark_process_dead
+from app.observability.tracing import setup_tracing, shutdown_tracing
+from app.observability.profiling import find_profile
+from app.observability.loop_monitor import loop_monitor
+from app.observability.system import system_sampler
+from app.observability.latency import latency_tracker
+from app.observability.load import load_signals
+from app.llm.resilience import client_resilience
+from app.llm.ledger import usage_ledger
+from app.pool_tuning import pool_autotuner
 from app.api.v1.router import api_router
 
 # Configure structured logging
@@ -52,6 +67,9 @@ async def lifespan(app: FastAPI):
     logger.info(f"Debug mode: {settings.debug}")
 
     try:
+        # Start span export before anything can be traced
+        setup_tracing()
+
         # Initialize database
         init_db()
         logger.info("Database initialized successfully")
@@ -66,6 +84,20 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"Database health check failed but continuing startup: {e}")
 
+        # Start batched LLM usage accounting
+        usage_ledger.start()
+
+        # Start background system sampling for /health/deep and /fly/system
+        system_sampler.start()
+
+        # Start measuring event-loop lag
+        if settings.enable_metrics:
+            loop_monitor.start()
+
+        # Start recommending (or applying) pool and threadpool sizes
+        if settings.pool_autotune_enabled:
+            pool_autotuner.start(lambda: database_manager.engine.pool if database_manager.engine else None)
+
         logger.info(f"{settings.project_name} startup complete")
         yield
 
@@ -81,7 +113,13 @@ async def lifespan(app: FastAPI):
     logger.info(f"Shutting down {settings.project_name}...")
 
     try:
+        await pool_autotuner.stop()
+        await loop_monitor.stop()
+        await system_sampler.stop()
+        await usage_ledger.stop()
         close_db()
+        mark_process_dead()
+        shutdown_tracing()
         logger.info("Application shutdown complete")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
@@ -105,9 +143,31 @@ def create_application() -> FastAPI:
     # Setup exception handlers
     setup_exception_handlers(app)
     
-    # Add middleware stack (order matters - reverse order of execution)
-    
-    # 1. CORS middleware (outermost)
+    # Add middleware stack (order matters - the last one added runs first).
+    # Deadlines and load shedding run inside CORS and the security headers, so their
+    # responses carry them.
+
+    # 1. Request deadlines and cancellation of generation on client disconnect (innermost)
+    app.add_middleware(
+        DeadlineMiddleware,
+        route_deadlines=settings.request_deadline_routes_map,
+        max_deadline=settings.request_max_deadline,
+        cancel_on_disconnect=settings.cancel_on_disconnect,
+    )
+
+    # 2. Adaptive load shedding (503 for generation under pool/loop/LLM pressure)
+    if settings.enable_load_shedding:
+        app.add_middleware(
+            LoadSheddingMiddleware,
+            api_prefix=settings.api_v1_str,
+            low_priority_routes=settings.load_shedding_low_priority_routes_list,
+            max_pool_wait=settings.load_shedding_max_pool_wait,
+            max_loop_lag=settings.load_shedding_max_loop_lag,
+            max_llm_in_flight=settings.load_shedding_max_llm_in_flight,
+            retry_after=settings.load_shedding_retry_after,
+        )
+
+    # 3. CORS middleware
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins_list,
@@ -123,11 +183,11 @@ def create_application() -> FastAPI:
             "X-Client-Info",
             "X-Dev-User"
         ],
-        expose_headers=["X-Total-Count", "X-Rate-Limit-Remaining"],
+        expose_headers=["X-Total-Count", "X-Rate-Limit-Remaining", "Retry-After"],
         max_age=3600,  # Cache preflight requests for 1 hour
     )
     
-    # 2. Rate limiting middleware (enabled in production and staging)
+    # 4. Rate limiting middleware (enabled in production and staging)
     if settings.is_production_like:
         app.add_middleware(
             RateLimitingMiddleware,
@@ -135,10 +195,26 @@ def create_application() -> FastAPI:
             window=settings.rate_limit_window
         )
     
-    # 3. Security headers middleware
+    # 5. Security headers middleware
     app.add_middleware(SecurityHeadersMiddleware)
+
+    # 6. Prometheus request metrics
+    if settings.enable_metrics:
+        app.add_middleware(MetricsMiddleware)
+
+    # 7. Distributed tracing (root span per request)
+    if settings.enable_tracing:
+        app.add_middleware(TracingMiddleware)
+
+    # 8. On-demand profiling (X-Profile header)
+    if settings.profiling_enabled:
+        app.add_middleware(
+            ProfilingMiddleware,
+            directory=settings.profiling_dir,
+            interval=settings.profiling_interval,
+        )
     
-    # 4. Request logging middleware (innermost)
+    # 9. Request logging middleware (outermost)
     if settings.debug or settings.log_level.upper() in ["DEBUG", "INFO"]:
         app.add_middleware(LoggingMiddleware)
     
@@ -155,6 +231,18 @@ def create_application() -> FastAPI:
     return app
 
 
+def get_fly_info() -> Dict[str, str]:
+    """Fly.io machine information from the environment"""
+    return {
+        "region": os.getenv("FLY_REGION", "unknown"),
+        "app_name": os.getenv("FLY_APP_NAME", "scuolazoo-fantasy-api"),
+        "instance_id": os.getenv("FLY_ALLOC_ID", "unknown"),
+        "machine_id": os.getenv("FLY_MACHINE_ID", "unknown"),
+        "public_ip": os.getenv("FLY_PUBLIC_IP", "unknown"),
+        "private_ip": os.getenv("FLY_PRIVATE_IP", "unknown")
+    }
+
+
 def setup_health_endpoints(app: FastAPI) -> None:
     """Setup health check and monitoring endpoints"""
     
@@ -178,86 +266,81 @@ def setup_health_endpoints(app: FastAPI) -> None:
     
     @app.get("/health/deep")
     async def deep_health_check():
-        """Comprehensive health check for production monitoring"""
+        """Comprehensive health check for production monitoring (served from the background snapshot)"""
         try:
-            import psutil
+            snapshot = await system_sampler.get()
             
             checks = {}
             all_healthy = True
             
-            # Database check with timeout protection
-            try:
-                db_healthy = database_manager.health_check()
-                checks["database"] = {
-                    "status": "healthy" if db_healthy else "unhealthy",
-                    "connection_mode": "sync_psycopg2",
-                    "timeout_protected": False
-                }
-                if not db_healthy:
-                    all_healthy = False
-            except Exception as e:
-                checks["database"] = {"status": "unhealthy", "error": str(e)}
+            # Database check
+            checks["database"] = {
+                "status": "healthy" if snapshot.db_healthy else "unhealthy",
+                "connection_mode": f"sync_{settings.database_driver}",
+                "pipeline_mode": pipeline_supported(),
+                "timeout_protected": False
+            }
+            if snapshot.db_error:
+                checks["database"]["error"] = snapshot.db_error
+            replicas = database_manager.replica_status()
+            if replicas:
+                checks["database"]["replicas"] = replicas
+            if not snapshot.db_healthy:
+                all_healthy = False
+
+            # Snapshot freshness: a stuck sampler would keep serving its last (healthy) values
+            snapshot_stale = system_sampler.is_stale(snapshot)
+            checks["snapshot"] = {
+                "status": "stale" if snapshot_stale else "healthy",
+                "age_seconds": round(snapshot.age, 3),
+                "stale_after_seconds": system_sampler.stale_after
+            }
+            if snapshot_stale:
                 all_healthy = False
             
             # Memory check
-            try:
-                memory = psutil.virtual_memory()
-                memory_status = "healthy"
-                if memory.percent > 90:
-                    memory_status = "critical"
-                    all_healthy = False
-                elif memory.percent > 80:
-                    memory_status = "warning"
-                
-                checks["memory"] = {
-                    "status": memory_status,
-                    "usage_percent": memory.percent,
-                    "available_mb": round(memory.available / 1024 / 1024, 2)
-                }
-            except Exception as e:
-                checks["memory"] = {"status": "unhealthy", "error": str(e)}
+            memory_status = "healthy"
+            if snapshot.memory_percent > 90:
+                memory_status = "critical"
                 all_healthy = False
+            elif snapshot.memory_percent > 80:
+                memory_status = "warning"
+            
+            checks["memory"] = {
+                "status": memory_status,
+                "usage_percent": snapshot.memory_percent,
+                "available_mb": round(snapshot.memory_available / 1024 / 1024, 2)
+            }
             
             # Disk check
-            try:
-                disk = psutil.disk_usage('/')
-                disk_status = "healthy"
-                if disk.percent > 90:
-                    disk_status = "critical"
-                    all_healthy = False
-                elif disk.percent > 80:
-                    disk_status = "warning"
-                
-                checks["disk"] = {
-                    "status": disk_status,
-                    "usage_percent": disk.percent,
-                    "free_gb": round(disk.free / 1024 / 1024 / 1024, 2)
-                }
-            except Exception as e:
-                checks["disk"] = {"status": "unhealthy", "error": str(e)}
+            disk_status = "healthy"
+            if snapshot.disk_percent > 90:
+                disk_status = "critical"
                 all_healthy = False
+            elif snapshot.disk_percent > 80:
+                disk_status = "warning"
             
-            # Fly.io specific system information
-            fly_info = {
-                "region": os.getenv("FLY_REGION", "unknown"),
-                "app_name": os.getenv("FLY_APP_NAME", "scuolazoo-fantasy-api"),
-                "instance_id": os.getenv("FLY_ALLOC_ID", "unknown"),
-                "machine_id": os.getenv("FLY_MACHINE_ID", "unknown"),
-                "public_ip": os.getenv("FLY_PUBLIC_IP", "unknown"),
-                "private_ip": os.getenv("FLY_PRIVATE_IP", "unknown")
+            checks["disk"] = {
+                "status": disk_status,
+                "usage_percent": snapshot.disk_percent,
+                "free_gb": round(snapshot.disk_free / 1024 / 1024 / 1024, 2)
             }
             
             response_data = {
                 "status": "healthy" if all_healthy else "unhealthy",
                 "timestamp": time.time(),
+                "snapshot_age_seconds": round(snapshot.age, 3),
                 "version": settings.version,
                 "environment": settings.environment,
                 "checks": checks,
-                "system": fly_info,
+                "system": get_fly_info(),
                 "performance": {
-                    "process_count": len(psutil.pids()),
-                    "boot_time": psutil.boot_time()
-                }
+                    "process_count": snapshot.process_count,
+                    "boot_time": snapshot.boot_time
+                },
+                "latency": latency_tracker.summary(),
+                "load": load_signals.snapshot(),
+                "llm": client_resilience.snapshot()
             }
             
             status_code = 200 if all_healthy else 503
@@ -312,55 +395,65 @@ def setup_monitoring_endpoints(app: FastAPI) -> None:
     @app.get("/metrics")
     async def prometheus_metrics():
         """Prometheus metrics endpoint for Fly.io monitoring"""
-        try:
-            from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-            return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
-        except ImportError:
-            # Fallback if prometheus_client is not available
-            return JSONResponse(
-                content={
-                    "error": "Prometheus client not installed",
-                    "message": "Install prometheus-client package for metrics"
-                },
-                status_code=503
-            )
+        content, media_type = render_metrics()
+        return Response(content, media_type=media_type)
+
+    @app.get("/metrics/latency")
+    async def latency_percentiles():
+        """Rolling 1/5/15 minute p50/p95/p99 latency (ms) per route for this worker"""
+        return {
+            "timestamp": time.time(),
+            "pid": os.getpid(),
+            "routes": latency_tracker.summary()
+        }
+
+    if settings.profiling_enabled:
+        @app.get("/debug/profiles/{profile_id}")
+        async def get_profile(profile_id: str):
+            """Download a profile recorded for a request sent with X-Profile"""
+            found = find_profile(settings.profiling_dir, profile_id)
+            if found is None:
+                return JSONResponse(content={"error": "Profile not found"}, status_code=404)
+
+            path, fmt = found
+            media_type = "application/json" if fmt == "speedscope" else "text/plain"
+            return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
     
     @app.get("/fly/system")
     async def fly_system_info():
-        """Fly.io specific system information endpoint"""
-        import psutil
-        
+        """Fly.io specific system information endpoint (served from the background snapshot)"""
         try:
-            # Get system information
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            cpu_percent = psutil.cpu_percent(interval=1)
+            snapshot = await system_sampler.get()
             
             return {
-                "timestamp": time.time(),
-                "fly": {
-                    "region": os.getenv("FLY_REGION", "unknown"),
-                    "app_name": os.getenv("FLY_APP_NAME", "scuolazoo-fantasy-api"),
-                    "instance_id": os.getenv("FLY_ALLOC_ID", "unknown"),
-                    "machine_id": os.getenv("FLY_MACHINE_ID", "unknown"),
-                    "public_ip": os.getenv("FLY_PUBLIC_IP", "unknown"),
-                    "private_ip": os.getenv("FLY_PRIVATE_IP", "unknown")
-                },
+                "timestamp": snapshot.timestamp,
+                "snapshot_age_seconds": round(snapshot.age, 3),
+                "stale": system_sampler.is_stale(snapshot),
+                "fly": get_fly_info(),
                 "system": {
-                    "cpu_percent": cpu_percent,
+                    "cpu_percent": snapshot.cpu_percent,
                     "memory": {
-                        "total_mb": round(memory.total / 1024 / 1024, 2),
-                        "available_mb": round(memory.available / 1024 / 1024, 2),
-                        "percent": memory.percent
+                        "total_mb": round(snapshot.memory_total / 1024 / 1024, 2),
+                        "available_mb": round(snapshot.memory_available / 1024 / 1024, 2),
+                        "percent": snapshot.memory_percent
                     },
                     "disk": {
-                        "total_gb": round(disk.total / 1024 / 1024 / 1024, 2),
-                        "free_gb": round(disk.free / 1024 / 1024 / 1024, 2),
-                        "percent": round((disk.used / disk.total) * 100, 2)
+                        "total_gb": round(snapshot.disk_total / 1024 / 1024 / 1024, 2),
+                        "free_gb": round(snapshot.disk_free / 1024 / 1024 / 1024, 2),
+                        "percent": snapshot.disk_percent
                     },
-                    "processes": len(psutil.pids())
+                    "processes": snapshot.process_count
                 },
-                "database": {"status": "simplified_version"}
+                "database": {
+                    "status": "healthy" if snapshot.db_healthy else "unhealthy",
+                    "pool": {
+                        "size": snapshot.pool_size,
+                        "checked_out": snapshot.pool_checked_out,
+                        "idle": snapshot.pool_idle,
+                        "overflow": snapshot.pool_overflow
+                    },
+                    "autotune": pool_autotuner.snapshot()
+                }
             }
         except Exception as e:
             logger.error(f"System info error: {e}")
@@ -3,9 +3,19 @@
 from .security import SecurityHeadersMiddleware
 from .logging import LoggingMiddleware
 from .rate_limiting import RateLimitingMiddleware
+from .metrics import MetricsMiddleware
+from .tracing import TracingMiddleware
+from .profiling import ProfilingMiddleware
+from .load_shedding import LoadSheddingMiddleware
+from .deadline import DeadlineMiddleware
 
 __all__ = [
     "SecurityHeadersMiddleware",
-    "LoggingMiddleware", 
+    "LoggingMiddleware",
     "RateLimitingMiddleware",
-]
\ No newline at end of file
+    "MetricsMiddleware",
+    "TracingMiddleware",
+    "ProfilingMiddleware",
+    "LoadSheddingMiddleware",
+    "DeadlineMiddleware",
+]
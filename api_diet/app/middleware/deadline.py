@@ -0,0 +1,141 @@
+"""Request deadline and client-disconnect cancellation middleware"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from app.deadline import RequestCancellation, current_cancellation, current_deadline
+from app.observability.context import compile_route_patterns, match_route_pattern, resolve_route_template
+from app.observability.metrics import HTTP_REQUESTS_DISCONNECTED
+
+logger = logging.getLogger(__name__)
+
+# Non-standard status (nginx convention) recorded when the client went away
+CLIENT_CLOSED_REQUEST = 499
+
+
+class DeadlineMiddleware:
+    """
+    Middleware assigning request deadlines and cancelling abandoned work.
+
+    The deadline comes from the ``X-Request-Timeout`` header (seconds, capped
+    at ``max_deadline``) or the per-route default. Requests on the configured
+    routes are also cancelled when the client disconnects, so in-flight BAML
+    calls are aborted instead of running to completion for nobody.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        route_deadlines: Dict[str, float],
+        max_deadline: float,
+        cancel_on_disconnect: bool = True,
+    ):
+        self.app = app
+        self.route_deadlines = route_deadlines
+        self.route_patterns = compile_route_patterns(route_deadlines)
+        self.max_deadline = max_deadline
+        self.cancel_on_disconnect = cancel_on_disconnect
+
+    def _header_timeout(self, scope: Scope) -> Optional[float]:
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-timeout":
+                try:
+                    timeout = float(value.decode("latin-1"))
+                except ValueError:
+                    return None
+                return timeout if timeout > 0 else None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = match_route_pattern(self.route_patterns, scope.get("method", ""), scope.get("path", ""))
+        timeout = self._header_timeout(scope)
+        if route is not None:
+            timeout = min(timeout or self.route_deadlines[route], self.route_deadlines[route])
+        elif timeout is not None:
+            timeout = min(timeout, self.max_deadline)
+
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = current_deadline.set(time.monotonic() + timeout)
+        try:
+            if route is not None and self.cancel_on_disconnect:
+                await self._run_cancellable(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            current_deadline.reset(token)
+
+    async def _run_cancellable(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Run the request in a task that is cancelled if ``http.disconnect`` arrives first"""
+        messages: asyncio.Queue = asyncio.Queue()
+        response_started = False
+
+        async def receive_from_queue() -> Message:
+            return await messages.get()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def listen_for_disconnect() -> None:
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        cancellation = RequestCancellation()
+        token = current_cancellation.set(cancellation)
+        try:
+            app_task = asyncio.create_task(self.app(scope, receive_from_queue, send_wrapper))
+        finally:
+            current_cancellation.reset(token)
+        listener = asyncio.create_task(listen_for_disconnect())
+
+        try:
+            await asyncio.wait({app_task, listener}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            app_task.cancel()
+            listener.cancel()
+            raise
+
+        if app_task.done():
+            listener.cancel()
+            await app_task
+            return
+
+        # Client disconnected while the request was still running
+        route = resolve_route_template(scope)
+        if cancellation.shielded:
+            logger.info(f"Client disconnected from {route}; finishing shielded work")
+            await app_task
+            return
+
+        app_task.cancel()
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            pass
+
+        HTTP_REQUESTS_DISCONNECTED.labels(route).inc()
+        logger.info(
+            f"Client disconnected, cancelled {scope.get('method', '')} {route}",
+            extra={"route": route, "event_type": "request_cancelled"},
+        )
+
+        if not response_started:
+            # Lets outer middleware record the outcome; the server drops it for a closed connection
+            await send({"type": "http.response.start", "status": CLIENT_CLOSED_REQUEST, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
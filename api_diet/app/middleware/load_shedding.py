@@ -0,0 +1,109 @@
+"""Adaptive load shedding middleware"""
+
+import logging
+from typing import Iterable
+
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from app.exceptions import create_error_response
+from app.observability.context import compile_route_patterns, match_route_pattern, resolve_route_template
+from app.observability.load import load_signals
+from app.observability.metrics import HTTP_REQUESTS_SHED
+
+logger = logging.getLogger(__name__)
+
+# Request priorities, shed from the lowest up
+PRIORITY_LOW = 0  # LLM generation
+PRIORITY_NORMAL = 1  # Other writes
+PRIORITY_HIGH = 2  # Reads of existing data
+PRIORITY_CRITICAL = 3  # Health checks, metrics, docs: never shed
+
+PRIORITY_NAMES = {PRIORITY_LOW: "low", PRIORITY_NORMAL: "normal", PRIORITY_HIGH: "high"}
+
+
+class LoadSheddingMiddleware:
+    """
+    Middleware rejecting low-priority requests early with 503 + Retry-After.
+
+    Under elevated load (pool wait, event-loop lag or in-flight LLM calls
+    above their thresholds) generation requests are shed; at twice the pool
+    wait or lag thresholds other writes are shed too. Reads and
+    infrastructure endpoints are always admitted, so they stay fast while
+    the expensive work backs off.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        api_prefix: str,
+        low_priority_routes: Iterable[str],
+        max_pool_wait: float,
+        max_loop_lag: float,
+        max_llm_in_flight: int,
+        retry_after: int,
+    ):
+        self.app = app
+        self.api_prefix = api_prefix
+        self.low_priority_routes = compile_route_patterns(low_priority_routes)
+        self.max_pool_wait = max_pool_wait
+        self.max_loop_lag = max_loop_lag
+        self.max_llm_in_flight = max_llm_in_flight
+        self.retry_after = retry_after
+
+    def _priority(self, method: str, path: str) -> int:
+        if not path.startswith(self.api_prefix):
+            return PRIORITY_CRITICAL
+        if match_route_pattern(self.low_priority_routes, method, path):
+            return PRIORITY_LOW
+        if method in ("GET", "HEAD", "OPTIONS"):
+            return PRIORITY_HIGH
+        return PRIORITY_NORMAL
+
+    def _admission_floor(self) -> int:
+        """Lowest priority admitted under the current load"""
+        pool_wait = load_signals.pool_wait.value()
+        loop_lag = load_signals.loop_lag.value()
+
+        if pool_wait > 2 * self.max_pool_wait or loop_lag > 2 * self.max_loop_lag:
+            return PRIORITY_HIGH
+        if (
+            pool_wait > self.max_pool_wait
+            or loop_lag > self.max_loop_lag
+            or load_signals.llm_in_flight >= self.max_llm_in_flight
+        ):
+            return PRIORITY_NORMAL
+        return PRIORITY_LOW
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        floor = self._admission_floor()
+        if floor == PRIORITY_LOW:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        priority = self._priority(method, scope.get("path", ""))
+
+        if priority >= floor:
+            await self.app(scope, receive, send)
+            return
+
+        route = resolve_route_template(scope)
+        HTTP_REQUESTS_SHED.labels(route, PRIORITY_NAMES[priority]).inc()
+        signals = load_signals.snapshot()
+        logger.warning(
+            f"Shedding {method} {route} ({PRIORITY_NAMES[priority]} priority) under load: {signals}",
+            extra={"route": route, "method": method, "event_type": "load_shed", **signals},
+        )
+
+        response = create_error_response(
+            status_code=503,
+            message="Server is overloaded, please retry later",
+            error_code="SERVICE_OVERLOADED",
+            details={"retry_after": self.retry_after},
+        )
+        response.headers["Retry-After"] = str(self.retry_after)
+        await response(scope, receive, send)
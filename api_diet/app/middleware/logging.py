@@ -7,6 +7,8 @@ import json
 from typing import Any, Dict
 from starlette.types import ASGIApp, Scope, Receive, Send, Message
 
+from app.observability.context import current_request_id
+
 logger = logging.getLogger(__name__)
 
 
@@ -70,7 +72,11 @@ class LoggingMiddleware:
             await send(message)
         
         # Process request
-        await self.app(scope, receive, send_wrapper)
+        request_id_token = current_request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_id.reset(request_id_token)
         
         # Calculate processing time
         process_time = time.time() - start_time
@@ -0,0 +1,58 @@
+"""Request metrics middleware"""
+
+import time
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from app.observability.context import RequestStats, current_request_stats, resolve_route_template
+from app.observability.query_budget import report_query_budget
+from app.observability.latency import latency_tracker
+from app.observability.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_PROGRESS,
+    DB_QUERIES_PER_REQUEST,
+    DB_QUERY_TIME_PER_REQUEST,
+)
+
+
+class MetricsMiddleware:
+    """Middleware to record per-route latency, in-flight requests and DB usage (with query budget warnings)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        route = resolve_route_template(scope)
+        stats = RequestStats(route)
+        token = current_request_stats.set(stats)
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start_time = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            process_time = time.perf_counter() - start_time
+            in_progress.dec()
+            current_request_stats.reset(token)
+
+            # Routing has run by now, so the template is exact even for nested routers
+            route = resolve_route_template(scope)
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(process_time)
+            latency_tracker.record(method, route, process_time)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.query_count)
+            DB_QUERY_TIME_PER_REQUEST.labels(route).observe(stats.query_time)
+            report_query_budget(method, route, stats)
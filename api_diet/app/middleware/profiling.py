@@ -0,0 +1,80 @@
+"""On-demand request profiling middleware"""
+
+import asyncio
+import logging
+import threading
+import uuid
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from app.observability.context import current_request_id
+from app.observability.profiling import PROFILE_FORMATS, SamplingProfiler, is_valid_profile_id, save_profile
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """
+    Middleware profiling requests that carry an ``X-Profile`` header.
+
+    ``X-Profile: 1`` (or ``speedscope``) stores a speedscope profile,
+    ``X-Profile: collapsed`` stores collapsed stacks. The profile id (the
+    request id when available) is returned in the ``X-Profile-Id`` header.
+    Only one request is profiled at a time; others get ``X-Profile-Status: busy``.
+    """
+
+    def __init__(self, app: ASGIApp, directory: str, interval: float):
+        self.app = app
+        self.directory = directory
+        self.interval = interval
+        self._busy = threading.Lock()
+
+    @staticmethod
+    def _requested_format(scope: Scope):
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                value = value.decode("latin-1").strip().lower()
+                if value in ("1", "true"):
+                    return "speedscope"
+                return value if value in PROFILE_FORMATS else None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        fmt = self._requested_format(scope)
+        if fmt is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not self._busy.acquire(blocking=False):
+            async def send_busy(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-status", b"busy")]
+                await send(message)
+
+            await self.app(scope, receive, send_busy)
+            return
+
+        request_id = current_request_id.get()
+        profile_id = request_id if request_id and is_valid_profile_id(request_id) else str(uuid.uuid4())
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval, thread_ids=[threading.get_ident()])
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            self._busy.release()
+            name = f"{scope.get('method', '')} {scope.get('path', '')}"
+            try:
+                path = await asyncio.to_thread(save_profile, profiler, self.directory, profile_id, fmt, name)
+                logger.info(f"Profile {profile_id} for {name} saved to {path} ({profiler.sample_count} samples)")
+            except Exception as e:
+                logger.error(f"Failed to save profile {profile_id}: {e}")
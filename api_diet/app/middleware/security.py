@@ -1,84 +1,116 @@
 """Security middleware for adding security headers"""
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Dict, Any
+from typing import FrozenSet, List, Tuple
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
 from app.config import settings
 
+RawHeaders = List[Tuple[bytes, bytes]]
+
+# Paths that serve the interactive documentation
+DOCS_PATHS = frozenset({"/docs", "/redoc", "/openapi.json"})
+
+# Base security headers
+BASE_SECURITY_HEADERS = {
+    # XSS Protection
+    "X-XSS-Protection": "1; mode=block",
+
+    # Content Type Options
+    "X-Content-Type-Options": "nosniff",
+
+    # Frame Options
+    "X-Frame-Options": "DENY",
+
+    # Referrer Policy
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+
+    # HSTS (HTTPS only)
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+
+    # Permissions Policy (disable unnecessary features)
+    "Permissions-Policy": (
+        "geolocation=(), "
+        "microphone=(), "
+        "camera=(), "
+        "payment=(), "
+        "usb=(), "
+        "magnetometer=(), "
+        "gyroscope=(), "
+        "fullscreen=()"
+    ),
+
+    # Custom security headers
+    "X-API-Version": "1.0.0",
+    "X-Powered-By": "FastAPI",
+}
+
+# Allow external resources for Swagger UI in development
+DOCS_CONTENT_SECURITY_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://unpkg.com; "
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://unpkg.com; "
+    "img-src 'self' data: https://fastapi.tiangolo.com; "
+    "font-src 'self' https://cdn.jsdelivr.net https://unpkg.com; "
+    "connect-src 'self'; "
+    "frame-ancestors 'none'"
+)
+
+# Restrictive CSP for API endpoints
+API_CONTENT_SECURITY_POLICY = (
+    "default-src 'none'; "
+    "frame-ancestors 'none'; "
+    "upgrade-insecure-requests"
+)
+
+
+def _encode_headers(csp: str) -> RawHeaders:
+    """Encode the security headers as raw ASGI header tuples"""
+    headers = dict(BASE_SECURITY_HEADERS, **{"Content-Security-Policy": csp})
+    return [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in headers.items()
+    ]
+
+
+class SecurityHeadersMiddleware:
+    """
+    Pure ASGI middleware to add security headers to all responses.
+
+    The header blocks are encoded once at startup; per request the middleware
+    only swaps them into the ``http.response.start`` message, so it adds no
+    task or stream overhead and leaves streaming responses untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.api_headers: RawHeaders = _encode_headers(API_CONTENT_SECURITY_POLICY)
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Middleware to add security headers to all responses"""
-    
-    @staticmethod
-    def get_security_headers(request: Request) -> Dict[str, str]:
-        """Get security headers dictionary based on request path and environment"""
-        
-        # Check if this is a documentation endpoint
-        is_docs_endpoint = request.url.path in ["/docs", "/redoc", "/openapi.json"]
-        
-        # Base security headers
-        headers = {
-            # XSS Protection
-            "X-XSS-Protection": "1; mode=block",
-            
-            # Content Type Options
-            "X-Content-Type-Options": "nosniff",
-            
-            # Frame Options
-            "X-Frame-Options": "DENY",
-            
-            # Referrer Policy
-            "Referrer-Policy": "strict-origin-when-cross-origin",
-            
-            # HSTS (HTTPS only)
-            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
-            
-            # Permissions Policy (disable unnecessary features)
-            "Permissions-Policy": (
-                "geolocation=(), "
-                "microphone=(), "
-                "camera=(), "
-                "payment=(), "
-                "usb=(), "
-                "magnetometer=(), "
-                "gyroscope=(), "
-                "fullscreen=()"
-            ),
-            
-            # Custom security headers
-            "X-API-Version": "1.0.0",
-            "X-Powered-By": "FastAPI",
-        }
-        
         # Content Security Policy based on endpoint and environment
-        if is_docs_endpoint and settings.debug:
-            # Allow external resources for Swagger UI in development
-            headers["Content-Security-Policy"] = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://unpkg.com; "
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://unpkg.com; "
-                "img-src 'self' data: https://fastapi.tiangolo.com; "
-                "font-src 'self' https://cdn.jsdelivr.net https://unpkg.com; "
-                "connect-src 'self'; "
-                "frame-ancestors 'none'"
-            )
+        if settings.debug:
+            self.docs_headers: RawHeaders = _encode_headers(DOCS_CONTENT_SECURITY_POLICY)
         else:
-            # Restrictive CSP for API endpoints
-            headers["Content-Security-Policy"] = (
-                "default-src 'none'; "
-                "frame-ancestors 'none'; "
-                "upgrade-insecure-requests"
-            )
-        
-        return headers
-    
-    async def dispatch(self, request: Request, call_next) -> Response:
-        """Add security headers to all responses"""
-        response = await call_next(request)
-        
-        # Add all security headers based on request context
-        security_headers = self.get_security_headers(request)
-        for header_name, header_value in security_headers.items():
-            response.headers[header_name] = header_value
-        
-        return response
\ No newline at end of file
+            self.docs_headers = self.api_headers
+
+        self.header_names: FrozenSet[bytes] = frozenset(name for name, _ in self.api_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        security_headers = (
+            self.docs_headers if scope.get("path") in DOCS_PATHS else self.api_headers
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Security headers replace any value set by the handler
+                headers = [
+                    header for header in message.get("headers", [])
+                    if header[0].lower() not in self.header_names
+                ]
+                headers.extend(security_headers)
+                message["headers"] = headers
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
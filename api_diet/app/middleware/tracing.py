@@ -0,0 +1,52 @@
+"""Request tracing middleware"""
+
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from app.observability.context import current_request_id, resolve_route_template
+from app.observability.tracing import SPAN_KIND_SERVER, STATUS_ERROR, parse_traceparent, tracer
+
+
+class TracingMiddleware:
+    """Middleware opening the root server span of every request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        headers = dict(scope.get("headers", []))
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+
+        # Prefer the id generated by LoggingMiddleware, fall back to the caller's header
+        request_id = current_request_id.get() or headers.get(b"x-request-id", b"").decode("latin-1") or None
+
+        with tracer.span(
+            f"{method} {scope.get('path', '')}",
+            kind=SPAN_KIND_SERVER,
+            attributes={"http.request.method": method, "url.path": scope.get("path", "")},
+            parent=parse_traceparent(traceparent),
+        ) as span:
+            assert span is not None
+            span.set_attribute("request.id", request_id)
+            trace_id_header = (b"x-trace-id", span.trace_id.encode())
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    span.set_attribute("http.response.status_code", status_code)
+                    if status_code >= 500:
+                        span.status_code = STATUS_ERROR
+                    message["headers"] = list(message.get("headers", [])) + [trace_id_header]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Routing has run by now, so name the span after the route template
+                route = resolve_route_template(scope)
+                span.name = f"{method} {route}"
+                span.set_attribute("http.route", route)
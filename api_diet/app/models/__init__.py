@@ -15,6 +15,8 @@ from app.models.diet import (
     UserSettings,
     MealType
 )
+from app.models.usage import LLMUsage
+from app.models.idempotency import IdempotencyKey
 
 # Export all models
 __all__ = [
@@ -27,5 +29,7 @@ __all__ = [
     "GroceryList",
     "GroceryListItem",
     "UserSettings",
-    "MealType"
+    "MealType",
+    "LLMUsage",
+    "IdempotencyKey",
 ]
\ No newline at end of file
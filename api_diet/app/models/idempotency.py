@@ -0,0 +1,28 @@
+"""Idempotency key models"""
+
+from datetime import datetime
+from typing import Any, Dict
+from sqlalchemy import String, DateTime, ForeignKey, Index, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class IdempotencyKey(Base):
+    """Client-supplied Idempotency-Key mapped to the diet it created and the response sent"""
+    __tablename__ = "idempotency_keys"
+
+    # Keys are scoped per user; no foreign key so header-only users work like elsewhere
+    user_id: Mapped[str] = mapped_column(String, primary_key=True, nullable=False)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True, nullable=False)
+    diet_id: Mapped[str] = mapped_column(
+        String, ForeignKey("weekly_diets.id", ondelete="CASCADE"), nullable=False
+    )
+    response: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    # Table constraints
+    __table_args__ = (
+        Index('idx_idempotency_keys_expires_at', 'expires_at'),
+    )
@@ -0,0 +1,42 @@
+"""LLM usage accounting models"""
+
+from datetime import datetime
+from sqlalchemy import (
+    String,
+    Integer,
+    Float,
+    Boolean,
+    DateTime,
+    CheckConstraint,
+    Index,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class LLMUsage(Base):
+    """One BAML function call with its token usage, latency and cost"""
+    __tablename__ = "llm_usage"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, nullable=False)
+    # No foreign key: usage is written in batches and must not fail for unknown users
+    user_id: Mapped[str] = mapped_column(String, nullable=True)
+    function_name: Mapped[str] = mapped_column(String, nullable=False)
+    client_name: Mapped[str] = mapped_column(String, nullable=True)
+    model: Mapped[str] = mapped_column(String, nullable=True)
+    input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    latency_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    retries: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    success: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    # Table constraints
+    __table_args__ = (
+        CheckConstraint('input_tokens >= 0 AND output_tokens >= 0', name='chk_llm_usage_positive_tokens'),
+        Index('idx_llm_usage_created_at', 'created_at'),
+        Index('idx_llm_usage_user_created', 'user_id', 'created_at'),
+        Index('idx_llm_usage_function_created', 'function_name', 'created_at'),
+    )
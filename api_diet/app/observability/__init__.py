@@ -0,0 +1,20 @@
+"""Observability package - metrics, tracing and request-scoped instrumentation"""
+
+from .context import RequestStats, current_request_stats, current_request_id, resolve_route_template
+from .metrics import instrument_engine, render_metrics, mark_process_dead
+from .tracing import tracer, traced, trace_engine, setup_tracing, shutdown_tracing
+
+__all__ = [
+    "RequestStats",
+    "current_request_stats",
+    "current_request_id",
+    "resolve_route_template",
+    "instrument_engine",
+    "render_metrics",
+    "mark_process_dead",
+    "tracer",
+    "traced",
+    "trace_engine",
+    "setup_tracing",
+    "shutdown_tracing",
+]
@@ -0,0 +1,119 @@
+"""Request-scoped monitoring context shared by middleware, database hooks and services"""
+
+import re
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Iterable, List, Optional, Pattern, Tuple
+
+from starlette.routing import Match
+from starlette.types import Scope
+
+from app.observability.query_budget import fingerprint
+
+# Label used when a request does not match any route (keeps label cardinality bounded)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    """Mutable per-request counters filled in by the database instrumentation"""
+
+    __slots__ = ("route", "query_count", "query_time", "statements")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.query_count = 0
+        self.query_time = 0.0
+        self.statements: Counter = Counter()
+
+    def record_query(self, statement: str, duration: float) -> None:
+        """Account one executed SQL statement"""
+        self.query_count += 1
+        self.query_time += duration
+        self.statements[fingerprint(statement)] += 1
+
+
+# Set by MetricsMiddleware for the duration of a request. Starlette copies the
+# context into the threadpool, so sync endpoints and dependencies see the same object.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+# Set by LoggingMiddleware so the generated request id can be attached to traces
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+
+
+def _route_template(route: Any, path: str) -> str:
+    """
+    Template of the matched route (``path_format``), or the raw path for a route without one.
+
+    Routes of included routers may carry their template without the routers'
+    prefixes; those are static, so they are taken from the leading segments
+    of the path.
+    """
+    template = getattr(route, "path_format", None)
+    if not isinstance(template, str):
+        return path
+
+    segments = path.split("/")
+    return "/".join(segments[: max(1, len(segments) - template.count("/"))]) + template
+
+
+def compile_route_patterns(routes: Iterable[str]) -> List[Tuple[str, Pattern[str], str]]:
+    """
+    Compile ``"METHOD /path/{param}"`` entries for matching raw request paths.
+
+    Returns:
+        ``(method, path regex, entry)`` tuples
+    """
+    compiled = []
+    for entry in routes:
+        method, _, template = entry.strip().partition(" ")
+        pattern = re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(template.strip()))
+        compiled.append((method.upper(), re.compile(f"^{pattern}$"), entry.strip()))
+    return compiled
+
+
+def match_route_pattern(
+    patterns: List[Tuple[str, Pattern[str], str]], method: str, path: str
+) -> Optional[str]:
+    """Return the entry matching the request, if any"""
+    for route_method, pattern, entry in patterns:
+        if method == route_method and pattern.match(path):
+            return entry
+    return None
+
+
+def resolve_route_template(scope: Scope) -> str:
+    """
+    Return the route template (e.g. ``/api/v1/diet/{diet_id}``) for a request.
+
+    After routing the template is the ``path_format`` of the route the router
+    stored in the scope; before routing the application routes are matched
+    the same way the router does.
+    """
+    path = scope.get("path", "")
+
+    if "endpoint" in scope or "route" in scope:
+        return _route_template(scope.get("route"), path)
+
+    router = getattr(scope.get("app"), "router", None)
+    if router is None:
+        return UNMATCHED_ROUTE
+
+    partial_match: Optional[str] = None
+    for candidate in router.routes:
+        match, child_scope = candidate.matches(scope)
+        if match == Match.NONE:
+            continue
+        if "endpoint" not in child_scope and "route" not in child_scope:
+            # Nested router that only resolves the endpoint while handling
+            continue
+
+        template = _route_template(child_scope.get("route"), path)
+        if match == Match.FULL:
+            return template
+        if partial_match is None:
+            # Path matched but method did not (405)
+            partial_match = template
+
+    return partial_match or UNMATCHED_ROUTE
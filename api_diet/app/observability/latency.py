@@ -0,0 +1,135 @@
+"""
+In-process rolling latency percentiles per route.
+
+Each route keeps one histogram per minute for the last 15 minutes. Buckets
+are log-spaced (HDR-histogram style) with a fixed relative precision, so
+memory per route is constant regardless of traffic and percentiles are
+accurate to about ``PRECISION``. The 1, 5 and 15 minute windows are built
+by merging the most recent minute histograms.
+
+Values are per worker process; every worker reports its own traffic.
+"""
+
+import math
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# Recorded range and precision (values outside the range are clamped)
+MIN_LATENCY = 0.0001  # 0.1 ms
+MAX_LATENCY = 600.0  # 10 minutes
+PRECISION = 0.025  # Relative bucket width
+
+_LOG_GROWTH = math.log1p(PRECISION)
+BUCKET_COUNT = int(math.ceil(math.log(MAX_LATENCY / MIN_LATENCY) / _LOG_GROWTH)) + 1
+
+SLOT_SECONDS = 60
+WINDOWS = {"1m": 1, "5m": 5, "15m": 15}
+SLOT_COUNT = max(WINDOWS.values())
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+def _bucket_index(value: float) -> int:
+    if value <= MIN_LATENCY:
+        return 0
+    index = int(math.log(value / MIN_LATENCY) / _LOG_GROWTH) + 1
+    return min(index, BUCKET_COUNT - 1)
+
+
+def _bucket_value(index: int) -> float:
+    """Representative value (geometric middle) of a bucket"""
+    if index == 0:
+        return MIN_LATENCY
+    return MIN_LATENCY * math.exp((index - 0.5) * _LOG_GROWTH)
+
+
+class RouteLatency:
+    """Ring of per-minute log-bucketed histograms for one route"""
+
+    __slots__ = ("slots", "slot_minutes")
+
+    def __init__(self):
+        self.slots: List[array] = [array("I", [0]) * BUCKET_COUNT for _ in range(SLOT_COUNT)]
+        self.slot_minutes: List[int] = [-1] * SLOT_COUNT
+
+    def record(self, duration: float, minute: int) -> None:
+        slot = minute % SLOT_COUNT
+        if self.slot_minutes[slot] != minute:
+            # Slot holds an older minute: start it over
+            self.slots[slot] = array("I", [0]) * BUCKET_COUNT
+            self.slot_minutes[slot] = minute
+        self.slots[slot][_bucket_index(duration)] += 1
+
+    def window(
+        self, minutes: int, now_minute: int, percentiles: Dict[str, float] = PERCENTILES
+    ) -> Optional[Dict[str, float]]:
+        """Count and percentiles (milliseconds) over the last ``minutes`` minutes"""
+        selected = [
+            self.slots[slot]
+            for slot, slot_minute in enumerate(self.slot_minutes)
+            if slot_minute >= 0 and now_minute - slot_minute < minutes
+        ]
+        if not selected:
+            return None
+
+        merged = [sum(counts) for counts in zip(*selected)]
+        total = sum(merged)
+        if total == 0:
+            return None
+
+        result: Dict[str, float] = {"count": total}
+        targets: List[Tuple[str, float]] = sorted(
+            ((name, q * total) for name, q in percentiles.items()), key=lambda item: item[1]
+        )
+        seen = 0
+        target_index = 0
+        for i, count in enumerate(merged):
+            if not count:
+                continue
+            seen += count
+            while target_index < len(targets) and seen >= targets[target_index][1]:
+                result[targets[target_index][0]] = round(_bucket_value(i) * 1000, 2)
+                target_index += 1
+            if target_index == len(targets):
+                break
+        return result
+
+
+class LatencyTracker:
+    """Rolling 1/5/15 minute latency percentiles keyed by ``METHOD route``"""
+
+    def __init__(self):
+        self._routes: Dict[str, RouteLatency] = {}
+
+    def record(self, method: str, route: str, duration: float) -> None:
+        """Record one request duration in seconds (called from the event loop)"""
+        key = f"{method} {route}"
+        route_latency = self._routes.get(key)
+        if route_latency is None:
+            route_latency = self._routes[key] = RouteLatency()
+        route_latency.record(duration, int(time.time() // SLOT_SECONDS))
+
+    def quantile(self, method: str, route: str, q: float, minutes: int = SLOT_COUNT) -> Optional[Tuple[int, float]]:
+        """Sample count and the ``q`` quantile in seconds over the last ``minutes``, or None without data"""
+        route_latency = self._routes.get(f"{method} {route}")
+        if route_latency is None:
+            return None
+        window = route_latency.window(minutes, int(time.time() // SLOT_SECONDS), {"q": q})
+        if window is None:
+            return None
+        return int(window["count"]), window["q"] / 1000
+
+    def summary(self) -> Dict[str, Dict[str, Optional[Dict[str, float]]]]:
+        """Per route and window: request count and p50/p95/p99 in milliseconds"""
+        now_minute = int(time.time() // SLOT_SECONDS)
+        summary = {}
+        for key in sorted(self._routes):
+            route_latency = self._routes[key]
+            windows = {name: route_latency.window(minutes, now_minute) for name, minutes in WINDOWS.items()}
+            if windows["15m"] is not None:
+                summary[key] = windows
+        return summary
+
+
+# Global latency tracker instance
+latency_tracker = LatencyTracker()
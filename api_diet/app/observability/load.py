@@ -0,0 +1,65 @@
+"""
+Process-wide load signals used for admission control.
+
+Connection pool wait time and event-loop lag are tracked as exponentially
+weighted moving averages that also decay with time, so a burst of slow
+checkouts raises the signal quickly and an idle period brings it back to
+zero even when nothing new is observed. In-flight BAML calls are counted
+directly.
+"""
+
+import time
+from typing import Dict
+
+
+class DecayingAverage:
+    """EWMA whose value halves every ``half_life`` seconds without new samples"""
+
+    __slots__ = ("alpha", "half_life", "_value", "_updated_at")
+
+    def __init__(self, alpha: float, half_life: float):
+        self.alpha = alpha
+        self.half_life = half_life
+        self._value = 0.0
+        self._updated_at = time.monotonic()
+
+    def value(self) -> float:
+        elapsed = time.monotonic() - self._updated_at
+        return self._value * 0.5 ** (elapsed / self.half_life)
+
+    def observe(self, sample: float) -> None:
+        current = self.value()
+        self._value = current + self.alpha * (sample - current)
+        self._updated_at = time.monotonic()
+
+
+class LoadSignals:
+    """Current pool wait, event-loop lag and in-flight LLM calls of this worker"""
+
+    def __init__(self):
+        self.pool_wait = DecayingAverage(alpha=0.3, half_life=5.0)
+        self.loop_lag = DecayingAverage(alpha=0.3, half_life=5.0)
+        self.llm_in_flight = 0
+
+    def observe_pool_wait(self, duration: float) -> None:
+        self.pool_wait.observe(duration)
+
+    def observe_loop_lag(self, lag: float) -> None:
+        self.loop_lag.observe(lag)
+
+    def llm_call_started(self) -> None:
+        self.llm_in_flight += 1
+
+    def llm_call_finished(self) -> None:
+        self.llm_in_flight -= 1
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "pool_wait_seconds": round(self.pool_wait.value(), 4),
+            "loop_lag_seconds": round(self.loop_lag.value(), 4),
+            "llm_in_flight": self.llm_in_flight,
+        }
+
+
+# Global load signals instance
+load_signals = LoadSignals()
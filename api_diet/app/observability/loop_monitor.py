@@ -0,0 +1,113 @@
+"""
+Event-loop lag monitor.
+
+A background task sleeps for a fixed interval and measures how late it
+wakes up; the difference is the time the loop spent running something
+else and is exported as ``event_loop_lag_seconds``. In debug mode a
+watchdog thread also checks the task's heartbeat: when the loop has not
+come back for longer than the blocking threshold, it logs the event loop
+thread's current stack, i.e. the synchronous code holding the loop.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.config import settings
+from app.observability.load import load_signals
+from app.observability.metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopMonitor:
+    """Measures scheduling lag of the running event loop"""
+
+    def __init__(self, interval: float, block_threshold: float, capture_stacks: bool):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.capture_stacks = capture_stacks
+        self.max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+            lag = max(0.0, loop.time() - scheduled - self.interval)
+            EVENT_LOOP_LAG.observe(lag)
+            load_signals.observe_loop_lag(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.block_threshold:
+                EVENT_LOOP_BLOCKED.inc()
+                if not self.capture_stacks:
+                    logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms")
+
+    def _watch(self) -> None:
+        """Watchdog thread: dump the loop thread's stack once per stall"""
+        reported_heartbeat = None
+        while not self._stopped.wait(self.block_threshold / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.block_threshold or heartbeat == reported_heartbeat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            reported_heartbeat = heartbeat
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                f"Event loop blocked for more than {stalled_for * 1000:.0f}ms, currently at:\n{stack}",
+                extra={"blocked_for": stalled_for, "event_type": "event_loop_blocked"},
+            )
+
+    def start(self) -> None:
+        """Start monitoring the running event loop"""
+        if self._task is not None:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._run(), name="event-loop-monitor")
+
+        if self.capture_stacks:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the monitor task and the watchdog thread"""
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global event-loop monitor (stack capture of blocking code only in debug mode)
+loop_monitor = EventLoopMonitor(
+    interval=settings.event_loop_monitor_interval,
+    block_threshold=settings.event_loop_block_threshold,
+    capture_stacks=settings.debug,
+)
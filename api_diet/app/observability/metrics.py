@@ -0,0 +1,294 @@
+"""
+Prometheus metrics for the Diet Generator API.
+
+All application metrics are defined here so they are registered exactly once.
+Multi-process collection (several uvicorn/gunicorn workers) is enabled by
+pointing the ``PROMETHEUS_MULTIPROC_DIR`` environment variable to an empty,
+writable directory before the workers start; ``render_metrics`` then
+aggregates the samples of every worker.
+"""
+
+import os
+import time
+from typing import Any, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import Engine, event
+
+from app.observability.context import current_request_stats
+
+# Route label of connections checked out outside a request (startup, background tasks)
+BACKGROUND_ROUTE = "background"
+# ConnectionPoolEntry.info key holding (checkout time, route) while a connection is out
+CHECKOUT_INFO_KEY = "checkout"
+
+# Bucket layouts
+REQUEST_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LLM_LATENCY_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0)
+
+# ===========================
+# HTTP
+# ===========================
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+    buckets=REQUEST_LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being processed",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+HTTP_REQUESTS_DISCONNECTED = Counter(
+    "http_requests_disconnected_total",
+    "Requests cancelled because the client disconnected",
+    ["route"],
+)
+HTTP_REQUESTS_SHED = Counter(
+    "http_requests_shed_total",
+    "Requests rejected with 503 by load shedding",
+    ["route", "priority"],
+)
+
+# ===========================
+# Event loop
+# ===========================
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when a loop callback was due and when it ran",
+    buckets=LOOP_LAG_BUCKETS,
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total",
+    "Times the event loop was held past the blocking threshold",
+)
+
+# ===========================
+# Database
+# ===========================
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    ["operation"],
+    buckets=QUERY_LATENCY_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Number of SQL statements executed per HTTP request",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_TIME_PER_REQUEST = Histogram(
+    "db_query_time_per_request_seconds",
+    "Total SQL execution time per HTTP request",
+    ["route"],
+    buckets=REQUEST_LATENCY_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections opened beyond pool_size",
+    multiprocess_mode="livesum",
+)
+DB_POOL_IDLE = Gauge(
+    "db_pool_idle_connections",
+    "Open connections waiting in the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured pool_size (changes when the autotuner applies a new size)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time a connection stays checked out, by the route that held it",
+    ["route"],
+    buckets=QUERY_LATENCY_BUCKETS + (10.0, 30.0, 60.0, 120.0, 300.0),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=QUERY_LATENCY_BUCKETS + (10.0, 30.0),
+)
+DB_READ_SESSIONS = Counter(
+    "db_read_sessions_total",
+    "Read-only sessions by where they were routed",
+    ["target"],  # replica, primary_sticky, primary_no_replica
+)
+
+# ===========================
+# Pool autotuning
+# ===========================
+POOL_AUTOTUNE_RECOMMENDED = Gauge(
+    "pool_autotune_recommended",
+    "Latest autotuner recommendation per setting (pool_size, max_overflow, threadpool)",
+    ["setting"],
+    multiprocess_mode="max",
+)
+POOL_AUTOTUNE_APPLIED = Counter(
+    "pool_autotune_applied_total",
+    "Changes applied by the autotuner per setting",
+    ["setting"],
+)
+
+# ===========================
+# LLM (BAML)
+# ===========================
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds",
+    "BAML function call latency including retries",
+    ["function", "outcome"],
+    buckets=LLM_LATENCY_BUCKETS,
+)
+LLM_CALLS_IN_PROGRESS = Gauge(
+    "llm_calls_in_progress",
+    "BAML function calls currently running",
+    multiprocess_mode="livesum",
+)
+LLM_CALL_RETRIES = Counter(
+    "llm_call_retries_total",
+    "Retries performed by the BAML retry policy",
+    ["function"],
+)
+LLM_CALL_FAILURES = Counter(
+    "llm_call_failures_total",
+    "BAML function calls that failed after all retries",
+    ["function"],
+)
+LLM_HEDGES = Counter(
+    "llm_hedges_total",
+    "Hedged BAML calls by the attempt that returned first (none: both failed)",
+    ["function", "winner"],
+)
+LLM_HEDGES_THROTTLED = Counter(
+    "llm_hedges_throttled_total",
+    "Slow BAML calls not hedged because the hedge budget was exhausted",
+    ["function"],
+)
+LLM_CIRCUIT_STATE = Gauge(
+    "llm_circuit_state",
+    "Circuit breaker state per BAML client (0 closed, 1 half-open, 2 open)",
+    ["client"],
+    multiprocess_mode="max",
+)
+LLM_CIRCUIT_REJECTED = Counter(
+    "llm_circuit_rejected_total",
+    "BAML calls rejected because the client's circuit was open",
+    ["client"],
+)
+LLM_RETRY_BUDGET_EXHAUSTED = Counter(
+    "llm_retry_budget_exhausted_total",
+    "BAML calls sent without retries because the retry budget was empty",
+    ["function"],
+)
+
+# ===========================
+# Single-flight
+# ===========================
+SINGLE_FLIGHT_SHARED = Counter(
+    "single_flight_shared_total",
+    "Callers served by an operation already in flight instead of starting their own",
+    ["operation", "scope"],
+)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Render the current metrics in the Prometheus text format"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop the live gauges of this worker when running in multi-process mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def _statement_operation(statement: str) -> str:
+    """Return the SQL verb of a statement (SELECT, INSERT, ...)"""
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    start = getattr(context, "_query_start_time", None)
+    if start is None:
+        return
+
+    duration = time.perf_counter() - start
+    DB_QUERY_DURATION.labels(_statement_operation(statement)).observe(duration)
+
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.record_query(statement, duration)
+
+
+def update_pool_gauges(pool: Any) -> None:
+    """Refresh the size, idle and overflow gauges (pools without a fixed size have none)"""
+    if not hasattr(pool, "overflow"):
+        return
+    DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+    DB_POOL_IDLE.set(pool.checkedin())
+    DB_POOL_SIZE.set(pool.size())
+
+
+def instrument_engine(engine: Engine, pool: bool = True) -> None:
+    """Attach query and (unless ``pool`` is false) connection pool instrumentation to an engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if not pool:
+        return
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        DB_POOL_CHECKED_OUT.inc()
+        update_pool_gauges(engine.pool)
+        stats = current_request_stats.get()
+        route = stats.route if stats is not None else BACKGROUND_ROUTE
+        connection_record.info[CHECKOUT_INFO_KEY] = (time.perf_counter(), route)
+
+    def on_checkin(dbapi_connection, connection_record) -> None:
+        DB_POOL_CHECKED_OUT.dec()
+        update_pool_gauges(engine.pool)
+        checkout = connection_record.info.pop(CHECKOUT_INFO_KEY, None)
+        if checkout is not None:
+            started, route = checkout
+            DB_POOL_CHECKOUT_DURATION.labels(route).observe(time.perf_counter() - started)
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    update_pool_gauges(engine.pool)
+
+
+def observe_pool_wait(duration: float) -> None:
+    """Record how long a caller waited for a pooled connection"""
+    DB_POOL_WAIT.observe(duration)
@@ -0,0 +1,201 @@
+"""
+On-demand sampling profiler for single requests.
+
+A background thread periodically snapshots the stacks of the event loop
+thread and of the threadpool workers serving sync endpoints. Only samples
+that contain a frame from this project are kept, so idle workers and the
+bare event loop do not show up. Concurrent requests running on the same
+threads are sampled too, so profile on a quiet instance when possible.
+
+Profiles are written as speedscope JSON (https://www.speedscope.app) or as
+collapsed stacks (one ``frame;frame;frame count`` line per unique stack,
+the input format of flamegraph.pl).
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Everything under the api_diet directory (app/ and baml_client/) counts as project code
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Threads running request code besides the event loop
+WORKER_THREAD_PREFIX = "AnyIO worker thread"
+
+PROFILE_FORMATS = ("speedscope", "collapsed")
+PROFILE_EXTENSIONS = {"speedscope": ".speedscope.json", "collapsed": ".collapsed.txt"}
+
+# Profile ids end up in file names
+_PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+Frame = Tuple[str, str, int]  # (function, filename, first line)
+
+
+class SamplingProfiler:
+    """Samples the stacks of selected threads from a background thread"""
+
+    def __init__(self, interval: float, thread_ids: Optional[List[int]] = None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids or [])
+        self.samples: Dict[str, Counter] = {}
+        self.sample_count = 0
+        self.duration = 0.0
+        self._started_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._own_ident: Optional[int] = None
+
+    def _sampled_threads(self) -> Dict[int, str]:
+        names = {}
+        for thread in threading.enumerate():
+            if thread.ident is None or thread.ident == self._own_ident:
+                continue
+            if thread.ident in self.thread_ids or thread.name.startswith(WORKER_THREAD_PREFIX):
+                names[thread.ident] = thread.name
+        return names
+
+    def _sample(self) -> None:
+        threads = self._sampled_threads()
+        frames = sys._current_frames()
+
+        for ident, thread_name in threads.items():
+            frame = frames.get(ident)
+            stack: List[Frame] = []
+            in_project = False
+
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                if code.co_filename.startswith(PROJECT_ROOT) and "site-packages" not in code.co_filename:
+                    in_project = True
+                frame = frame.f_back
+
+            if in_project:
+                stack.reverse()
+                self.samples.setdefault(thread_name, Counter())[tuple(stack)] += 1
+
+        self.sample_count += 1
+
+    def _run(self) -> None:
+        self._own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                logger.debug(f"Profiler sample failed: {e}")
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.perf_counter() - self._started_at
+
+    # ---------------------------
+    # Output formats
+    # ---------------------------
+
+    def to_collapsed(self) -> str:
+        """Collapsed stacks, root first, prefixed with the thread name"""
+        lines = []
+        for thread_name, stacks in self.samples.items():
+            for stack, count in stacks.most_common():
+                frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+                lines.append(f"{thread_name};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, name: str) -> Dict:
+        """Speedscope sampled profile, one profile per thread"""
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict] = []
+        profiles = []
+        # Actual time between samples (sampling is slower than the interval under load)
+        period = self.duration / self.sample_count if self.sample_count else self.interval
+
+        for thread_name, stacks in self.samples.items():
+            samples = []
+            weights = []
+            for stack, count in stacks.items():
+                indices = []
+                for frame in stack:
+                    if frame not in frame_index:
+                        frame_index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    indices.append(frame_index[frame])
+                samples.append(indices)
+                weights.append(count * period)
+
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(self.duration, 6),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            )
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "diet-generator-api",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+def is_valid_profile_id(profile_id: str) -> bool:
+    """Profile ids are used as file names, so only allow a safe character set"""
+    return bool(_PROFILE_ID_PATTERN.match(profile_id))
+
+
+def save_profile(profiler: SamplingProfiler, directory: str, profile_id: str, fmt: str, name: str) -> str:
+    """
+    Write a finished profile to ``directory`` under the given id.
+
+    Returns:
+        Path of the written file
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, profile_id + PROFILE_EXTENSIONS[fmt])
+
+    with open(path, "w", encoding="utf-8") as handle:
+        if fmt == "collapsed":
+            handle.write(profiler.to_collapsed())
+        else:
+            json.dump(profiler.to_speedscope(name), handle)
+
+    return path
+
+
+def find_profile(directory: str, profile_id: str) -> Optional[Tuple[str, str]]:
+    """
+    Locate a stored profile.
+
+    Returns:
+        ``(path, format)`` or ``None`` if no profile exists for the id
+    """
+    if not is_valid_profile_id(profile_id):
+        return None
+
+    for fmt, extension in PROFILE_EXTENSIONS.items():
+        path = os.path.join(directory, profile_id + extension)
+        if os.path.isfile(path):
+            return path, fmt
+    return None
@@ -0,0 +1,126 @@
+"""
+SQL query budget and N+1 detection.
+
+Every statement executed during a request is reduced to a fingerprint
+(literals and bind parameters replaced by ``?``, expanded ``IN`` lists
+collapsed) and counted on the request's ``RequestStats``. When a request
+exceeds the query budget, or runs the same fingerprint too many times,
+a warning lists the most repeated statements.
+
+``count_queries`` offers the same counting for a block of code and backs
+the ``query_budget`` fixture of the test suite.
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterator, List, Tuple
+
+from sqlalchemy import Engine, event
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from app.observability.context import RequestStats
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_PARAMETER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Longest fingerprint kept in warnings
+MAX_FINGERPRINT_LENGTH = 300
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement so executions differing only by parameters compare equal"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _BIND_PARAMETER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PARAMETER_LIST.sub("?, ...", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def repeated_statements(statements: Counter, threshold: int, limit: int = 5) -> List[Tuple[str, int]]:
+    """Most executed fingerprints that ran at least ``threshold`` times"""
+    return [(statement, count) for statement, count in statements.most_common(limit) if count >= threshold]
+
+
+def _format_repeated(repeated: List[Tuple[str, int]]) -> str:
+    return "; ".join(f"{count}x {statement[:MAX_FINGERPRINT_LENGTH]}" for statement, count in repeated)
+
+
+def report_query_budget(method: str, route: str, stats: "RequestStats") -> None:
+    """Warn when a request went over the query budget or repeated a statement (likely N+1)"""
+    repeated = repeated_statements(stats.statements, settings.db_repeated_query_threshold)
+    over_budget = stats.query_count > settings.db_query_budget
+
+    if not over_budget and not repeated:
+        return
+
+    reason = "over query budget" if over_budget else "repeated statements"
+    logger.warning(
+        f"{method} {route} ran {stats.query_count} queries in {stats.query_time:.3f}s ({reason}): "
+        f"{_format_repeated(repeated) or 'no single statement repeated'}",
+        extra={
+            "route": route,
+            "method": method,
+            "query_count": stats.query_count,
+            "query_time": stats.query_time,
+            "query_budget": settings.db_query_budget,
+            "repeated_statements": [{"statement": s, "count": c} for s, c in repeated],
+            "event_type": "query_budget_exceeded",
+        },
+    )
+
+
+class QueryCounter:
+    """Statements executed on an engine while a ``count_queries`` block is active"""
+
+    def __init__(self):
+        self.statements: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return sum(self.statements.values())
+
+    def record(self, statement: str) -> None:
+        with self._lock:
+            self.statements[fingerprint(statement)] += 1
+
+    def describe(self, limit: int = 10) -> str:
+        """Most executed fingerprints, one per line"""
+        return "\n".join(
+            f"  {count}x {statement[:MAX_FINGERPRINT_LENGTH]}"
+            for statement, count in self.statements.most_common(limit)
+        )
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[QueryCounter]:
+    """
+    Count every statement the engine executes inside the block, from any thread.
+
+    Usage:
+        with count_queries(database_manager.engine) as counter:
+            client.get("/api/v1/diet/list")
+        assert counter.count <= 5, counter.describe()
+    """
+    counter = QueryCounter()
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        counter.record(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
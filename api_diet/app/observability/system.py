@@ -0,0 +1,161 @@
+"""
+Background system metrics sampler.
+
+CPU, memory, disk, process count, connection pool usage and database
+health are collected periodically in a worker thread and published as an
+immutable ``SystemSnapshot``. ``/health/deep`` and ``/fly/system`` serve
+the latest snapshot, so probes never block the event loop or hit the
+database themselves. A snapshot older than a few intervals means sampling
+is stuck (e.g. on a hanging database check); it is reported as stale
+rather than served as current.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import psutil
+
+from app.config import settings
+from app.database import database_manager
+
+logger = logging.getLogger(__name__)
+
+# Sampling intervals after which a snapshot is stale
+STALE_AFTER_INTERVALS = 3
+
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """Point-in-time view of the host, the connection pool and database health"""
+
+    timestamp: float
+    cpu_percent: float
+    memory_total: int
+    memory_available: int
+    memory_percent: float
+    disk_total: int
+    disk_free: int
+    disk_percent: float
+    process_count: int
+    boot_time: float
+    db_healthy: bool
+    db_error: Optional[str]
+    pool_size: Optional[int]
+    pool_checked_out: Optional[int]
+    pool_overflow: Optional[int]
+    pool_idle: Optional[int]
+    collection_time: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was taken"""
+        return time.time() - self.timestamp
+
+
+def collect_snapshot() -> SystemSnapshot:
+    """Collect a snapshot synchronously (blocking; run it off the event loop)"""
+    start_time = time.perf_counter()
+
+    # Non-blocking: CPU usage since the previous call
+    cpu_percent = psutil.cpu_percent(interval=None)
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage("/")
+
+    db_error = None
+    try:
+        db_healthy = database_manager.health_check()
+    except Exception as e:
+        db_healthy = False
+        db_error = str(e)
+
+    pool_size = pool_checked_out = pool_overflow = pool_idle = None
+    engine = database_manager.engine
+    if engine is not None:
+        pool = engine.pool
+        try:
+            pool_size = pool.size()
+            pool_checked_out = pool.checkedout()
+            pool_overflow = max(0, pool.overflow())
+            pool_idle = pool.checkedin()
+        except AttributeError:
+            # Pools without a fixed size (NullPool) do not report these
+            pass
+
+    return SystemSnapshot(
+        timestamp=time.time(),
+        cpu_percent=cpu_percent,
+        memory_total=memory.total,
+        memory_available=memory.available,
+        memory_percent=memory.percent,
+        disk_total=disk.total,
+        disk_free=disk.free,
+        disk_percent=round((disk.used / disk.total) * 100, 2) if disk.total else 0.0,
+        process_count=len(psutil.pids()),
+        boot_time=psutil.boot_time(),
+        db_healthy=db_healthy,
+        db_error=db_error,
+        pool_size=pool_size,
+        pool_checked_out=pool_checked_out,
+        pool_overflow=pool_overflow,
+        pool_idle=pool_idle,
+        collection_time=time.perf_counter() - start_time,
+    )
+
+
+class SystemSampler:
+    """Refreshes a shared ``SystemSnapshot`` from a background task"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stale_after = interval * STALE_AFTER_INTERVALS
+        self._snapshot: Optional[SystemSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        # Prime the CPU counter so the first snapshot has a meaningful value
+        psutil.cpu_percent(interval=None)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self._snapshot = await asyncio.to_thread(collect_snapshot)
+            except Exception as e:
+                logger.error(f"System sampling failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start periodic sampling on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="system-sampler")
+
+    async def stop(self) -> None:
+        """Stop periodic sampling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_stale(self, snapshot: SystemSnapshot) -> bool:
+        """Check if the snapshot is too old to describe the current state"""
+        return snapshot.age > self.stale_after
+
+    async def get(self) -> SystemSnapshot:
+        """
+        Latest snapshot.
+
+        Collected on demand before the first sample exists, and when sampling
+        is not running (e.g. outside the app's lifespan) and the last one is stale.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or (self._task is None and self.is_stale(snapshot)):
+            snapshot = await asyncio.to_thread(collect_snapshot)
+            self._snapshot = snapshot
+        return snapshot
+
+
+# Global system sampler instance
+system_sampler = SystemSampler(interval=settings.system_sample_interval)
@@ -0,0 +1,501 @@
+"""
+Request-scoped tracing for the Diet Generator API.
+
+Spans are kept in a context variable, so they follow the request through
+``await``, ``asyncio`` tasks and Starlette's threadpool without being passed
+around explicitly. Finished spans are queued and exported in batches by a
+background thread as OTLP/JSON, either appended to a local file (one export
+request per line, readable by the OpenTelemetry collector ``otlpjsonfile``
+receiver) or posted to an OTLP/HTTP collector endpoint.
+
+Tracing is disabled unless ``ENABLE_TRACING`` is set; in that case every
+helper here returns immediately without allocating spans.
+"""
+
+import abc
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import Engine, event
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Longest SQL statement stored on a span
+MAX_STATEMENT_LENGTH = 2000
+
+
+class Span:
+    """A single timed operation within a trace"""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "name",
+        "kind",
+        "start_time_ns",
+        "end_time_ns",
+        "attributes",
+        "status_code",
+        "status_message",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set one attribute; ``None`` values are skipped"""
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Mark the span as failed with the given exception"""
+        self.status_code = STATUS_ERROR
+        self.status_message = str(exc)[:500]
+        self.attributes["exception.type"] = type(exc).__name__
+
+    def end(self) -> None:
+        """Finish the span and hand it to the exporter"""
+        if self.end_time_ns is not None:
+            return
+        self.end_time_ns = time.time_ns()
+        tracer.on_end(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Serialize the span in OTLP/JSON form"""
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or self.start_time_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Parse a W3C ``traceparent`` header.
+
+    Returns:
+        ``(trace_id, parent_span_id)`` or ``None`` if the header is missing or invalid
+    """
+    if not header:
+        return None
+
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+
+    trace_id, span_id = parts[1].lower(), parts[2].lower()
+    try:
+        int(trace_id, 16)
+        int(span_id, 16)
+    except ValueError:
+        return None
+
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id
+
+
+# ===========================
+# Exporters
+# ===========================
+
+
+class SpanExporter(abc.ABC):
+    """Writes one OTLP/JSON export request"""
+
+    @abc.abstractmethod
+    def export(self, payload: Dict[str, Any]) -> None:
+        """Write one export request"""
+
+    def close(self) -> None:
+        pass
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends each export request as one JSON line to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(payload, separators=(",", ":")))
+            handle.write("\n")
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """Posts each export request to an OTLP/HTTP collector (``/v1/traces``)"""
+
+    def __init__(self, endpoint: str, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        response = self._client.post(self.endpoint, json=payload)
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+# ===========================
+# Tracer
+# ===========================
+
+
+class Tracer:
+    """Creates spans and exports finished ones from a background thread"""
+
+    def __init__(self):
+        self.enabled = False
+        self.dropped = 0
+        self._service_name = ""
+        self._exporter: Optional[SpanExporter] = None
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue()
+        self._export_interval = 5.0
+        self._batch_size = 512
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(
+        self,
+        exporter: SpanExporter,
+        service_name: str,
+        export_interval: float = 5.0,
+        max_queue_size: int = 10000,
+    ) -> None:
+        """Enable tracing and start the export thread"""
+        if self.enabled:
+            return
+
+        self._exporter = exporter
+        self._service_name = service_name
+        self._export_interval = export_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+        self.enabled = True
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Tuple[str, str]] = None,
+    ) -> Optional[Span]:
+        """
+        Start a span as a child of the current one without making it current.
+
+        Args:
+            parent: Explicit ``(trace_id, span_id)`` of a remote parent
+
+        Returns:
+            The new span, or ``None`` when tracing is disabled
+        """
+        if not self.enabled:
+            return None
+
+        if parent is not None:
+            trace_id, parent_span_id = parent
+        else:
+            current = current_span.get()
+            if current is not None:
+                trace_id, parent_span_id = current.trace_id, current.span_id
+            else:
+                trace_id, parent_span_id = f"{random.getrandbits(128):032x}", None
+
+        return Span(name, trace_id, parent_span_id, kind, attributes)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Tuple[str, str]] = None,
+    ) -> Iterator[Optional[Span]]:
+        """Run a block inside a new span that is current for its duration"""
+        span = self.start_span(name, kind, attributes, parent)
+        if span is None:
+            yield None
+            return
+
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            current_span.reset(token)
+            span.end()
+
+    def on_end(self, span: Span) -> None:
+        """Queue a finished span for export, dropping it if the queue is full"""
+        if not self.enabled:
+            return
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        """Export thread: drain the queue every interval or whenever a batch is full"""
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self._export_interval
+
+            while len(batch) < self._batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if stopping:
+                # Drain what is left without waiting
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        batch.append(item)
+
+            if batch:
+                self._export(batch)
+
+    def _export(self, spans: List[Span]) -> None:
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes(
+                            {
+                                "service.name": self._service_name,
+                                "service.version": settings.version,
+                                "deployment.environment": settings.environment,
+                            }
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "app.observability.tracing"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        try:
+            assert self._exporter is not None
+            self._exporter.export(payload)
+        except Exception as e:
+            logger.warning(f"Failed to export {len(spans)} spans: {e}")
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Flush queued spans and stop the export thread"""
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                logger.warning("Span queue full at shutdown; remaining spans are dropped")
+            self._thread.join(timeout)
+            self._thread = None
+
+        if self._exporter is not None:
+            self._exporter.close()
+            self._exporter = None
+
+
+# Global tracer instance
+tracer = Tracer()
+
+# Span currently active in this request/task
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def setup_tracing() -> None:
+    """Configure the global tracer from settings (no-op unless tracing is enabled)"""
+    if not settings.enable_tracing:
+        return
+
+    if settings.tracing_otlp_endpoint:
+        exporter: SpanExporter = OTLPHttpSpanExporter(settings.tracing_otlp_endpoint)
+        target = settings.tracing_otlp_endpoint
+    else:
+        exporter = FileSpanExporter(settings.tracing_file_path)
+        target = settings.tracing_file_path
+
+    tracer.configure(
+        exporter,
+        service_name=settings.tracing_service_name,
+        export_interval=settings.tracing_export_interval,
+        max_queue_size=settings.tracing_max_queue_size,
+    )
+    logger.info(f"Tracing enabled, exporting spans to {target}")
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop the global tracer"""
+    tracer.shutdown()
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator running a sync or async function inside a span.
+
+    Args:
+        name: Span name, defaults to the function's qualified name (``DietService.create_diet``)
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ===========================
+# Database
+# ===========================
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Only statements issued inside a trace get a span (no orphan root spans)
+    if context is None or not tracer.enabled or current_span.get() is None:
+        return
+
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    context._trace_span = tracer.start_span(
+        f"db {operation}",
+        kind=SPAN_KIND_CLIENT,
+        attributes={
+            "db.system": "postgresql",
+            "db.operation": operation,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            "db.executemany": bool(executemany),
+        },
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    span = getattr(context, "_trace_span", None)
+    if span is None:
+        return
+
+    rowcount = getattr(cursor, "rowcount", -1)
+    if rowcount is not None and rowcount >= 0:
+        span.set_attribute("db.rows", rowcount)
+    span.end()
+    context._trace_span = None
+
+
+def _handle_error(exception_context) -> None:
+    context = exception_context.execution_context
+    span = getattr(context, "_trace_span", None)
+    if span is None:
+        return
+
+    span.record_exception(exception_context.original_exception)
+    span.end()
+    context._trace_span = None
+
+
+def trace_engine(engine: Engine) -> None:
+    """Emit a client span for every SQL statement executed inside a trace"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
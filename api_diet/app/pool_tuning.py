@@ -0,0 +1,259 @@
+"""
+Advisory autotuning of the connection pool and threadpool sizes.
+
+``PoolAutotuner`` samples this worker once per ``interval`` seconds: the
+number of checkouts from the primary pool and the peak number of connections
+checked out since the last sample, and the threadpool that runs sync endpoints and dependencies
+(threads in use, tasks waiting for one). Over the last ``window`` samples
+it recommends:
+
+- ``pool_size``: the 95th percentile of the checked-out peaks, plus headroom
+- ``max_overflow``: what the highest peak needs on top of ``pool_size``, and
+  never less than the overflow the pool was created with, which stays as
+  burst headroom
+- ``threadpool``: the 95th percentile of busy threads plus headroom, and
+  never fewer threads than pooled connections
+
+While the pool or the threadpool is full, the observed demand is capped by
+the current size, so the recommendation grows it by a step instead. A
+window with fewer than ``min_checkouts`` checkouts is too quiet to size
+anything for bursts, so it yields no recommendation.
+
+Recommendations are exported as metrics and in the database status. With
+``apply``, the tuner also resizes the pool and the threadpool limiter,
+within the configured bounds. It then starts a fresh window, so the next
+change is based only on traffic seen at the new sizes.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from anyio import to_thread
+
+from app.config import settings
+from app.observability.metrics import POOL_AUTOTUNE_APPLIED, POOL_AUTOTUNE_RECOMMENDED, update_pool_gauges
+
+logger = logging.getLogger(__name__)
+
+# Capacity kept above the observed demand
+HEADROOM = 1.25
+# Share of samples at full capacity that makes a pool or threadpool count as saturated
+SATURATED_SHARE = 0.05
+# Samples needed before anything is recommended
+MIN_SAMPLES = 30
+
+
+@dataclass
+class UsageSample:
+    """Pool and threadpool usage of one sampling interval"""
+
+    checked_out_peak: Optional[int]  # None when the pool has no fixed size (NullPool)
+    checkouts: Optional[int]
+    pool_capacity: Optional[int]
+    threads_busy: int
+    threads_waiting: int
+    threads_total: int
+
+
+def _percentile(sorted_values: List[int], q: float) -> int:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _step(size: int) -> int:
+    return max(1, math.ceil(size * (HEADROOM - 1)))
+
+
+def _saturated(flags: List[bool]) -> bool:
+    return sum(flags) > SATURATED_SHARE * len(flags)
+
+
+def recommend(
+    samples: List[UsageSample],
+    pool_size: Optional[int],
+    max_overflow: Optional[int],
+    threads: int,
+    min_pool_size: int,
+    min_overflow: int,
+    max_connections: int,
+    min_threads: int,
+    max_threads: int,
+    min_checkouts: int,
+) -> Dict[str, int]:
+    """
+    Recommended ``pool_size``, ``max_overflow`` and ``threadpool`` for the sampled usage.
+
+    Empty when the pool saw fewer than ``min_checkouts`` checkouts over the samples.
+    """
+    recommendation: Dict[str, int] = {}
+    capacity = None
+
+    pool_samples = [s for s in samples if s.checked_out_peak is not None]
+    if pool_samples and sum(s.checkouts or 0 for s in pool_samples) < min_checkouts:
+        return recommendation
+
+    if pool_samples and pool_size is not None and max_overflow is not None:
+        peaks = sorted(s.checked_out_peak for s in pool_samples)
+        typical = math.ceil(_percentile(peaks, 0.95) * HEADROOM)
+        if _saturated([s.checked_out_peak >= s.pool_capacity for s in pool_samples]):
+            capacity = pool_size + max_overflow
+            capacity += _step(capacity)
+            typical = max(typical, pool_size)
+        else:
+            capacity = max(typical, math.ceil(peaks[-1] * HEADROOM))
+        capacity = max(min_pool_size, min(capacity, max_connections))
+        size = max(min_pool_size, min(typical, capacity))
+        # Keep the configured overflow for bursts, unless the connection limit forbids it
+        overflow = max(0, min(max(capacity - size, min_overflow), max_connections - size))
+        capacity = size + overflow
+        recommendation["pool_size"] = size
+        recommendation["max_overflow"] = overflow
+
+    busy = sorted(s.threads_busy for s in samples)
+    if _saturated([s.threads_waiting > 0 for s in samples]):
+        target_threads = threads + _step(threads)
+    else:
+        target_threads = math.ceil(_percentile(busy, 0.95) * HEADROOM)
+    if capacity is not None:
+        # A connection no thread can use is wasted
+        target_threads = max(target_threads, capacity)
+    recommendation["threadpool"] = max(min_threads, min(target_threads, max_threads))
+    return recommendation
+
+
+class PoolAutotuner:
+    """Samples pool and threadpool usage on the event loop and recommends their sizes"""
+
+    def __init__(self, interval: float, window: int, apply: bool):
+        self.interval = interval
+        self.apply = apply
+        self._samples: Deque[UsageSample] = deque(maxlen=window)
+        self._get_pool: Callable[[], Any] = lambda: None
+        self._recommendation: Dict[str, int] = {}
+        self._configured_overflow: Optional[int] = None
+        self._applied_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, get_pool: Callable[[], Any]) -> None:
+        """Start sampling on the running event loop; ``get_pool`` returns the primary pool"""
+        self._get_pool = get_pool
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="pool-autotuner")
+
+    async def stop(self) -> None:
+        """Stop sampling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Pool autotuning failed: {e}")
+
+    def tick(self) -> None:
+        """Take one sample and update the recommendation; runs on the event loop"""
+        pool = self._get_pool()
+        tunable = hasattr(pool, "resize")
+        limiter = to_thread.current_default_thread_limiter()
+        if tunable and self._configured_overflow is None:
+            self._configured_overflow = pool.max_overflow
+
+        self._samples.append(
+            UsageSample(
+                checked_out_peak=pool.take_peak_checked_out() if tunable else None,
+                checkouts=pool.take_checkouts() if tunable else None,
+                pool_capacity=pool.size() + pool.max_overflow if tunable else None,
+                threads_busy=int(limiter.borrowed_tokens),
+                threads_waiting=limiter.statistics().tasks_waiting,
+                threads_total=int(limiter.total_tokens),
+            )
+        )
+        if len(self._samples) < MIN_SAMPLES:
+            return
+
+        recommendation = recommend(
+            list(self._samples),
+            pool_size=pool.size() if tunable else None,
+            max_overflow=pool.max_overflow if tunable else None,
+            threads=int(limiter.total_tokens),
+            min_pool_size=settings.pool_autotune_min_pool_size,
+            min_overflow=self._configured_overflow or 0,
+            max_connections=settings.pool_autotune_max_connections,
+            min_threads=settings.pool_autotune_min_threads,
+            max_threads=settings.pool_autotune_max_threads,
+            min_checkouts=settings.pool_autotune_min_checkouts,
+        )
+        if not recommendation:
+            # Too quiet to tell what a burst needs; keep the current sizes
+            return
+        if recommendation != self._recommendation:
+            logger.info(f"Pool autotuner recommends {recommendation} (current {self._current(pool, limiter)})")
+            for setting, value in recommendation.items():
+                POOL_AUTOTUNE_RECOMMENDED.labels(setting).set(value)
+        self._recommendation = recommendation
+
+        if self.apply and recommendation != self._current(pool, limiter):
+            self._apply(pool, limiter, recommendation)
+
+    def _current(self, pool: Any, limiter: Any) -> Dict[str, int]:
+        current = {"threadpool": int(limiter.total_tokens)}
+        if hasattr(pool, "resize"):
+            current.update({"pool_size": pool.size(), "max_overflow": pool.max_overflow})
+        return current
+
+    def _apply(self, pool: Any, limiter: Any, recommendation: Dict[str, int]) -> None:
+        current = self._current(pool, limiter)
+        if "pool_size" in recommendation:
+            pool.resize(recommendation["pool_size"], recommendation["max_overflow"])
+            update_pool_gauges(pool)
+        limiter.total_tokens = recommendation["threadpool"]
+
+        for setting, value in recommendation.items():
+            if current.get(setting) != value:
+                POOL_AUTOTUNE_APPLIED.labels(setting).inc()
+        logger.warning(f"Pool autotuner resized {current} -> {recommendation}")
+        self._applied_at = time.time()
+        # Samples taken at the old sizes would keep pushing in the same direction
+        self._samples.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current sizes, latest recommendation and sampling state"""
+        latest = self._samples[-1] if self._samples else None
+        return {
+            "enabled": self._task is not None,
+            "apply": self.apply,
+            "samples": len(self._samples),
+            "recommended": self._recommendation,
+            "last_sample": (
+                {
+                    "checked_out_peak": latest.checked_out_peak,
+                    "checkouts": latest.checkouts,
+                    "threads_busy": latest.threads_busy,
+                    "threads_waiting": latest.threads_waiting,
+                    "threads_total": latest.threads_total,
+                }
+                if latest
+                else None
+            ),
+            "applied_at": self._applied_at,
+        }
+
+
+# Global autotuner instance
+pool_autotuner = PoolAutotuner(
+    interval=settings.pool_autotune_interval,
+    window=settings.pool_autotune_window,
+    apply=settings.pool_autotune_apply,
+)
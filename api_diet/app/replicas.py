@@ -0,0 +1,122 @@
+"""
+Read-replica selection with read-your-writes stickiness.
+
+``ReplicaSet`` hands out replicas round-robin and skips one for
+``retry_interval`` seconds after it fails to connect. ``ReadYourWrites``
+remembers, per user, when their last committed write happened; for
+``window`` seconds afterwards that user's reads go to the primary, so a
+replica that has not replayed the write yet never serves them stale data.
+
+Stickiness is tracked per worker: the write and the follow-up read must
+land on the same worker to be guaranteed fresh, so the window should cover
+the replicas' usual replication lag.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Session.info key of the user a session acts for
+SESSION_USER_KEY = "user_id"
+# Session.info key set once the session has flushed changes in its current transaction
+SESSION_WRITES_KEY = "has_writes"
+# Session.info key naming the replica a read session runs on
+SESSION_REPLICA_KEY = "replica"
+
+# Users tracked before expired entries are purged
+MAX_TRACKED_USERS = 100_000
+
+
+class ReadYourWrites:
+    """Per-user window after a write during which reads stay on the primary"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._sticky_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark_write(self, user_id: str) -> None:
+        if self.window <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._sticky_until) >= MAX_TRACKED_USERS:
+                self._sticky_until = {user: until for user, until in self._sticky_until.items() if until > now}
+            self._sticky_until[user_id] = now + self.window
+
+    def is_sticky(self, user_id: Optional[str]) -> bool:
+        if user_id is None:
+            return False
+        until = self._sticky_until.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def tracked(self) -> int:
+        now = time.monotonic()
+        return sum(1 for until in list(self._sticky_until.values()) if until > now)
+
+
+class Replica:
+    """One replica engine, its session factory and its availability"""
+
+    def __init__(self, name: str, engine: Engine, session_factory: sessionmaker):
+        self.name = name
+        self.engine = engine
+        self.session_factory = session_factory
+        self.down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "available": self.available,
+            "retry_in_seconds": round(max(0.0, self.down_until - time.monotonic()), 1),
+            "pool_status": self.engine.pool.status(),
+        }
+
+
+class ReplicaSet:
+    """Round-robin over the replicas that are currently available"""
+
+    def __init__(self, retry_interval: float):
+        self.retry_interval = retry_interval
+        self.replicas: List[Replica] = []
+        self._next = itertools.count()
+
+    def add(self, replica: Replica) -> None:
+        self.replicas.append(replica)
+
+    def pick(self) -> Optional[Replica]:
+        """Next available replica, or None when there is none"""
+        count = len(self.replicas)
+        if count == 0:
+            return None
+        start = next(self._next)
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if replica.available:
+                return replica
+        return None
+
+    def mark_down(self, name: str) -> None:
+        for replica in self.replicas:
+            if replica.name == name and replica.available:
+                replica.down_until = time.monotonic() + self.retry_interval
+                logger.warning(f"Replica {name} failed, reads go elsewhere for {self.retry_interval:.0f}s")
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose()
+        self.replicas = []
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [replica.snapshot() for replica in self.replicas]
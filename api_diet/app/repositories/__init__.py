@@ -7,6 +7,8 @@ from .meal_repository import (
     GroceryListRepository,
     GroceryListItemRepository
 )
+from .usage_repository import LLMUsageRepository
+from .idempotency_repository import IdempotencyKeyRepository
 from .base_repository import BaseRepository
 
 __all__ = [
@@ -19,4 +21,6 @@ __all__ = [
     "MealIngredientRepository",
     "GroceryListRepository",
     "GroceryListItemRepository",
+    "LLMUsageRepository",
+    "IdempotencyKeyRepository",
 ]
\ No newline at end of file
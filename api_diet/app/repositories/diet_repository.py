@@ -26,6 +26,16 @@ class DietRepository(BaseRepository[WeeklyDiet, DietSummary, DietSummary]):
         result = self.db.execute(stmt)
         return list(result.scalars().all())
     
+    def get_latest_diet_id(self, user_id: str) -> Optional[str]:
+        """Get the ID of the user's most recently created diet"""
+        stmt = (
+            select(WeeklyDiet.id)
+            .where(WeeklyDiet.user_id == user_id)
+            .order_by(WeeklyDiet.created_at.desc())
+            .limit(1)
+        )
+        return self.db.execute(stmt).scalar_one_or_none()
+
     def get_with_meals(self, diet_id: str, user_id: str) -> Optional[WeeklyDiet]:
         """Get diet with all meals and ingredients"""
         stmt = (
@@ -72,9 +82,10 @@ class DietRepository(BaseRepository[WeeklyDiet, DietSummary, DietSummary]):
         diet_id: str,
         start_date: date,
         end_date: date,
-        name: str
+        name: str,
+        flush: bool = True,
     ) -> WeeklyDiet:
-        """Create a new weekly diet"""
+        """Create a new weekly diet; with ``flush=False`` it is inserted by the next flush"""
         weekly = WeeklyDiet(
             id=diet_id,
             user_id=user_id,
@@ -83,7 +94,8 @@ class DietRepository(BaseRepository[WeeklyDiet, DietSummary, DietSummary]):
             name=name,
         )
         self.db.add(weekly)
-        self.db.flush()
+        if flush:
+            self.db.flush()
         return weekly
     
     def get_with_grocery_list(self, diet_id: str, user_id: str) -> Optional[WeeklyDiet]:
@@ -0,0 +1,60 @@
+"""Idempotency key repository for data access operations"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import IdempotencyKey
+
+
+class IdempotencyKeyRepository:
+    """Repository for IdempotencyKey operations"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_active(self, user_id: str, key: str, now: datetime) -> Optional[IdempotencyKey]:
+        """Get a stored key for the user unless it has expired"""
+        stmt = select(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > now,
+        )
+        return self.db.execute(stmt).scalar_one_or_none()
+
+    def save(
+        self,
+        user_id: str,
+        key: str,
+        diet_id: str,
+        response: Dict[str, Any],
+        now: datetime,
+        expires_at: datetime,
+    ) -> None:
+        """Store a key, replacing an expired entry and keeping an active one"""
+        stmt = insert(IdempotencyKey).values(
+            user_id=user_id,
+            key=key,
+            diet_id=diet_id,
+            response=response,
+            created_at=now,
+            expires_at=expires_at,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                "diet_id": stmt.excluded.diet_id,
+                "response": stmt.excluded.response,
+                "created_at": stmt.excluded.created_at,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at <= now,
+        )
+        self.db.execute(stmt)
+
+    def delete_expired(self, now: datetime) -> int:
+        """Delete expired keys and return how many were removed"""
+        result = self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+        return result.rowcount
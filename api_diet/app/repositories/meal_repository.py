@@ -1,6 +1,6 @@
 """Meal repository for data access operations"""
 
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import select
 
@@ -34,9 +34,10 @@ class MealRepository:
         day: int,
         time: str,
         recipe: str,
-        calories: int
+        calories: int,
+        flush: bool = True,
     ) -> Meal:
-        """Create a new meal"""
+        """Create a new meal; with ``flush=False`` it is inserted by the next flush"""
         meal = Meal(
             id=meal_id,
             weekly_diet_id=weekly_diet_id,
@@ -47,7 +48,8 @@ class MealRepository:
             calories=calories,
         )
         self.db.add(meal)
-        self.db.flush()
+        if flush:
+            self.db.flush()
         return meal
     
     def get_meals_by_diet(self, diet_id: str) -> List[Meal]:
@@ -74,16 +76,22 @@ class IngredientRepository:
         stmt = select(Ingredient).where(Ingredient.name == name)
         result = self.db.execute(stmt)
         return result.scalar_one_or_none()
+
+    def get_by_names(self, names: Iterable[str]) -> Dict[str, Ingredient]:
+        """Get the existing ingredients among ``names``, keyed by name, in one query"""
+        stmt = select(Ingredient).where(Ingredient.name.in_(set(names)))
+        return {ingredient.name: ingredient for ingredient in self.db.execute(stmt).scalars()}
     
-    def create_ingredient(self, ingredient_id: str, name: str, unit: str) -> Ingredient:
-        """Create a new ingredient"""
+    def create_ingredient(self, ingredient_id: str, name: str, unit: str, flush: bool = True) -> Ingredient:
+        """Create a new ingredient; with ``flush=False`` it is inserted by the next flush"""
         ingredient = Ingredient(
             id=ingredient_id,
             name=name,
             unit=unit,
         )
         self.db.add(ingredient)
-        self.db.flush()
+        if flush:
+            self.db.flush()
         return ingredient
 
 
@@ -98,9 +106,10 @@ class MealIngredientRepository:
         meal_ingredient_id: str,
         meal_id: str,
         ingredient_id: str,
-        quantity: float
+        quantity: float,
+        flush: bool = True,
     ) -> MealIngredient:
-        """Create a new meal ingredient relationship"""
+        """Create a new meal ingredient relationship; with ``flush=False`` it is inserted by the next flush"""
         meal_ingredient = MealIngredient(
             id=meal_ingredient_id,
             meal_id=meal_id,
@@ -108,7 +117,8 @@ class MealIngredientRepository:
             quantity=quantity,
         )
         self.db.add(meal_ingredient)
-        self.db.flush()
+        if flush:
+            self.db.flush()
         return meal_ingredient
 
 
@@ -118,14 +128,15 @@ class GroceryListRepository:
     def __init__(self, db: Session):
         self.db = db
     
-    def create_grocery_list(self, grocery_list_id: str, weekly_diet_id: str) -> GroceryList:
-        """Create a new grocery list"""
+    def create_grocery_list(self, grocery_list_id: str, weekly_diet_id: str, flush: bool = True) -> GroceryList:
+        """Create a new grocery list; with ``flush=False`` it is inserted by the next flush"""
         grocery_list = GroceryList(
             id=grocery_list_id,
             weekly_diet_id=weekly_diet_id
         )
         self.db.add(grocery_list)
-        self.db.flush()
+        if flush:
+            self.db.flush()
         return grocery_list
 
 
@@ -140,9 +151,10 @@ class GroceryListItemRepository:
         item_id: str,
         grocery_list_id: str,
         ingredient_id: str,
-        quantity: float
+        quantity: float,
+        flush: bool = True,
     ) -> GroceryListItem:
-        """Create a new grocery list item"""
+        """Create a new grocery list item; with ``flush=False`` it is inserted by the next flush"""
         item = GroceryListItem(
             id=item_id,
             grocery_list_id=grocery_list_id,
@@ -150,5 +162,6 @@ class GroceryListItemRepository:
             quantity=quantity,
         )
         self.db.add(item)
-        self.db.flush()
+        if flush:
+            self.db.flush()
         return item
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""LLM usage repository for data access operations"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, func, case
+
+from app.models import LLMUsage
+
+
+class LLMUsageRepository:
+    """Repository for LLMUsage operations"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def bulk_insert(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert many usage records in a single executemany batch"""
+        if not rows:
+            return
+        self.db.execute(insert(LLMUsage), rows)
+
+    def summarize(self, group_by: str, since: datetime, user_id: Optional[str] = None) -> List[Any]:
+        """Aggregate usage per user, function or day since the given time, optionally for one user"""
+        if group_by == "user":
+            key = func.coalesce(LLMUsage.user_id, "unknown")
+        elif group_by == "function":
+            key = LLMUsage.function_name
+        else:
+            key = func.to_char(LLMUsage.created_at, "YYYY-MM-DD")
+
+        stmt = (
+            select(
+                key.label("key"),
+                func.count(LLMUsage.id).label("calls"),
+                func.sum(case((LLMUsage.success.is_(False), 1), else_=0)).label("failures"),
+                func.sum(LLMUsage.input_tokens).label("input_tokens"),
+                func.sum(LLMUsage.output_tokens).label("output_tokens"),
+                func.sum(LLMUsage.cost_usd).label("cost_usd"),
+                func.avg(LLMUsage.latency_ms).label("avg_latency_ms"),
+                func.max(LLMUsage.latency_ms).label("max_latency_ms"),
+            )
+            .where(LLMUsage.created_at >= since)
+            .group_by(key)
+            .order_by(key)
+        )
+        if user_id is not None:
+            stmt = stmt.where(LLMUsage.user_id == user_id)
+        result = self.db.execute(stmt)
+        return list(result.all())
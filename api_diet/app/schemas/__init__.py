@@ -10,6 +10,7 @@ from app.schemas.diet import (
     DietaConLista,
     RecipeResponse
 )
+from app.schemas.usage import LLMUsageSummary, UsageGroupBy
 
 # Export all schemas
 __all__ = [
@@ -19,5 +20,7 @@ __all__ = [
     "PastoSchema",
     "DietaSettimanaleSchema",
     "DietaConLista",
-    "RecipeResponse"
+    "RecipeResponse",
+    "LLMUsageSummary",
+    "UsageGroupBy",
 ]
\ No newline at end of file
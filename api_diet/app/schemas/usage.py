@@ -0,0 +1,20 @@
+"""LLM usage Pydantic schemas"""
+
+from typing import Literal
+from pydantic import BaseModel
+
+# Dimensions the usage summary can be grouped by
+UsageGroupBy = Literal["user", "function", "day"]
+
+
+class LLMUsageSummary(BaseModel):
+    """Aggregated LLM usage for one user, function or day"""
+    key: str
+    calls: int
+    failures: int
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+    cost_usd: float
+    avg_latency_ms: float
+    max_latency_ms: float
@@ -1,9 +1,11 @@
 from .user_service import UserService
 from .diet_service import DietService
 from .meal_service import MealService
+from .usage_service import UsageService
 
 __all__ = [
     "UserService",
     "DietService",
     "MealService",
+    "UsageService",
 ]
\ No newline at end of file
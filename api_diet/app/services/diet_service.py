@@ -1,17 +1,26 @@
 """Diet service for business logic operations"""
 
+import asyncio
 import logging
 import uuid
-from datetime import date
-from typing import List, Dict, Any, cast, Literal
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, cast, Literal
 
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
-from app.models import MealType
-from app.repositories import DietRepository, MealRepository, IngredientRepository, MealIngredientRepository, GroceryListRepository, GroceryListItemRepository, UserSettingsRepository
+from app.models import MealType, WeeklyDiet
+from app.repositories import DietRepository, MealRepository, IngredientRepository, MealIngredientRepository, GroceryListRepository, GroceryListItemRepository, UserSettingsRepository, IdempotencyKeyRepository
 from app.schemas import DietSummary, DietaConLista
-from baml_client.async_client import b
+from app.exceptions import DeadlineExceededError, ExternalServiceError
+from app.config import settings as app_settings
+from app.database import database_manager, pipelined
+from app.deadline import check_deadline, shield_from_disconnect, suspend_deadline
+from app.llm import call_baml
+from app.observability.metrics import SINGLE_FLIGHT_SHARED
+from app.observability.tracing import traced
+from app.replicas import SESSION_USER_KEY
+from app.single_flight import SingleFlight, try_advisory_xact_lock
 from baml_client.types import (
     DietaSettimanale as DietaSettimanaleBAML,
     Pasto as PastoBAML,
@@ -28,6 +37,13 @@ logger = logging.getLogger(__name__)
 # Type alias for meal type literals
 MealTypeLiteral = Literal['colazione', 'pranzo', 'cena', 'spuntino']
 
+# Advisory lock namespace ("DIET") and polling interval for per-user generation
+GENERATION_LOCK_NAMESPACE = 0x44494554
+GENERATION_LOCK_POLL_INTERVAL = 1.0
+
+# In-flight diet generations of this worker, keyed by user ID
+diet_generations: SingleFlight[DietaConLista] = SingleFlight("diet_generation")
+
 
 class DietService:
     """Service class for diet-related business logic"""
@@ -41,7 +57,9 @@ class DietService:
         self.grocery_list_repo = GroceryListRepository(db)
         self.grocery_list_item_repo = GroceryListItemRepository(db)
         self.user_settings_repo = UserSettingsRepository(db)
+        self.idempotency_repo = IdempotencyKeyRepository(db)
     
+    @traced()
     def get_user_diets(self, user_id: str) -> List[DietSummary]:
         """Get all diets for a user"""
         diets = self.diet_repo.get_user_diets(user_id)
@@ -54,6 +72,7 @@ class DietService:
             for diet in diets
         ]
     
+    @traced()
     def get_diet_by_id(self, diet_id: str, user_id: str):
         """Get full diet by ID"""
         from app.schemas.diet import PastoSchema
@@ -108,8 +127,89 @@ class DietService:
             pasti=pasti,
         )
     
-    async def create_diet(self, user_id: str) -> DietaConLista:
-        """Create a new weekly diet with grocery list"""
+    async def create_diet_once(self, user_id: str, idempotency_key: Optional[str] = None) -> DietaConLista:
+        """
+        Create a new weekly diet, coalescing concurrent requests for the same user.
+
+        A request repeating an ``Idempotency-Key`` gets the stored response
+        instead of a new generation. Duplicate requests in this worker await
+        the generation already running; the generation uses its own session so
+        it outlives any single request.
+        """
+        if idempotency_key:
+            stored = self.idempotency_repo.get_active(user_id, idempotency_key, datetime.now(timezone.utc))
+            if stored is not None:
+                logger.info(f"Replaying diet {stored.diet_id} for idempotency key {idempotency_key}")
+                return DietaConLista.model_validate(stored.response)
+
+        # Release the request's connection while the generation runs
+        self.db.commit()
+
+        result = await diet_generations.run(
+            user_id, lambda: DietService._create_diet_in_session(user_id, idempotency_key)
+        )
+
+        # The diet is committed: store its key and respond even if the client disconnects now
+        shield_from_disconnect()
+        if idempotency_key:
+            # A joined or cross-worker generation stored another key (or none); no-op otherwise.
+            # The diet is already committed, so a deadline passed meanwhile must not fail the
+            # request and leave a retry to generate (and bill) it again.
+            with suspend_deadline():
+                diet_id = self.diet_repo.get_latest_diet_id(user_id)
+                if diet_id is not None:
+                    self._save_idempotency_key(user_id, idempotency_key, diet_id, result)
+                    self.db.commit()
+        return result
+
+    @staticmethod
+    async def _create_diet_in_session(user_id: str, idempotency_key: Optional[str]) -> DietaConLista:
+        with database_manager.get_session() as session:
+            session.info[SESSION_USER_KEY] = user_id
+            return await DietService(session).create_diet_exclusive(user_id, idempotency_key)
+
+    def _save_idempotency_key(self, user_id: str, key: str, diet_id: str, result: DietaConLista) -> None:
+        """Store the response for an idempotency key, purging expired keys"""
+        now = datetime.now(timezone.utc)
+        self.idempotency_repo.delete_expired(now)
+        self.idempotency_repo.save(
+            user_id=user_id,
+            key=key,
+            diet_id=diet_id,
+            response=result.model_dump(mode="json"),
+            now=now,
+            expires_at=now + timedelta(seconds=app_settings.idempotency_key_ttl),
+        )
+
+    @traced()
+    async def create_diet_exclusive(self, user_id: str, idempotency_key: Optional[str] = None) -> DietaConLista:
+        """
+        Create a new weekly diet unless another worker is generating one for the user.
+
+        The generation holds a transaction-scoped advisory lock until its diet
+        is committed. A caller that finds the lock taken waits for it and
+        returns the diet the other worker created instead of generating again.
+        """
+        previous_diet_id = self.diet_repo.get_latest_diet_id(user_id)
+
+        waited = False
+        while not try_advisory_xact_lock(self.db, GENERATION_LOCK_NAMESPACE, user_id):
+            waited = True
+            check_deadline("waiting for concurrent diet generation")
+            await asyncio.sleep(GENERATION_LOCK_POLL_INTERVAL)
+
+        if waited:
+            weekly = self.diet_repo.get_current_week_diet(user_id)
+            if weekly is not None and weekly.id != previous_diet_id:
+                SINGLE_FLIGHT_SHARED.labels(diet_generations.name, "database").inc()
+                logger.info(f"Returning diet {weekly.id} generated concurrently by another worker")
+                return self._build_diet_with_grocery_list(weekly)
+
+        return await self.create_diet(user_id, idempotency_key)
+
+    @traced()
+    async def create_diet(self, user_id: str, idempotency_key: Optional[str] = None) -> DietaConLista:
+        """Create a new weekly diet with grocery list, storing the idempotency key with it"""
         from app.schemas.diet import PastoSchema
 
         # Load user settings
@@ -121,25 +221,110 @@ class DietService:
 
         # Generate diet and grocery list using BAML
         try:
-            external = await b.GeneraDietaSettimanale(
-                dataInizio=date.today().isoformat(), 
+            external = await call_baml(
+                "GeneraDietaSettimanale",
+                user_id=user_id,
+                dataInizio=date.today().isoformat(),
                 peso=settings.weight,
                 altezza=settings.height,
                 obiettivo=settings.goals or "",
                 altri_dati=settings.other_data or "",
             )
-            grocery = await b.GeneraListaSpesa(external.pasti)
+            grocery = await call_baml("GeneraListaSpesa", user_id=user_id, pasti=external.pasti)
+        except (DeadlineExceededError, ExternalServiceError):
+            raise
         except Exception as e:
             logger.exception("Error generating diet")
             raise HTTPException(502, f"Generation failed: {e}")
 
-        # Save WeeklyDiet
+        weekly_id = self._save_diet(user_id, external, grocery)
+
+        # Reload saved data
+        saved = self.diet_repo.get_with_meals(weekly_id, user_id)
+
+        if not saved:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to reload created diet"
+            )
+
+        # Map response meals
+        inv_type_map = {
+            MealType.BREAKFAST: "colazione",
+            MealType.LUNCH: "pranzo",
+            MealType.DINNER: "cena",
+            MealType.SNACK: "spuntino",
+        }
+
+        response_meals: List[PastoSchema] = []
+        logger.debug(f"Converting {len(saved.meals)} meals from database to API schema")
+        for m in saved.meals:
+            response_meals.append(
+                PastoSchema(
+                    id=m.id,  # Add the missing id field
+                    tipoPasto=TipoPastoSchema(
+                        tipo=cast(MealTypeLiteral, inv_type_map[m.meal_type]),
+                        orario=m.time,
+                        ricetta=m.recipe or "",
+                    ),
+                    ingredienti=[
+                        IngredienteSchema(
+                            nome=mi.ingredient.name,
+                            quantita=mi.quantity,
+                            unita=mi.ingredient.unit,
+                        )
+                        for mi in m.ingredients
+                    ],
+                    calorie=m.calories,
+                    day=m.day,
+                )
+            )
+
+        # Convert BAML grocery list to API schema
+        grocery_schema = ListaSpesaSchema(
+            ingredienti=[
+                IngredienteSchema(
+                    nome=ingr.nome,
+                    quantita=ingr.quantita,
+                    unita=ingr.unita
+                )
+                for ingr in grocery.ingredienti
+            ]
+        )
+
+        from app.schemas.diet import DietaSettimanaleSchema as DietaSettimanaleSchemaLocal
+        result = DietaConLista(
+            dieta=DietaSettimanaleSchemaLocal(
+                nome=saved.name,
+                dataInizio=saved.start_date.isoformat(),
+                dataFine=saved.end_date.isoformat(),
+                pasti=response_meals,
+            ),
+            listaSpesa=grocery_schema,
+        )
+
+        if idempotency_key:
+            self._save_idempotency_key(user_id, idempotency_key, saved.id, result)
+
+        # Commit all changes
+        self.db.commit()
+        return result
+    
+    def _save_diet(self, user_id: str, external: DietaSettimanaleBAML, grocery: ListaSpesaBAML) -> str:
+        """
+        Add a generated diet, its meals, ingredients and grocery list, and flush.
+
+        Rows get client-side IDs, so nothing is flushed until the end: the
+        whole diet goes out in one flush, pipelined on psycopg 3. It is
+        committed by the caller. Returns the diet ID.
+        """
         weekly = self.diet_repo.create_diet(
             user_id=user_id,
             diet_id=str(uuid.uuid4()),
             start_date=date.fromisoformat(external.dataInizio),
             end_date=date.fromisoformat(external.dataFine),
             name=external.nome,
+            flush=False,
         )
 
         # Map meal types
@@ -150,7 +335,6 @@ class DietService:
             "spuntino": MealType.SNACK,
         }
 
-        # Save meals and ingredients
         # Group meals by type for proper distribution
         meals_by_type = {}
         for pasto in external.pasti:
@@ -162,6 +346,11 @@ class DietService:
                 meals_by_type[mt] = []
             meals_by_type[mt].append(pasto)
 
+        # One lookup for every ingredient the diet mentions; new meal ingredients are added below
+        names = [ingr.nome for pasto in external.pasti for ingr in pasto.ingredienti]
+        names.extend(ingr.nome for ingr in grocery.ingredienti)
+        ingredients = self.ingredient_repo.get_by_names(names)
+
         # Distribute meals across the week (7 days)
         for meal_type, pasti_list in meals_by_type.items():
             for idx, pasto in enumerate(pasti_list):
@@ -176,113 +365,51 @@ class DietService:
                     time=pasto.tipoPasto.orario,
                     recipe=pasto.tipoPasto.ricetta,
                     calories=pasto.calorie,
+                    flush=False,
                 )
 
                 # Save ingredients for this meal
                 for ingr in pasto.ingredienti:
-                    existing_ingr = self.ingredient_repo.get_by_name(ingr.nome)
-
-                    if not existing_ingr:
-                        existing_ingr = self.ingredient_repo.create_ingredient(
+                    if ingr.nome not in ingredients:
+                        ingredients[ingr.nome] = self.ingredient_repo.create_ingredient(
                             ingredient_id=str(uuid.uuid4()),
                             name=ingr.nome,
                             unit=ingr.unita,
+                            flush=False,
                         )
 
                     self.meal_ingredient_repo.create_meal_ingredient(
                         meal_ingredient_id=str(uuid.uuid4()),
                         meal_id=meal.id,
-                        ingredient_id=existing_ingr.id,
+                        ingredient_id=ingredients[ingr.nome].id,
                         quantity=ingr.quantita,
+                        flush=False,
                     )
 
         # Save grocery list
         grocery_list = self.grocery_list_repo.create_grocery_list(
             grocery_list_id=str(uuid.uuid4()),
-            weekly_diet_id=weekly.id
+            weekly_diet_id=weekly.id,
+            flush=False,
         )
 
         for ingr in grocery.ingredienti:
-            existing_ingr = self.ingredient_repo.get_by_name(ingr.nome)
-            if existing_ingr:
+            if ingr.nome in ingredients:
                 self.grocery_list_item_repo.create_grocery_item(
                     item_id=str(uuid.uuid4()),
                     grocery_list_id=grocery_list.id,
-                    ingredient_id=existing_ingr.id,
+                    ingredient_id=ingredients[ingr.nome].id,
                     quantity=ingr.quantita,
+                    flush=False,
                 )
 
-        # Commit all changes
-        self.db.commit()
-
-        # Reload saved data
-        saved = self.diet_repo.get_with_meals(weekly.id, user_id)
-
-        if not saved:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to reload created diet"
-            )
-
-        # Map response meals
-        inv_type_map = {
-            MealType.BREAKFAST: "colazione",
-            MealType.LUNCH: "pranzo",
-            MealType.DINNER: "cena",
-            MealType.SNACK: "spuntino",
-        }
-
-        response_meals: List[PastoSchema] = []
-        logger.debug(f"Converting {len(saved.meals)} meals from database to API schema")
-        for m in saved.meals:
-            response_meals.append(
-                PastoSchema(
-                    id=m.id,  # Add the missing id field
-                    tipoPasto=TipoPastoSchema(
-                        tipo=cast(MealTypeLiteral, inv_type_map[m.meal_type]),
-                        orario=m.time,
-                        ricetta=m.recipe or "",
-                    ),
-                    ingredienti=[
-                        IngredienteSchema(
-                            nome=mi.ingredient.name,
-                            quantita=mi.quantity,
-                            unita=mi.ingredient.unit,
-                        )
-                        for mi in m.ingredients
-                    ],
-                    calorie=m.calories,
-                    day=m.day,
-                )
-            )
-
-        # Convert BAML grocery list to API schema
-        grocery_schema = ListaSpesaSchema(
-            ingredienti=[
-                IngredienteSchema(
-                    nome=ingr.nome,
-                    quantita=ingr.quantita,
-                    unita=ingr.unita
-                )
-                for ingr in grocery.ingredienti
-            ]
-        )
+        with pipelined(self.db):
+            self.db.flush()
+        return weekly.id
 
-        from app.schemas.diet import DietaSettimanaleSchema as DietaSettimanaleSchemaLocal
-        return DietaConLista(
-            dieta=DietaSettimanaleSchemaLocal(
-                nome=saved.name,
-                dataInizio=saved.start_date.isoformat(),
-                dataFine=saved.end_date.isoformat(),
-                pasti=response_meals,
-            ),
-            listaSpesa=grocery_schema,
-        )
-    
+    @traced()
     def get_current_week_diet(self, user_id: str) -> DietaConLista | None:
         """Get current week's diet with grocery list. Returns None if no diet exists."""
-        from app.schemas.diet import PastoSchema
-
         today = date.today()
         logger.debug(f"Looking for diet for user {user_id} on date {today}")
         weekly = self.diet_repo.get_current_week_diet(user_id, today)
@@ -298,6 +425,12 @@ class DietService:
             logger.info(f"No diet found for user {user_id} for the current week - this is normal")
             return None
 
+        return self._build_diet_with_grocery_list(weekly)
+
+    def _build_diet_with_grocery_list(self, weekly: WeeklyDiet) -> DietaConLista:
+        """Map a stored diet, with meals and grocery list loaded, to the API schema"""
+        from app.schemas.diet import PastoSchema
+
         # Build meals
         inv_type_map = {
             MealType.BREAKFAST: "colazione",
@@ -362,6 +495,7 @@ class DietService:
             listaSpesa=ListaSpesaSchema(ingredienti=items),
         )
     
+    @traced()
     def get_grocery_list_by_diet_id(self, diet_id: str, user_id: str) -> ListaSpesaSchema:
         """Get grocery list for a specific diet by ID"""
         weekly = self.diet_repo.get_with_grocery_list(diet_id, user_id)
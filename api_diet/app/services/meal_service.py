@@ -8,7 +8,9 @@ from fastapi import HTTPException, status
 
 from app.models import MealType
 from app.repositories import MealRepository
-from baml_client.async_client import b
+from app.exceptions import DeadlineExceededError, ExternalServiceError
+from app.llm import call_baml
+from app.observability.tracing import traced
 from baml_client.types import (
     Pasto as PastoSchema,
     TipoPasto as TipoPastoSchema,
@@ -29,6 +31,7 @@ class MealService:
         self.db = db
         self.meal_repo = MealRepository(db)
     
+    @traced()
     def get_meal_details(self, meal_id: str, user_id: str) -> PastoSchema:
         """Get detailed meal information"""
         meal = self.meal_repo.get_with_ingredients(meal_id)
@@ -69,6 +72,7 @@ class MealService:
             calorie=meal.calories,
         )
     
+    @traced()
     async def get_meal_recipe(self, meal_id: str, user_id: str) -> HtmlStructure:
         """Generate full recipe for a meal"""
         meal = self.meal_repo.get_with_ingredients(meal_id)
@@ -107,9 +111,13 @@ class MealService:
             ingredienti=ings,
             calorie=meal.calories,
         )
+        # Nothing else is read, so do not hold the connection while the LLM answers
+        self.db.rollback()
 
         try:
-            full_recipe: HtmlStructure = await b.GeneraRicetta(pasto)
+            full_recipe: HtmlStructure = await call_baml("GeneraRicetta", user_id=user_id, pasto=pasto)
+        except (DeadlineExceededError, ExternalServiceError):
+            raise
         except Exception as e:
             raise HTTPException(
                 status.HTTP_502_BAD_GATEWAY,
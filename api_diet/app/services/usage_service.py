@@ -0,0 +1,40 @@
+"""LLM usage service for business logic operations"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.repositories import LLMUsageRepository
+from app.schemas import LLMUsageSummary
+
+logger = logging.getLogger(__name__)
+
+
+class UsageService:
+    """Service class for LLM usage accounting"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.usage_repo = LLMUsageRepository(db)
+
+    def get_summary(self, user_id: str, group_by: str, days: int) -> List[LLMUsageSummary]:
+        """Aggregate the user's token usage, cost and latency over the last ``days`` days"""
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        rows = self.usage_repo.summarize(group_by, since, user_id=user_id)
+
+        return [
+            LLMUsageSummary(
+                key=str(row.key),
+                calls=row.calls,
+                failures=int(row.failures or 0),
+                input_tokens=int(row.input_tokens or 0),
+                output_tokens=int(row.output_tokens or 0),
+                total_tokens=int((row.input_tokens or 0) + (row.output_tokens or 0)),
+                cost_usd=round(float(row.cost_usd or 0.0), 6),
+                avg_latency_ms=round(float(row.avg_latency_ms or 0.0), 2),
+                max_latency_ms=round(float(row.max_latency_ms or 0.0), 2),
+            )
+            for row in rows
+        ]
@@ -0,0 +1,102 @@
+"""
+Single-flight execution of expensive per-key operations.
+
+``SingleFlight`` coalesces concurrent calls for the same key within a
+worker: the first caller starts the operation in its own task and every
+caller, including later duplicates, awaits that task's result. The task is
+only cancelled once all of its callers have gone away, so one client
+disconnecting does not abort work the others are waiting on.
+
+Across workers, ``try_advisory_xact_lock`` takes a Postgres
+transaction-scoped advisory lock on the key; the lock is released when the
+holding transaction commits or rolls back.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Generic, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.observability.metrics import SINGLE_FLIGHT_SHARED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    """An in-flight operation and the number of callers awaiting it"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """Per-key coalescing of concurrent async operations in this worker"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+
+    def in_flight(self) -> int:
+        """Number of keys with a running operation"""
+        return len(self._calls)
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def run(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``func`` for ``key`` unless it is already running, and return its result.
+
+        Duplicate callers receive the result (or exception) of the running call.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(func(), name=f"{self.name}:{key}"))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            SINGLE_FLIGHT_SHARED.labels(self.name, "process").inc()
+            logger.info(
+                f"Joining in-flight {self.name} for {key}",
+                extra={"operation": self.name, "event_type": "single_flight_joined"},
+            )
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Last caller gone: nobody is waiting for the result anymore
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+
+def try_advisory_xact_lock(session: Session, namespace: int, key: str) -> bool:
+    """
+    Try to take a transaction-scoped Postgres advisory lock on ``key``.
+
+    Args:
+        session: Session whose current transaction will hold the lock
+        namespace: 32-bit lock namespace separating unrelated lock users
+        key: Lock key, hashed to 32 bits by Postgres
+
+    Returns:
+        True if the lock is now held by the session's transaction
+    """
+    return bool(
+        session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:namespace, hashtext(:key))"),
+            {"namespace": namespace, "key": key},
+        ).scalar()
+    )
@@ -0,0 +1,324 @@
+"""
+Benchmark of the diet persistence path per driver over a high-latency link.
+
+Saves a generated 35-meal diet with its grocery list, the way
+``DietService.create_diet`` does after the LLM calls, through a local TCP
+proxy that delays traffic by a simulated round-trip time. Each driver runs
+two modes:
+
+- ``row_by_row``: the previous path, one flush (and one ingredient lookup)
+  per row, so every INSERT waits for its own round trip
+- ``batched``: ``DietService._save_diet``, a single lookup and a single
+  flush, pipelined on psycopg 3
+
+Every save runs in a fresh session and is rolled back. The ingredient
+catalogue is filled once beforehand, as it is in a running deployment.
+
+Usage (from the ``api_diet`` directory, against a disposable database):
+
+    python -m benchmarks.diet_persistence --drivers psycopg2,psycopg --rtt-ms 0,1,5,20 \
+        --output results/diet_persistence.json
+"""
+
+import argparse
+import json
+import logging
+import queue
+import socket
+import statistics
+import threading
+import time
+import uuid
+from datetime import date
+from random import Random
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import Engine, create_engine, event, make_url, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import with_driver
+from app.models import MealType
+from app.services.diet_service import DietService
+from baml_client.types import DietaSettimanale, ListaSpesa
+from mock_llm.generators import grocery_list, weekly_diet
+
+logger = logging.getLogger(__name__)
+
+USER_ID = "benchmark-persistence"
+
+MEAL_TYPES = {
+    "colazione": MealType.BREAKFAST,
+    "pranzo": MealType.LUNCH,
+    "cena": MealType.DINNER,
+    "spuntino": MealType.SNACK,
+}
+
+Save = Callable[[Session, DietaSettimanale, ListaSpesa], str]
+
+
+class LatencyProxy:
+    """TCP proxy delaying every chunk by half the round-trip time in each direction"""
+
+    def __init__(self, upstream: Tuple[str, int], rtt: float):
+        self.upstream = upstream
+        self.delay = rtt / 2
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self.port = self._server.getsockname()[1]
+
+    def start(self) -> "LatencyProxy":
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        self._server.close()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.upstream)
+            for sock in (client, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._forward(client, upstream)
+            self._forward(upstream, client)
+
+    def _forward(self, source: socket.socket, target: socket.socket) -> None:
+        # Chunks carry their delivery time, so back-to-back (pipelined) chunks
+        # arrive one delay later together instead of one delay each
+        chunks: "queue.Queue[Tuple[float, bytes]]" = queue.Queue()
+
+        def read() -> None:
+            while True:
+                try:
+                    data = source.recv(65536)
+                except OSError:
+                    data = b""
+                chunks.put((time.monotonic() + self.delay, data))
+                if not data:
+                    return
+
+        def write() -> None:
+            while True:
+                deliver_at, data = chunks.get()
+                pause = deliver_at - time.monotonic()
+                if pause > 0:
+                    time.sleep(pause)
+                try:
+                    if not data:
+                        target.shutdown(socket.SHUT_WR)
+                        return
+                    target.sendall(data)
+                except OSError:
+                    return
+
+        threading.Thread(target=read, daemon=True).start()
+        threading.Thread(target=write, daemon=True).start()
+
+
+def generated_diet(seed: int) -> Tuple[DietaSettimanale, ListaSpesa]:
+    """A diet and its grocery list as the LLM returns them"""
+    rng = Random(seed)
+    diet = weekly_diet(rng, "Data inizio: 2025-01-06")
+    prompt = "\n".join(
+        f"- {item['nome']}: {item['quantita']} {item['unita']}"
+        for pasto in diet["pasti"]
+        for item in pasto["ingredienti"]
+    )
+    return DietaSettimanale.model_validate(diet), ListaSpesa.model_validate(grocery_list(rng, prompt))
+
+
+def save_row_by_row(session: Session, diet: DietaSettimanale, grocery: ListaSpesa) -> str:
+    """The persistence path before batching: every row is flushed on its own"""
+    service = DietService(session)
+    weekly = service.diet_repo.create_diet(
+        user_id=USER_ID,
+        diet_id=str(uuid.uuid4()),
+        start_date=date.fromisoformat(diet.dataInizio),
+        end_date=date.fromisoformat(diet.dataFine),
+        name=diet.nome,
+    )
+    for position, pasto in enumerate(diet.pasti):
+        meal = service.meal_repo.create_meal(
+            meal_id=str(uuid.uuid4()),
+            weekly_diet_id=weekly.id,
+            meal_type=MEAL_TYPES[pasto.tipoPasto.tipo],
+            day=position % 7,
+            time=pasto.tipoPasto.orario,
+            recipe=pasto.tipoPasto.ricetta,
+            calories=pasto.calorie,
+        )
+        for ingr in pasto.ingredienti:
+            ingredient = service.ingredient_repo.get_by_name(ingr.nome)
+            if ingredient is None:
+                ingredient = service.ingredient_repo.create_ingredient(str(uuid.uuid4()), ingr.nome, ingr.unita)
+            service.meal_ingredient_repo.create_meal_ingredient(
+                str(uuid.uuid4()), meal.id, ingredient.id, ingr.quantita
+            )
+
+    grocery_list_row = service.grocery_list_repo.create_grocery_list(str(uuid.uuid4()), weekly.id)
+    for ingr in grocery.ingredienti:
+        ingredient = service.ingredient_repo.get_by_name(ingr.nome)
+        if ingredient is not None:
+            service.grocery_list_item_repo.create_grocery_item(
+                str(uuid.uuid4()), grocery_list_row.id, ingredient.id, ingr.quantita
+            )
+    return weekly.id
+
+
+def save_batched(session: Session, diet: DietaSettimanale, grocery: ListaSpesa) -> str:
+    return DietService(session)._save_diet(USER_ID, diet, grocery)
+
+
+MODES: Dict[str, Save] = {
+    "row_by_row": save_row_by_row,
+    "batched": save_batched,
+}
+
+
+def prepare(url: str, diet: DietaSettimanale, grocery: ListaSpesa) -> None:
+    """Create the benchmark user and put the diet's ingredients in the catalogue"""
+    engine = create_engine(url)
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO users (id, email) VALUES (:id, :email) ON CONFLICT DO NOTHING"),
+                {"id": USER_ID, "email": f"{USER_ID}@benchmark.local"},
+            )
+        with Session(engine) as session:
+            save_batched(session, diet, grocery)
+            session.commit()
+    finally:
+        engine.dispose()
+
+
+def cleanup(url: str) -> None:
+    """Delete the benchmark user with its diets; ingredients stay in the catalogue"""
+    engine = create_engine(url)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM users WHERE id = :id"), {"id": USER_ID})
+    finally:
+        engine.dispose()
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def measure(
+    engine: Engine, save: Save, diet: DietaSettimanale, grocery: ListaSpesa, iterations: int, warmup: int
+) -> Dict[str, Any]:
+    """Latency of ``iterations`` saves, each in a fresh session and rolled back"""
+    statements = []
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements[-1] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    durations = []
+    try:
+        for i in range(warmup + iterations):
+            with factory() as session:
+                # Check out the connection first, so connecting stays out of the figure
+                session.connection()
+                statements.append(0)
+                started = time.perf_counter()
+                save(session, diet, grocery)
+                duration = time.perf_counter() - started
+                session.rollback()
+            if i >= warmup:
+                durations.append(duration)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    durations.sort()
+    return {
+        "iterations": iterations,
+        "statements": statements[-1],
+        "mean_ms": round(statistics.fmean(durations) * 1000, 3),
+        "p50_ms": round(_percentile(durations, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(durations, 0.95) * 1000, 3),
+    }
+
+
+def run(url: str, drivers: List[str], rtts_ms: List[float], iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+    """Results by round-trip time, driver and mode"""
+    diet, grocery = generated_diet(seed)
+    parsed = make_url(url)
+    upstream = (parsed.host or "localhost", parsed.port or 5432)
+    prepare(with_driver(url, "psycopg2"), diet, grocery)
+
+    results: Dict[str, Any] = {}
+    try:
+        for rtt_ms in rtts_ms:
+            proxy = LatencyProxy(upstream, rtt_ms / 1000).start()
+            by_driver: Dict[str, Any] = {}
+            try:
+                for driver in drivers:
+                    proxied = make_url(with_driver(url, driver)).set(host="127.0.0.1", port=proxy.port)
+                    try:
+                        engine = create_engine(proxied, pool_size=1, max_overflow=0)
+                    except ImportError as e:
+                        logger.warning(f"Skipping {driver}: {e}")
+                        by_driver[driver] = {"error": str(e)}
+                        continue
+                    try:
+                        by_driver[driver] = {
+                            mode: measure(engine, save, diet, grocery, iterations, warmup)
+                            for mode, save in MODES.items()
+                        }
+                    finally:
+                        engine.dispose()
+                    for mode, result in by_driver[driver].items():
+                        logger.info(
+                            f"rtt {rtt_ms}ms {driver} {mode}: {result['statements']} statements, "
+                            f"p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms"
+                        )
+            finally:
+                proxy.close()
+            results[f"{rtt_ms:g}ms"] = by_driver
+    finally:
+        cleanup(with_driver(url, "psycopg2"))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--drivers", default="psycopg2,psycopg", help="Comma-separated drivers to compare")
+    parser.add_argument("--rtt-ms", default="0,1,5,20", help="Comma-separated simulated round-trip times")
+    parser.add_argument("--iterations", type=int, default=30, help="Timed saves per driver, mode and RTT")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed saves per driver, mode and RTT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="Target database (default: DATABASE_URL)")
+    parser.add_argument("--output", "-o", help="JSON results file (default: stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    url = args.database_url
+    if url is None:
+        from app.config import settings
+
+        url = settings.database_url
+
+    results = run(
+        url,
+        drivers=[driver.strip() for driver in args.drivers.split(",") if driver.strip()],
+        rtts_ms=[float(rtt) for rtt in args.rtt_ms.split(",") if rtt.strip()],
+        iterations=args.iterations,
+        warmup=args.warmup,
+        seed=args.seed,
+    )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
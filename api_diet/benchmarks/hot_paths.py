@@ -0,0 +1,343 @@
+"""
+Micro-benchmarks of the serialization and mapping hot paths.
+
+Cases:
+
+- ``diet_mapping``: ``DietService._build_diet_with_grocery_list`` on a
+  loaded 35-meal diet with its grocery list (ORM -> Pydantic)
+- ``diet_mapping_grocery_fallback``: the same diet without a stored grocery
+  list, so the list is aggregated from the meals
+- ``diet_json_model_dump``: ``DietaConLista.model_dump_json()``
+- ``diet_json_response``: what FastAPI does with a ``DietaConLista``
+  return value (response model validation, JSON-mode dump, ``JSONResponse``)
+- ``logging_middleware``: ``LoggingMiddleware`` around an endpoint returning
+  the diet JSON (body capture, parse and pretty-printed log message)
+- ``rate_limiting_dispatch``: ``RateLimitingMiddleware.dispatch`` with 10k
+  tracked client IPs
+
+Results are compared with ``benchmarks/baselines/hot_paths.json``; the run
+fails (exit code 1) when a case is slower than its baseline by more than
+the threshold. Baselines are machine-specific: ``--normalize`` compares
+timings relative to a fixed pure-Python reference loop instead, which
+travels better between machines.
+
+Usage (from the ``api_diet`` directory):
+
+    python -m benchmarks.hot_paths                       # compare with the baseline
+    python -m benchmarks.hot_paths --threshold 0.15 --case-threshold logging_middleware=0.3
+    python -m benchmarks.hot_paths --save-baseline       # record a new baseline
+"""
+
+import os
+
+# Rate limiting is skipped in development, so benchmark production-like settings.
+# Must happen before anything imports app.config.
+os.environ.setdefault("ENVIRONMENT", "production")
+os.environ.setdefault("DEBUG", "False")
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+from random import Random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.middleware.logging import LoggingMiddleware
+from app.middleware.rate_limiting import RateLimitingMiddleware
+from app.models import GroceryList, GroceryListItem, Ingredient, Meal, MealIngredient, MealType, WeeklyDiet
+from app.schemas import DietaConLista
+from app.services.diet_service import DietService
+from mock_llm.generators import grocery_list, weekly_diet
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "hot_paths.json"
+REFERENCE_CASE = "reference_loop"
+TRACKED_IPS = 10_000
+
+MEAL_TYPES = {
+    "colazione": MealType.BREAKFAST,
+    "pranzo": MealType.LUNCH,
+    "cena": MealType.DINNER,
+    "spuntino": MealType.SNACK,
+}
+
+# Coroutine functions are timed inside an event loop
+Case = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+def build_weekly_diet(with_grocery_list: bool = True) -> WeeklyDiet:
+    """A 35-meal diet with ingredients and grocery list, as the repository loads it"""
+    rng = Random(0)
+    generated = weekly_diet(rng, "Data inizio: 2025-01-06")
+    ingredients: Dict[str, Ingredient] = {}
+
+    def ingredient(name: str, unit: str) -> Ingredient:
+        if name not in ingredients:
+            ingredients[name] = Ingredient(id=str(uuid.UUID(int=rng.getrandbits(128))), name=name, unit=unit)
+        return ingredients[name]
+
+    weekly = WeeklyDiet(
+        id=str(uuid.UUID(int=rng.getrandbits(128))),
+        user_id="benchmark",
+        start_date=date.fromisoformat(generated["dataInizio"]),
+        end_date=date.fromisoformat(generated["dataFine"]),
+        name=generated["nome"],
+        created_at=datetime(2025, 1, 5, tzinfo=timezone.utc),
+    )
+    prompt_lines = []
+    for position, pasto in enumerate(generated["pasti"]):
+        weekly.meals.append(
+            Meal(
+                id=str(uuid.UUID(int=rng.getrandbits(128))),
+                meal_type=MEAL_TYPES[pasto["tipoPasto"]["tipo"]],
+                day=position // 5,
+                time=pasto["tipoPasto"]["orario"],
+                recipe=pasto["tipoPasto"]["ricetta"],
+                calories=pasto["calorie"],
+                ingredients=[
+                    MealIngredient(
+                        id=str(uuid.UUID(int=rng.getrandbits(128))),
+                        quantity=item["quantita"],
+                        ingredient=ingredient(item["nome"], item["unita"]),
+                    )
+                    for item in pasto["ingredienti"]
+                ],
+            )
+        )
+        prompt_lines.extend(f"- {i['nome']}: {i['quantita']} {i['unita']}" for i in pasto["ingredienti"])
+
+    if with_grocery_list:
+        weekly.grocery_list = GroceryList(
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            items=[
+                GroceryListItem(
+                    id=str(uuid.UUID(int=rng.getrandbits(128))),
+                    quantity=item["quantita"],
+                    ingredient=ingredient(item["nome"], item["unita"]),
+                )
+                for item in grocery_list(rng, "\n".join(prompt_lines))["ingredienti"]
+            ],
+        )
+    return weekly
+
+
+def _reference_loop() -> int:
+    total = 0
+    for i in range(10_000):
+        total += i * i % 7
+    return total
+
+
+def _http_scope(path: str, client_ip: str) -> Dict[str, Any]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"user-agent", b"benchmark")],
+        "client": (client_ip, 50000),
+        "server": ("localhost", 8000),
+    }
+
+
+def build_cases() -> Dict[str, Case]:
+    """Benchmark cases by name"""
+    # No connection is ever opened: the mapping only reads loaded attributes
+    service = DietService(Session())
+    weekly = build_weekly_diet()
+    weekly_without_list = build_weekly_diet(with_grocery_list=False)
+    result = service._build_diet_with_grocery_list(weekly)
+    response_adapter = TypeAdapter(DietaConLista)
+
+    # Endpoint returning the encoded diet, in two body chunks like a large response
+    body = JSONResponse(jsonable_encoder(result)).body
+    half = len(body) // 2
+
+    async def endpoint(scope, receive, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body[:half], "more_body": True})
+        await send({"type": "http.response.body", "body": body[half:], "more_body": False})
+
+    logging_middleware = LoggingMiddleware(endpoint)
+    logging_scope = _http_scope("/api/v1/diet/current_week", "127.0.0.1")
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        return None
+
+    async def logged_request() -> None:
+        await logging_middleware(logging_scope, receive, send)
+
+    # Every tracked IP has a few requests inside the window
+    rate_limiter = RateLimitingMiddleware(endpoint, requests=10**9, window=60)
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(TRACKED_IPS)]
+    now = time.time()
+    rate_limiter.client_requests = {ip: [now - 50, now - 30, now - 10] for ip in ips}
+    requests = [Request(_http_scope("/api/v1/diet/current_week", ip)) for ip in ips]
+    next_request = iter(range(10**12))
+
+    async def call_next(request: Request) -> Response:
+        return Response(b"{}", media_type="application/json")
+
+    async def dispatch() -> None:
+        request = requests[next(next_request) % TRACKED_IPS]
+        # Keep every IP at a steady number of timestamps across iterations
+        timestamps = rate_limiter.client_requests[request.client.host]
+        if timestamps:
+            timestamps.pop(0)
+        await rate_limiter.dispatch(request, call_next)
+
+    return {
+        REFERENCE_CASE: _reference_loop,
+        "diet_mapping": lambda: service._build_diet_with_grocery_list(weekly),
+        "diet_mapping_grocery_fallback": lambda: service._build_diet_with_grocery_list(weekly_without_list),
+        "diet_json_model_dump": result.model_dump_json,
+        "diet_json_response": lambda: JSONResponse(
+            response_adapter.dump_python(response_adapter.validate_python(result), mode="json")
+        ).body,
+        "logging_middleware": logged_request,
+        "rate_limiting_dispatch": dispatch,
+    }
+
+
+async def _time_async(case: Case, loops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        await case()
+    return time.perf_counter() - started
+
+
+def _time(case: Case, loops: int, is_async: bool) -> float:
+    if is_async:
+        return asyncio.run(_time_async(case, loops))
+    started = time.perf_counter()
+    for _ in range(loops):
+        case()
+    return time.perf_counter() - started
+
+
+def measure(case: Case, repeat: int, min_time: float) -> Dict[str, float]:
+    """Per-call time in microseconds: median and best of ``repeat`` runs of calibrated length"""
+    is_async = asyncio.iscoroutinefunction(case)
+    _time(case, 1, is_async)  # Warm up
+
+    loops = 1
+    while (elapsed := _time(case, loops, is_async)) < min_time:
+        loops *= 2 if elapsed < min_time / 10 else 1 + int(min_time / max(elapsed, 1e-9))
+    timings = sorted(_time(case, loops, is_async) / loops * 1e6 for _ in range(repeat))
+    return {"median_us": round(statistics.median(timings), 3), "min_us": round(timings[0], 3), "loops": loops}
+
+
+def run(names: Optional[List[str]], repeat: int, min_time: float) -> Dict[str, Dict[str, float]]:
+    cases = build_cases()
+    selected = [REFERENCE_CASE] + [name for name in cases if name != REFERENCE_CASE and (not names or name in names)]
+    results = {}
+    for name in selected:
+        results[name] = measure(cases[name], repeat, min_time)
+        print(f"{name:<32} {results[name]['median_us']:>12.1f} us", file=sys.stderr)
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    threshold: float,
+    case_thresholds: Dict[str, float],
+    normalize: bool,
+) -> List[str]:
+    """Regression messages of the cases slower than their baseline by more than their threshold"""
+    regressions = []
+    scale = 1.0
+    if normalize:
+        scale = baseline["cases"][REFERENCE_CASE]["median_us"] / results[REFERENCE_CASE]["median_us"]
+    for name, result in results.items():
+        before = baseline["cases"].get(name)
+        if name == REFERENCE_CASE or before is None:
+            continue
+        allowed = case_thresholds.get(name, threshold)
+        change = result["median_us"] * scale / before["median_us"] - 1
+        status = "REGRESSION" if change > allowed else "ok"
+        print(f"{name:<32} {before['median_us']:>10.1f} -> {result['median_us'] * scale:>10.1f} us  {change:+7.1%}  {status}")
+        if change > allowed:
+            regressions.append(f"{name}: {change:+.1%} (allowed {allowed:+.0%})")
+    return regressions
+
+
+def _case_thresholds(values: Optional[List[str]]) -> Dict[str, float]:
+    thresholds = {}
+    for value in values or []:
+        name, _, threshold = value.partition("=")
+        thresholds[name.strip()] = float(threshold)
+    return thresholds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("cases", nargs="*", help="Cases to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per case")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timed run")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown, as a fraction")
+    parser.add_argument("--case-threshold", action="append", help="name=fraction for a single case (repeatable)")
+    parser.add_argument("--normalize", action="store_true", help="Scale timings by the reference loop")
+    parser.add_argument("--output", "-o", type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    # Log records are still built and formatted, but not written anywhere
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    results = run(args.cases, args.repeat, args.min_time)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "cases": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save-baseline first")
+        return 1
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline, args.threshold, _case_thresholds(args.case_threshold), args.normalize)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
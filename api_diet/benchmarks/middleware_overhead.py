@@ -0,0 +1,146 @@
+"""
+Middleware stack overhead benchmark.
+
+Measures requests/sec of a trivial JSON endpoint with no middleware, with each
+middleware layer on its own and with the full stack used by ``app.main``.
+Requests are driven straight through the ASGI interface, so the numbers only
+contain framework and middleware cost (no sockets, no HTTP parsing).
+
+Usage (from the ``api_diet`` directory):
+
+    python -m benchmarks.middleware_overhead --requests 20000
+"""
+
+import os
+
+# Rate limiting is skipped in development, so benchmark production-like settings.
+# Must happen before anything imports app.config.
+os.environ.setdefault("ENVIRONMENT", "production")
+os.environ.setdefault("DEBUG", "False")
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.middleware.logging import LoggingMiddleware
+from app.middleware.rate_limiting import RateLimitingMiddleware
+from app.middleware.security import SecurityHeadersMiddleware
+
+MiddlewareSpec = Tuple[type, Dict[str, Any]]
+
+LAYERS: Dict[str, MiddlewareSpec] = {
+    "cors": (
+        CORSMiddleware,
+        {"allow_origins": ["http://localhost:4200"], "allow_methods": ["GET"]},
+    ),
+    "rate_limiting": (RateLimitingMiddleware, {"requests": 10**9, "window": 60}),
+    "security_headers": (SecurityHeadersMiddleware, {}),
+    "logging": (LoggingMiddleware, {}),
+}
+
+
+def build_app(layers: List[str]) -> FastAPI:
+    """Build a minimal app wrapped with the given middleware layers (innermost first)"""
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    for name in layers:
+        middleware_class, kwargs = LAYERS[name]
+        app.add_middleware(middleware_class, **kwargs)
+
+    return app
+
+
+def make_scope() -> Dict[str, Any]:
+    """Create an HTTP scope equivalent to ``GET /ping``"""
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"user-agent", b"benchmark"),
+            (b"origin", b"http://localhost:4200"),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+
+async def drive(app: Callable, requests: int) -> float:
+    """Send ``requests`` requests through the ASGI app and return requests/sec"""
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        return None
+
+    # Warm up (builds the middleware stack and primes caches)
+    for _ in range(min(500, requests)):
+        await app(make_scope(), receive, send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(make_scope(), receive, send)
+    elapsed = time.perf_counter() - start
+
+    return requests / elapsed
+
+
+async def run(requests: int, repeat: int) -> Dict[str, Any]:
+    """Benchmark every configuration and return the best of ``repeat`` runs"""
+    configurations: Dict[str, List[str]] = {"none": []}
+    for name in LAYERS:
+        configurations[name] = [name]
+    # Same registration order as create_application()
+    configurations["full_stack"] = ["cors", "rate_limiting", "security_headers", "logging"]
+
+    results: Dict[str, Any] = {}
+    baseline = None
+    for label, layers in configurations.items():
+        best = 0.0
+        for _ in range(repeat):
+            best = max(best, await drive(build_app(layers), requests))
+
+        if baseline is None:
+            baseline = best
+
+        results[label] = {
+            "requests_per_sec": round(best, 1),
+            "overhead_us_per_request": round((1 / best - 1 / baseline) * 1e6, 2),
+        }
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=10000, help="Requests per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration (best is kept)")
+    args = parser.parse_args()
+
+    # Keep log I/O out of the measurement; message formatting still happens
+    logging.basicConfig(level=logging.WARNING)
+
+    results = asyncio.run(run(args.requests, args.repeat))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
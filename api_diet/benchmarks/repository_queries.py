@@ -0,0 +1,253 @@
+"""
+Query benchmark of the diet and meal repositories at growing dataset sizes.
+
+For every scale (meal rows), grows the synthetic dataset to that size with
+``benchmarks.synthetic_data``, then times each ``DietRepository`` and
+``MealRepository`` method on random synthetic users, diets and meals. Every
+call runs in a fresh session, the way a request does; writes are rolled
+back. With ``--explain`` the plan of each read statement is recorded too,
+to see which index a query uses at which size.
+
+Usage (from the ``api_diet`` directory, against a disposable database):
+
+    python -m benchmarks.repository_queries --scales 10k,1m,10m --iterations 200 \
+        --output results/repository_queries.json
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+from random import Random
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import Engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models import MealType
+from app.repositories import DietRepository, MealRepository
+from benchmarks.synthetic_data import (
+    USER_PREFIX,
+    create_loader_engine,
+    default_database_url,
+    load,
+    parse_rows,
+    users_for_meal_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+Sample = Dict[str, str]
+
+
+def _create_diet(session: Session, sample: Sample) -> Any:
+    start = date.today() + timedelta(weeks=520)
+    return DietRepository(session).create_diet(
+        sample["user_id"], str(uuid.uuid4()), start, start + timedelta(days=6), "Benchmark"
+    )
+
+
+def _create_meal(session: Session, sample: Sample) -> Any:
+    return MealRepository(session).create_meal(
+        str(uuid.uuid4()), sample["diet_id"], MealType.LUNCH, 0, "13:00", "Benchmark", 500
+    )
+
+
+CASES: Dict[str, Callable[[Session, Sample], Any]] = {
+    "DietRepository.get": lambda s, x: DietRepository(s).get(x["diet_id"]),
+    "DietRepository.get_user_diets": lambda s, x: DietRepository(s).get_user_diets(x["user_id"]),
+    "DietRepository.get_latest_diet_id": lambda s, x: DietRepository(s).get_latest_diet_id(x["user_id"]),
+    "DietRepository.get_with_meals": lambda s, x: DietRepository(s).get_with_meals(x["diet_id"], x["user_id"]),
+    "DietRepository.get_current_week_diet": lambda s, x: DietRepository(s).get_current_week_diet(x["user_id"]),
+    "DietRepository.get_with_grocery_list": (
+        lambda s, x: DietRepository(s).get_with_grocery_list(x["diet_id"], x["user_id"])
+    ),
+    "DietRepository.count": lambda s, x: DietRepository(s).count({"user_id": x["user_id"]}),
+    "DietRepository.exists": lambda s, x: DietRepository(s).exists({"user_id": x["user_id"]}),
+    "DietRepository.create_diet": _create_diet,
+    "MealRepository.get_with_ingredients": lambda s, x: MealRepository(s).get_with_ingredients(x["meal_id"]),
+    "MealRepository.get_meals_by_diet": lambda s, x: MealRepository(s).get_meals_by_diet(x["diet_id"]),
+    "MealRepository.create_meal": _create_meal,
+}
+
+WRITES = {"DietRepository.create_diet", "MealRepository.create_meal"}
+
+
+def table_sizes(engine: Engine) -> Dict[str, int]:
+    """Planner row estimates (exact counts take minutes at 10M rows)"""
+    tables = ["users", "weekly_diets", "meals", "meal_ingredients", "grocery_list_items", "ingredients"]
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text("SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(:tables)"),
+            {"tables": tables},
+        ).all()
+    return {name: max(0, count) for name, count in sorted(rows)}
+
+
+def draw_samples(engine: Engine, count: int, seed: int) -> List[Sample]:
+    """Random (user, diet, meal) triples from the synthetic users"""
+    with engine.connect() as connection:
+        users = connection.execute(
+            text("SELECT count(*) FROM users WHERE id LIKE :prefix"), {"prefix": f"{USER_PREFIX}%"}
+        ).scalar_one()
+        if not users:
+            raise RuntimeError("No synthetic users, load a dataset first")
+
+        rng = Random(seed)
+        samples = []
+        for _ in range(count):
+            user_id = f"{USER_PREFIX}{rng.randrange(users):08d}"
+            diet_id = connection.execute(
+                text("SELECT id FROM weekly_diets WHERE user_id = :user_id ORDER BY random() LIMIT 1"),
+                {"user_id": user_id},
+            ).scalar_one()
+            meal_id = connection.execute(
+                text("SELECT id FROM meals WHERE weekly_diet_id = :diet_id ORDER BY random() LIMIT 1"),
+                {"diet_id": diet_id},
+            ).scalar_one()
+            samples.append({"user_id": user_id, "diet_id": diet_id, "meal_id": meal_id})
+    return samples
+
+
+def explain(engine: Engine, case: Callable[[Session, Sample], Any], sample: Sample) -> List[Dict[str, Any]]:
+    """Statements a read case issues, each with its ``EXPLAIN ANALYZE`` plan"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with factory() as session:
+            case(session, sample)
+            session.rollback()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    plans = []
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            for statement, parameters in statements:
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+                plans.append({"statement": " ".join(statement.split())[:300], "plan": [row[0] for row in cursor.fetchall()]})
+        raw.rollback()
+    finally:
+        raw.close()
+    return plans
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def benchmark(engine: Engine, samples: List[Sample], iterations: int, warmup: int, with_plans: bool) -> Dict[str, Any]:
+    """Latency of every case over ``iterations`` calls on the given samples"""
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    results: Dict[str, Any] = {}
+    for name, case in CASES.items():
+        durations = []
+        for i in range(warmup + iterations):
+            sample = samples[i % len(samples)]
+            with factory() as session:
+                # Check out the connection first, so pool waits stay out of the figure
+                session.connection()
+                started = time.perf_counter()
+                case(session, sample)
+                duration = time.perf_counter() - started
+                session.rollback()
+            if i >= warmup:
+                durations.append(duration)
+
+        durations.sort()
+        results[name] = {
+            "iterations": iterations,
+            "mean_ms": round(statistics.fmean(durations) * 1000, 3),
+            "p50_ms": round(_percentile(durations, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(durations, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(durations, 0.99) * 1000, 3),
+        }
+        if with_plans and name not in WRITES:
+            results[name]["plans"] = explain(engine, case, samples[0])
+        logger.info(f"{name}: p50 {results[name]['p50_ms']}ms, p95 {results[name]['p95_ms']}ms")
+    return results
+
+
+def run(
+    engine: Engine,
+    scales: List[str],
+    diets_per_user: int,
+    iterations: int,
+    warmup: int,
+    samples: int,
+    seed: int,
+    with_plans: bool,
+    grow: bool,
+) -> Dict[str, Any]:
+    """Benchmark results per scale; without ``grow`` the scales are only labels"""
+    results: Dict[str, Any] = {}
+    for label in sorted(scales, key=parse_rows) if grow else scales:
+        if grow:
+            meal_rows = parse_rows(label)
+            logger.info(f"Growing the dataset to {meal_rows:,} meal rows...")
+            # Rebuilding indexes once beats maintaining them for every row of a large load
+            load(
+                engine,
+                users=users_for_meal_rows(meal_rows, diets_per_user),
+                diets_per_user=diets_per_user,
+                seed=seed,
+                defer_indexes=meal_rows >= 1_000_000,
+            )
+        results[label] = {
+            "tables": table_sizes(engine),
+            "methods": benchmark(engine, draw_samples(engine, samples, seed), iterations, warmup, with_plans),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", default="10k,1m,10m", help="Comma-separated meal row counts to measure at")
+    parser.add_argument("--no-grow", action="store_true", help="Measure the current dataset as is, once")
+    parser.add_argument("--diets-per-user", type=int, default=52)
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per method and scale")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed calls per method and scale")
+    parser.add_argument("--samples", type=int, default=100, help="Distinct users/diets/meals queried")
+    parser.add_argument("--explain", action="store_true", help="Record EXPLAIN ANALYZE plans of the reads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="Target database (default: DATABASE_URL)")
+    parser.add_argument("--output", "-o", help="JSON results file (default: stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    engine = create_loader_engine(args.database_url or default_database_url(), pool_size=1, max_overflow=0)
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    try:
+        results = run(
+            engine,
+            ["current"] if args.no_grow else scales,
+            diets_per_user=args.diets_per_user,
+            iterations=args.iterations,
+            warmup=args.warmup,
+            samples=args.samples,
+            seed=args.seed,
+            with_plans=args.explain,
+            grow=not args.no_grow,
+        )
+    finally:
+        engine.dispose()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
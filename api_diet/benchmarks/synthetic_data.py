@@ -0,0 +1,366 @@
+"""
+Synthetic dataset generator for scale testing the schema.
+
+Bulk-loads N users x M weekly diets with ``COPY``: settings per user, 35
+meals per diet with 2-6 ingredients each, and the aggregated grocery list
+of every diet. Ingredients follow a Zipf distribution over a catalogue of
+real names plus a long tail, which is how LLM-generated ingredient names
+pile up in ``ingredients``. Diets go back one week at a time from the
+current week, so every user has a current-week diet.
+
+User ``synthetic-00000042`` always gets the same data for a given seed, so
+growing a dataset only loads the users it is missing.
+
+Usage (from the ``api_diet`` directory, against a disposable database):
+
+    python -m benchmarks.synthetic_data --users 1000 --diets-per-user 52
+    python -m benchmarks.synthetic_data --meal-rows 1m --defer-indexes
+"""
+
+import argparse
+import io
+import logging
+import math
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from random import Random
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import Engine, create_engine, text
+
+from app.models import Base
+from mock_llm.generators import DISHES, INGREDIENTS
+
+logger = logging.getLogger(__name__)
+
+USER_PREFIX = "synthetic-"
+MEALS_PER_DAY = (("BREAKFAST", "08:00"), ("SNACK", "10:30"), ("LUNCH", "13:00"), ("SNACK", "16:30"), ("DINNER", "20:00"))
+MEALS_PER_DIET = 7 * len(MEALS_PER_DAY)
+DISH_KEYS = {"BREAKFAST": "colazione", "SNACK": "spuntino", "LUNCH": "pranzo", "DINNER": "cena"}
+UNITS = ("g", "g", "g", "ml", "pezzi")
+
+# Child tables first: the order indexes are dropped in, and the reverse of the load order
+TABLES = (
+    "grocery_list_items",
+    "grocery_lists",
+    "meal_ingredients",
+    "meals",
+    "weekly_diets",
+    "user_settings",
+    "ingredients",
+    "users",
+)
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def parse_rows(value: str) -> int:
+    """Row count from ``10k``, ``1m``, ``10m`` or a plain integer"""
+    return SCALES.get(value.lower()) or int(value)
+
+
+class IngredientCatalogue:
+    """Ingredient names, units and quantity ranges, drawn with Zipf weights"""
+
+    def __init__(self, size: int, seed: int, exponent: float = 1.1):
+        rng = Random(f"{seed}:ingredients")
+        entries: Dict[str, Tuple[str, int, int]] = {}
+        for items in INGREDIENTS.values():
+            for name, unit, low, high in items:
+                entries.setdefault(name, (unit, low, high))
+        # Long tail: variations of the real names, as an LLM writes them
+        base_names = list(entries)
+        qualifiers = ("bio", "fresco", "surgelato", "light", "integrale", "al naturale", "di stagione", "grattugiato")
+        while len(entries) < size:
+            name = f"{rng.choice(base_names)} {rng.choice(qualifiers)} {len(entries)}"
+            unit = rng.choice(UNITS)
+            low = rng.randint(1, 3) if unit == "pezzi" else rng.randint(5, 150)
+            entries[name] = (unit, low, low * 2)
+
+        self.names = list(entries)[:size]
+        self.units = [entries[name][0] for name in self.names]
+        self.ranges = [(entries[name][1], entries[name][2]) for name in self.names]
+        self.ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in self.names]
+        self.cumulative_weights = []
+        total = 0.0
+        for rank in range(1, len(self.names) + 1):
+            total += 1 / rank**exponent
+            self.cumulative_weights.append(total)
+        self.indexes = range(len(self.names))
+
+    def sample(self, rng: Random, k: int) -> List[int]:
+        """``k`` distinct ingredient indexes"""
+        chosen: List[int] = []
+        while len(chosen) < k:
+            index = rng.choices(self.indexes, cum_weights=self.cumulative_weights)[0]
+            if index not in chosen:
+                chosen.append(index)
+        return chosen
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class CopyBuffers:
+    """One ``COPY ... FROM STDIN`` text buffer per table"""
+
+    COLUMNS = {
+        "users": ("id", "email", "created_at"),
+        "user_settings": ("id", "user_id", "weight", "height", "other_data", "goals", "created_at", "updated_at"),
+        "weekly_diets": ("id", "user_id", "start_date", "end_date", "name", "created_at"),
+        "meals": ("id", "weekly_diet_id", "meal_type", "day", "time", "recipe", "calories"),
+        "meal_ingredients": ("id", "meal_id", "ingredient_id", "quantity"),
+        "grocery_lists": ("id", "weekly_diet_id"),
+        "grocery_list_items": ("id", "grocery_list_id", "ingredient_id", "quantity"),
+    }
+
+    def __init__(self):
+        self.buffers = {table: io.StringIO() for table in self.COLUMNS}
+        self.rows = {table: 0 for table in self.COLUMNS}
+
+    def add(self, table: str, *values) -> None:
+        self.buffers[table].write("\t".join(_copy_value(value) for value in values) + "\n")
+        self.rows[table] += 1
+
+    def copy(self, cursor) -> None:
+        # Parents before children so foreign keys hold at every step
+        for table in reversed(TABLES):
+            if table not in self.COLUMNS or not self.rows[table]:
+                continue
+            buffer = self.buffers[table]
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(self.COLUMNS[table])}) FROM STDIN", buffer)
+
+
+def _uuid(rng: Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_user(
+    buffers: CopyBuffers,
+    catalogue: IngredientCatalogue,
+    index: int,
+    diets_per_user: int,
+    seed: int,
+    current_monday: date,
+) -> None:
+    """All rows of one synthetic user, deterministic in (seed, index)"""
+    rng = Random(f"{seed}:user:{index}")
+    user_id = f"{USER_PREFIX}{index:08d}"
+    first_monday = current_monday - timedelta(weeks=diets_per_user - 1)
+    joined = datetime.combine(first_monday, dt_time(9), tzinfo=timezone.utc) - timedelta(days=rng.randint(0, 30))
+
+    buffers.add("users", user_id, f"{user_id}@synthetic.local", joined.isoformat())
+    buffers.add(
+        "user_settings",
+        _uuid(rng),
+        user_id,
+        round(rng.uniform(50, 110), 1),
+        round(rng.uniform(150, 200), 1),
+        rng.choice(["", "Vegetariano", "Intollerante al lattosio", "Sport 3 volte a settimana"]),
+        rng.choice(["Perdere peso", "Mantenimento", "Aumentare la massa muscolare"]),
+        joined.isoformat(),
+        joined.isoformat(),
+    )
+
+    for week in range(diets_per_user):
+        start = first_monday + timedelta(weeks=week)
+        # Generated during the weekend before the week starts
+        created = datetime.combine(start, dt_time(20), tzinfo=timezone.utc) - timedelta(
+            days=1, minutes=rng.randint(0, 24 * 60)
+        )
+        diet_id = _uuid(rng)
+        buffers.add(
+            "weekly_diets", diet_id, user_id, start.isoformat(), (start + timedelta(days=6)).isoformat(),
+            f"Piano settimanale dal {start.isoformat()}", created.isoformat(),
+        )
+
+        totals: Dict[int, float] = {}
+        for day in range(7):
+            for meal_type, meal_time in MEALS_PER_DAY:
+                meal_id = _uuid(rng)
+                chosen = catalogue.sample(rng, rng.choices((2, 3, 4, 5, 6), weights=(10, 30, 35, 18, 7))[0])
+                dish = rng.choice(DISHES[DISH_KEYS[meal_type]])
+                recipe = f"{dish}: " + ", ".join(catalogue.names[i].lower() for i in chosen) + "."
+                calories = rng.randint(150, 300) if meal_type == "SNACK" else rng.randint(350, 750)
+                buffers.add("meals", meal_id, diet_id, meal_type, day, meal_time, recipe, calories)
+                for i in chosen:
+                    quantity = float(rng.randint(*catalogue.ranges[i]))
+                    totals[i] = totals.get(i, 0.0) + quantity
+                    buffers.add("meal_ingredients", _uuid(rng), meal_id, catalogue.ids[i], quantity)
+
+        grocery_list_id = _uuid(rng)
+        buffers.add("grocery_lists", grocery_list_id, diet_id)
+        for i, quantity in sorted(totals.items()):
+            buffers.add("grocery_list_items", _uuid(rng), grocery_list_id, catalogue.ids[i], round(quantity, 1))
+
+
+def existing_users(engine: Engine) -> int:
+    """Number of synthetic users already loaded (they are always loaded from index 0 up)"""
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT count(*) FROM users WHERE id LIKE :prefix"), {"prefix": f"{USER_PREFIX}%"}
+        ).scalar_one()
+
+
+def _ensure_ingredients(engine: Engine, catalogue: IngredientCatalogue) -> None:
+    """Insert the catalogue, adopting the ids of ingredients that already exist by name"""
+    with engine.begin() as connection:
+        rows = connection.execute(
+            text("SELECT name, id FROM ingredients WHERE name = ANY(:names)"), {"names": catalogue.names}
+        ).all()
+        existing = dict(rows)
+        catalogue.ids = [existing.get(name, ingredient_id) for name, ingredient_id in zip(catalogue.names, catalogue.ids)]
+        missing = [
+            {"id": catalogue.ids[i], "name": name, "unit": catalogue.units[i]}
+            for i, name in enumerate(catalogue.names)
+            if name not in existing
+        ]
+        if missing:
+            connection.execute(text("INSERT INTO ingredients (id, name, unit) VALUES (:id, :name, :unit)"), missing)
+
+
+def _secondary_indexes(tables: Sequence[str]):
+    for table in tables:
+        yield from Base.metadata.tables[table].indexes
+
+
+def load(
+    engine: Engine,
+    users: int,
+    diets_per_user: int,
+    ingredients: int = 1500,
+    seed: int = 0,
+    batch_diets: int = 2000,
+    defer_indexes: bool = False,
+) -> Dict[str, int]:
+    """
+    Grow the synthetic dataset to ``users`` users and return the rows loaded per table.
+
+    With ``defer_indexes`` the secondary indexes of the loaded tables are
+    dropped first and rebuilt at the end, which is several times faster
+    for large loads but leaves the tables unindexed meanwhile.
+    """
+    start_index = existing_users(engine)
+    if start_index >= users:
+        logger.info(f"{start_index} synthetic users already loaded, nothing to do")
+        return {}
+
+    catalogue = IngredientCatalogue(ingredients, seed)
+    _ensure_ingredients(engine, catalogue)
+
+    today = date.today()
+    current_monday = today - timedelta(days=today.weekday())
+    batch_users = max(1, batch_diets // max(1, diets_per_user))
+    loaded: Dict[str, int] = {}
+    tables = [table for table in TABLES if table not in ("ingredients", "users")]
+
+    if defer_indexes:
+        with engine.begin() as connection:
+            for index in _secondary_indexes(tables):
+                index.drop(connection, checkfirst=True)
+
+    started = time.perf_counter()
+    try:
+        for batch_start in range(start_index, users, batch_users):
+            buffers = CopyBuffers()
+            for index in range(batch_start, min(users, batch_start + batch_users)):
+                generate_user(buffers, catalogue, index, diets_per_user, seed, current_monday)
+
+            connection = engine.raw_connection()
+            try:
+                with connection.cursor() as cursor:
+                    buffers.copy(cursor)
+                connection.commit()
+            finally:
+                connection.close()
+
+            for table, rows in buffers.rows.items():
+                loaded[table] = loaded.get(table, 0) + rows
+            done = min(users, batch_start + batch_users)
+            logger.info(
+                f"Loaded users {done}/{users}, {loaded['meals']:,} meals "
+                f"({loaded['meals'] / (time.perf_counter() - started):,.0f} meals/s)"
+            )
+    finally:
+        if defer_indexes:
+            logger.info("Rebuilding indexes...")
+            with engine.begin() as connection:
+                for index in _secondary_indexes(tables):
+                    index.create(connection, checkfirst=True)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table in TABLES:
+            connection.execute(text(f"ANALYZE {table}"))
+    return loaded
+
+
+def users_for_meal_rows(meal_rows: int, diets_per_user: int) -> int:
+    return max(1, math.ceil(meal_rows / (diets_per_user * MEALS_PER_DIET)))
+
+
+def delete_synthetic(engine: Engine) -> int:
+    """Delete every synthetic user; their diets, meals and settings go with them"""
+    with engine.begin() as connection:
+        return connection.execute(
+            text("DELETE FROM users WHERE id LIKE :prefix"), {"prefix": f"{USER_PREFIX}%"}
+        ).rowcount
+
+
+def default_database_url() -> str:
+    from app.config import settings
+
+    return settings.database_url
+
+
+def create_loader_engine(url: str, **kwargs: Any) -> Engine:
+    """Engine on psycopg2 whatever the URL says, since rows are loaded with its ``copy_expert``"""
+    from app.database import with_driver
+
+    return create_engine(with_driver(url, "psycopg2"), **kwargs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--users", type=int, help="Synthetic users to grow the dataset to")
+    size.add_argument("--meal-rows", type=parse_rows, help="Meal rows to grow the dataset to (10k, 1m, 10m, ...)")
+    parser.add_argument("--diets-per-user", type=int, default=52, help="Weekly diets per user (52 = a year)")
+    parser.add_argument("--ingredients", type=int, default=1500, help="Size of the ingredient catalogue")
+    parser.add_argument("--batch-diets", type=int, default=2000, help="Diets per COPY transaction")
+    parser.add_argument("--defer-indexes", action="store_true", help="Drop secondary indexes during the load")
+    parser.add_argument("--delete", action="store_true", help="Delete all synthetic users and exit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="Target database (default: DATABASE_URL)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    engine = create_loader_engine(args.database_url or default_database_url())
+    try:
+        if args.delete:
+            logger.info(f"Deleted {delete_synthetic(engine)} synthetic users")
+            return
+        users = args.users
+        if users is None:
+            users = users_for_meal_rows(args.meal_rows or SCALES["10k"], args.diets_per_user)
+        loaded = load(
+            engine,
+            users=users,
+            diets_per_user=args.diets_per_user,
+            ingredients=args.ingredients,
+            seed=args.seed,
+            batch_diets=args.batch_diets,
+            defer_indexes=args.defer_indexes,
+        )
+        for table, rows in loaded.items():
+            logger.info(f"{table}: {rows:,} rows")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
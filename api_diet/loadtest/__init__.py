@@ -0,0 +1,21 @@
+"""
+HTTP load tests for the diet API.
+
+A local asyncio client drives every route of ``app/api/v1`` with a
+configurable traffic mix and concurrency, reports throughput and
+p50/p95/p99 latency per route as JSON, and compares two reports to flag
+regressions. Run the API against a local Postgres and the mock LLM.
+"""
+
+from .report import build_report, compare_reports
+from .runner import LoadTest, RunConfig
+from .scenarios import MIXES, resolve_mix
+
+__all__ = [
+    "LoadTest",
+    "MIXES",
+    "RunConfig",
+    "build_report",
+    "compare_reports",
+    "resolve_mix",
+]
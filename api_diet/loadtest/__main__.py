@@ -0,0 +1,154 @@
+"""
+Run a load test or compare two runs.
+
+Usage (from the ``api_diet`` directory, with the API pointed at the mock LLM):
+
+    python -m loadtest run --mix read_heavy --concurrency 32 --users 200 --duration 120 \
+        --tag workers=4 --tag pool_size=10 --output results/workers4.json
+
+    python -m loadtest compare results/workers2.json results/workers4.json --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from loadtest.report import compare_reports, format_comparison, load_report
+from loadtest.runner import LoadTest, RunConfig, seed_users
+from loadtest.scenarios import MIXES, resolve_mix
+
+
+def _tags(values):
+    tags = {}
+    for value in values or []:
+        key, sep, item = value.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid tag {value!r}, expected key=value")
+        tags[key.strip()] = item.strip()
+    return tags
+
+
+def run(args: argparse.Namespace) -> int:
+    weights = resolve_mix(args.mix, args.weights)
+    config = RunConfig(
+        base_url=args.base_url,
+        weights=weights,
+        concurrency=args.concurrency,
+        users=args.users,
+        duration=args.duration,
+        requests=args.requests,
+        warmup=args.warmup,
+        think_time=args.think_time,
+        timeout=args.timeout,
+        slow_timeout=args.slow_timeout,
+        user_prefix=args.user_prefix,
+        create_diets=not args.no_create_diets,
+        seed=args.seed,
+        meta={
+            "label": args.label,
+            "mix": args.mix,
+            "tags": _tags(args.tag),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+    load_test = LoadTest(config)
+
+    if not args.no_seed:
+        database_url = args.database_url
+        if database_url is None:
+            from app.config import settings
+
+            database_url = settings.database_url
+        seed_users(database_url, [user.user_id for user in load_test.users])
+
+    report = asyncio.run(load_test.run())
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        total = report["total"]
+        print(
+            f"{total['count']} requests, {total['throughput_rps']} req/s, "
+            f"p50 {total['p50_ms']}ms, p95 {total['p95_ms']}ms, p99 {total['p99_ms']}ms, "
+            f"error rate {total['error_rate']:.2%} -> {args.output}"
+        )
+    else:
+        print(output)
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    comparison = compare_reports(
+        load_report(args.baseline),
+        load_report(args.candidate),
+        latency_threshold=args.threshold,
+        throughput_threshold=args.throughput_threshold if args.throughput_threshold is not None else args.threshold,
+        error_rate_threshold=args.error_rate_threshold,
+        min_count=args.min_count,
+    )
+    if args.json:
+        print(json.dumps(comparison, indent=2))
+    else:
+        print(format_comparison(comparison))
+        for note in comparison["notes"]:
+            print(f"NOTE {note}")
+        for regression in comparison["regressions"]:
+            print(f"REGRESSION {regression['route']}: {', '.join(regression['reasons'])}")
+    return 1 if comparison["regressions"] else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="HTTP load tests for the diet API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Drive traffic and write a JSON report")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--mix", default="read_heavy", choices=sorted(MIXES))
+    run_parser.add_argument(
+        "--weights",
+        help='Comma-separated route=weight overrides, e.g. "POST /diet/create_diet=0"',
+    )
+    run_parser.add_argument("--concurrency", type=int, default=10, help="Concurrent connections (workers)")
+    run_parser.add_argument("--users", type=int, default=50, help="Virtual users")
+    run_parser.add_argument("--duration", type=float, default=60.0, help="Measured seconds after the warmup")
+    run_parser.add_argument("--requests", type=int, help="Stop after this many requests instead of a duration")
+    run_parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of traffic left out of the report")
+    run_parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between requests per worker")
+    run_parser.add_argument("--timeout", type=float, default=10.0, help="Timeout of database-only routes")
+    run_parser.add_argument("--slow-timeout", type=float, default=180.0, help="Timeout of routes that call the LLM")
+    run_parser.add_argument("--user-prefix", default="loadtest")
+    run_parser.add_argument("--no-create-diets", action="store_true", help="Do not generate diets during setup")
+    run_parser.add_argument("--no-seed", action="store_true", help="Do not insert the virtual users into the database")
+    run_parser.add_argument("--database-url", help="Database used to seed users (default: the API's DATABASE_URL)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--label", help="Name of the run in the report")
+    run_parser.add_argument("--tag", action="append", help="key=value recorded in the report (repeatable)")
+    run_parser.add_argument("--output", "-o", help="Report file (default: stdout)")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two reports and flag regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative p95/p99 increase")
+    compare_parser.add_argument(
+        "--throughput-threshold", type=float, help="Allowed relative throughput drop (default: --threshold)"
+    )
+    compare_parser.add_argument(
+        "--error-rate-threshold", type=float, default=0.01, help="Allowed absolute error rate increase"
+    )
+    compare_parser.add_argument("--min-count", type=int, default=20, help="Requests a route needs to be judged")
+    compare_parser.add_argument("--json", action="store_true", help="Print the comparison as JSON")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # httpx logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
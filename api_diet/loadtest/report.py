@@ -0,0 +1,146 @@
+"""Latency statistics, JSON reports and run comparison"""
+
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class RouteSamples:
+    """Raw outcomes of one route during a run"""
+
+    durations: List[float] = field(default_factory=list)
+    status_codes: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def add(self, duration: float, status_code: Optional[int]) -> None:
+        self.durations.append(duration)
+        key = str(status_code) if status_code is not None else "connection_error"
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if status_code is None or status_code >= 500:
+            self.errors += 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: RouteSamples, elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency figures (milliseconds) of one route"""
+    durations = sorted(samples.durations)
+    count = len(durations)
+    return {
+        "count": count,
+        "errors": samples.errors,
+        "error_rate": round(samples.errors / count, 4) if count else 0.0,
+        "status_codes": dict(sorted(samples.status_codes.items())),
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(durations) / count * 1000, 2) if count else 0.0,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 2),
+        "max_ms": round(durations[-1] * 1000, 2) if count else 0.0,
+    }
+
+
+def build_report(meta: Dict[str, Any], routes: Dict[str, RouteSamples], elapsed: float) -> Dict[str, Any]:
+    """Run report: metadata, per-route figures and the total over all routes"""
+    total = RouteSamples()
+    for samples in routes.values():
+        total.durations.extend(samples.durations)
+        total.errors += samples.errors
+        for status_code, count in samples.status_codes.items():
+            total.status_codes[status_code] = total.status_codes.get(status_code, 0) + count
+
+    return {
+        "meta": {**meta, "elapsed_seconds": round(elapsed, 2)},
+        "routes": {route: summarize(routes[route], elapsed) for route in sorted(routes)},
+        "total": summarize(total, elapsed),
+    }
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    candidate: Dict[str, Any],
+    latency_threshold: float,
+    throughput_threshold: float,
+    error_rate_threshold: float,
+    min_count: int = 20,
+) -> Dict[str, Any]:
+    """
+    Compare two run reports route by route.
+
+    A route regresses when its p95 or p99 grows by more than
+    ``latency_threshold`` (relative), its throughput drops by more than
+    ``throughput_threshold`` (relative) or its error rate grows by more than
+    ``error_rate_threshold`` (absolute). Routes with fewer than ``min_count``
+    requests in either run are reported but never flagged.
+    """
+    rows = []
+    regressions = []
+    routes = sorted(set(baseline["routes"]) | set(candidate["routes"]))
+    for route in routes + ["total"]:
+        before = baseline["total"] if route == "total" else baseline["routes"].get(route)
+        after = candidate["total"] if route == "total" else candidate["routes"].get(route)
+        if before is None or after is None:
+            rows.append({"route": route, "missing_in": "baseline" if before is None else "candidate"})
+            continue
+
+        deltas = {}
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            deltas[metric] = round((after[metric] - before[metric]) / before[metric], 4) if before[metric] else None
+        deltas["error_rate"] = round(after["error_rate"] - before["error_rate"], 4)
+
+        reasons = []
+        if min(before["count"], after["count"]) >= min_count:
+            for metric in ("p95_ms", "p99_ms"):
+                if deltas[metric] is not None and deltas[metric] > latency_threshold:
+                    reasons.append(f"{metric} +{deltas[metric]:.0%}")
+            if deltas["throughput_rps"] is not None and deltas["throughput_rps"] < -throughput_threshold:
+                reasons.append(f"throughput {deltas['throughput_rps']:.0%}")
+            if deltas["error_rate"] > error_rate_threshold:
+                reasons.append(f"error rate +{deltas['error_rate']:.2%}")
+
+        row = {"route": route, "baseline": before, "candidate": after, "deltas": deltas, "regressions": reasons}
+        rows.append(row)
+        if reasons:
+            regressions.append({"route": route, "reasons": reasons})
+
+    # Per-route throughput only compares across runs of the same traffic shape
+    notes = [
+        f"{key} differs: {baseline['meta'].get(key)!r} -> {candidate['meta'].get(key)!r}"
+        for key in ("weights", "concurrency", "users", "think_time")
+        if baseline["meta"].get(key) != candidate["meta"].get(key)
+    ]
+    return {"routes": rows, "regressions": regressions, "notes": notes}
+
+
+def format_comparison(comparison: Dict[str, Any]) -> str:
+    """Human-readable table of a comparison"""
+    lines = [f"{'route':<45} {'p50':>16} {'p95':>16} {'p99':>16} {'rps':>14}  flags"]
+
+    def cell(row: Dict[str, Any], metric: str) -> str:
+        delta = row["deltas"][metric]
+        value = row["candidate"][metric]
+        return f"{value:>8.1f} ({delta:+.0%})" if delta is not None else f"{value:>8.1f} (  n/a)"
+
+    for row in comparison["routes"]:
+        if "missing_in" in row:
+            lines.append(f"{row['route']:<45} missing in {row['missing_in']}")
+            continue
+        flags = "; ".join(row["regressions"]) or "ok"
+        lines.append(
+            f"{row['route']:<45} {cell(row, 'p50_ms'):>16} {cell(row, 'p95_ms'):>16} "
+            f"{cell(row, 'p99_ms'):>16} {cell(row, 'throughput_rps'):>14}  {flags}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,156 @@
+"""Closed-loop asyncio load generator"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from random import Random
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from loadtest.report import RouteSamples, build_report
+from loadtest.scenarios import OPERATIONS, VirtualUser, prepare_user
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RunConfig:
+    """Shape of a load-test run"""
+
+    base_url: str
+    weights: Dict[str, float]
+    concurrency: int = 10
+    users: int = 50
+    duration: Optional[float] = 60.0  # Seconds; ignored when ``requests`` is set
+    requests: Optional[int] = None
+    warmup: float = 5.0  # Seconds of traffic excluded from the report
+    think_time: float = 0.0  # Pause of each worker between requests
+    timeout: float = 10.0
+    slow_timeout: float = 180.0  # Routes that can reach the LLM
+    user_prefix: str = "loadtest"
+    create_diets: bool = True  # Generate a diet during setup for users that have none
+    seed: int = 0
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+
+def seed_users(database_url: str, user_ids: List[str]) -> None:
+    """Create the ``users`` rows the virtual users' data hangs off (existing rows are kept)"""
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO users (id, email) VALUES (:id, :email) ON CONFLICT DO NOTHING"),
+                [{"id": user_id, "email": f"{user_id}@loadtest.local"} for user_id in user_ids],
+            )
+    finally:
+        engine.dispose()
+
+
+class LoadTest:
+    """Virtual users driven by ``concurrency`` workers, each sending its next request when the last one ends"""
+
+    def __init__(self, config: RunConfig):
+        self.config = config
+        self.rng = Random(config.seed)
+        self.users = [VirtualUser(f"{config.user_prefix}-{i:05d}") for i in range(config.users)]
+        self.routes = list(config.weights)
+        self.cumulative_weights = []
+        total = 0.0
+        for route in self.routes:
+            total += config.weights[route]
+            self.cumulative_weights.append(total)
+        self.samples: Dict[str, RouteSamples] = {}
+        self.skipped: Dict[str, int] = {}
+        self._issued = 0
+        self._deadline = 0.0
+        self._measure_from = 0.0
+
+    async def prepare(self, client: httpx.AsyncClient) -> None:
+        """Run every virtual user's setup, ``concurrency`` at a time"""
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+
+        async def prepare_one(user: VirtualUser, rng: Random) -> None:
+            async with semaphore:
+                await prepare_user(client, user, rng, self.config.create_diets)
+
+        await asyncio.gather(*(prepare_one(user, Random(self.rng.random())) for user in self.users))
+        ready = sum(1 for user in self.users if user.meal_ids)
+        logger.info(f"Prepared {len(self.users)} users, {ready} with a diet")
+
+    def _next_request(self) -> bool:
+        if self.config.requests is not None:
+            self._issued += 1
+            return self._issued <= self.config.requests
+        return time.perf_counter() < self._deadline
+
+    def _pick(self, rng: Random):
+        user = rng.choice(self.users)
+        for _ in range(10):
+            route = rng.choices(self.routes, cum_weights=self.cumulative_weights)[0]
+            request = OPERATIONS[route].build(user, rng)
+            if request is not None:
+                return user, OPERATIONS[route], request
+            self.skipped[route] = self.skipped.get(route, 0) + 1
+            user = rng.choice(self.users)
+        return None
+
+    async def _worker(self, client: httpx.AsyncClient, rng: Random) -> None:
+        while self._next_request():
+            picked = self._pick(rng)
+            if picked is None:
+                await asyncio.sleep(0.1)
+                continue
+            user, operation, (path, kwargs) = picked
+            headers = {**user.headers, **kwargs.pop("headers", {})}
+            timeout = self.config.slow_timeout if operation.slow else self.config.timeout
+
+            started = time.perf_counter()
+            status_code = None
+            body = None
+            try:
+                response = await client.request(operation.method, path, headers=headers, timeout=timeout, **kwargs)
+                status_code = response.status_code
+                if operation.learn is not None and status_code == 200:
+                    body = response.json()
+            except httpx.HTTPError as e:
+                logger.debug(f"{operation.route} failed: {e!r}")
+            duration = time.perf_counter() - started
+
+            if body is not None:
+                operation.learn(user, body)
+            if started >= self._measure_from:
+                self.samples.setdefault(operation.route, RouteSamples()).add(duration, status_code)
+
+            if self.config.think_time > 0:
+                await asyncio.sleep(rng.expovariate(1 / self.config.think_time))
+
+    async def run(self) -> Dict[str, Any]:
+        """Prepare the users, drive the traffic and return the report"""
+        limits = httpx.Limits(max_connections=self.config.concurrency, max_keepalive_connections=self.config.concurrency)
+        async with httpx.AsyncClient(base_url=self.config.base_url, limits=limits, timeout=self.config.slow_timeout) as client:
+            await self.prepare(client)
+
+            started = time.perf_counter()
+            self._measure_from = started + (self.config.warmup if self.config.requests is None else 0.0)
+            self._deadline = self._measure_from + (self.config.duration or 0.0)
+            workers = [self._worker(client, Random(self.rng.random())) for _ in range(self.config.concurrency)]
+            await asyncio.gather(*workers)
+            elapsed = time.perf_counter() - max(started, self._measure_from)
+
+        meta = {
+            **self.config.meta,
+            "base_url": self.config.base_url,
+            "weights": self.config.weights,
+            "concurrency": self.config.concurrency,
+            "users": self.config.users,
+            "duration": self.config.duration if self.config.requests is None else None,
+            "requests": self.config.requests,
+            "warmup": self.config.warmup if self.config.requests is None else 0.0,
+            "think_time": self.config.think_time,
+            "seed": self.config.seed,
+            "skipped": dict(sorted(self.skipped.items())),
+        }
+        return build_report(meta, self.samples, elapsed)
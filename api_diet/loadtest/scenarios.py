@@ -0,0 +1,197 @@
+"""
+Routes of ``app/api/v1`` as load-test operations, plus built-in traffic mixes.
+
+Every operation is keyed by its route template, which is also the key of
+the per-route figures in the report. Operations that need an id (a diet, a
+meal) are skipped for virtual users that have none yet; ids are learned
+from the responses of the list, current-week, by-id and create routes.
+"""
+
+import uuid
+from dataclasses import dataclass, field
+from random import Random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+API_PREFIX = "/api/v1"
+
+SETTINGS_GET = "GET /settings/get_user_settings"
+SETTINGS_UPDATE = "POST /settings/update_user_settings"
+DIET_LIST = "GET /diet/list"
+DIET_CURRENT_WEEK = "GET /diet/current_week"
+DIET_CREATE = "POST /diet/create_diet"
+DIET_BY_ID = "GET /diet/{diet_id}"
+DIET_GROCERY_LIST = "GET /diet/{diet_id}/grocery-list"
+MEAL_DETAILS = "GET /meals/{meal_id}"
+MEAL_RECIPE = "GET /meals/{meal_id}/recipe"
+
+# Relative weights; routes missing from a mix are never requested
+MIXES: Dict[str, Dict[str, float]] = {
+    # Browsing only: no route that can reach the LLM
+    "browse": {
+        SETTINGS_GET: 10,
+        DIET_LIST: 20,
+        DIET_CURRENT_WEEK: 25,
+        DIET_BY_ID: 20,
+        DIET_GROCERY_LIST: 10,
+        MEAL_DETAILS: 15,
+    },
+    # Typical traffic: mostly reads, occasional recipes and regenerations
+    "read_heavy": {
+        SETTINGS_GET: 8,
+        SETTINGS_UPDATE: 2,
+        DIET_LIST: 15,
+        DIET_CURRENT_WEEK: 25,
+        DIET_BY_ID: 15,
+        DIET_GROCERY_LIST: 10,
+        MEAL_DETAILS: 18,
+        MEAL_RECIPE: 5,
+        DIET_CREATE: 2,
+    },
+    # Stress on the generation path (LLM, inserts, single-flight)
+    "generation_heavy": {
+        SETTINGS_GET: 5,
+        SETTINGS_UPDATE: 5,
+        DIET_CURRENT_WEEK: 15,
+        DIET_BY_ID: 10,
+        MEAL_DETAILS: 10,
+        MEAL_RECIPE: 25,
+        DIET_CREATE: 30,
+    },
+}
+
+
+@dataclass
+class VirtualUser:
+    """A simulated user and the ids it has seen so far"""
+
+    user_id: str
+    diet_ids: List[str] = field(default_factory=list)
+    meal_ids: List[str] = field(default_factory=list)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"X-User-Id": self.user_id}
+
+
+@dataclass(frozen=True)
+class Operation:
+    """One route: how to build a request for a user and what to learn from the answer"""
+
+    route: str
+    build: Callable[[VirtualUser, Random], Optional[Tuple[str, Dict[str, Any]]]]
+    learn: Optional[Callable[[VirtualUser, Any], None]] = None
+    slow: bool = False  # May call the LLM; uses the long request timeout
+
+    @property
+    def method(self) -> str:
+        return self.route.split(" ", 1)[0]
+
+
+def settings_payload(rng: Random) -> Dict[str, Any]:
+    return {
+        "weight": round(rng.uniform(50, 110), 1),
+        "height": round(rng.uniform(150, 200), 1),
+        "goals": rng.choice(["Perdere peso", "Mantenimento", "Aumentare la massa muscolare"]),
+        "other_data": rng.choice(["", "Vegetariano", "Intollerante al lattosio", "Sport 3 volte a settimana"]),
+    }
+
+
+def _path(template: str, **ids: str) -> str:
+    return API_PREFIX + template.split(" ", 1)[1].format(**ids)
+
+
+def _learn_diet_list(user: VirtualUser, body: Any) -> None:
+    ids = [diet["id"] for diet in body or [] if isinstance(diet, dict) and "id" in diet]
+    if ids:
+        user.diet_ids = ids
+
+
+def _learn_meals(user: VirtualUser, body: Any) -> None:
+    # DietaSettimanaleSchema directly, or wrapped in DietaConLista
+    diet = body.get("dieta", body) if isinstance(body, dict) else None
+    ids = [meal["id"] for meal in (diet or {}).get("pasti", []) if "id" in meal]
+    if ids:
+        user.meal_ids = ids
+
+
+def _with_diet(template: str) -> Callable[[VirtualUser, Random], Optional[Tuple[str, Dict[str, Any]]]]:
+    def build(user: VirtualUser, rng: Random):
+        return (_path(template, diet_id=rng.choice(user.diet_ids)), {}) if user.diet_ids else None
+
+    return build
+
+
+def _with_meal(template: str) -> Callable[[VirtualUser, Random], Optional[Tuple[str, Dict[str, Any]]]]:
+    def build(user: VirtualUser, rng: Random):
+        return (_path(template, meal_id=rng.choice(user.meal_ids)), {}) if user.meal_ids else None
+
+    return build
+
+
+def _create_diet(user: VirtualUser, rng: Random):
+    # A fresh key per request: retries of the same request are not what is measured here
+    return _path(DIET_CREATE), {"headers": {"Idempotency-Key": uuid.uuid4().hex}}
+
+
+OPERATIONS: Dict[str, Operation] = {
+    op.route: op
+    for op in (
+        Operation(SETTINGS_GET, lambda user, rng: (_path(SETTINGS_GET), {})),
+        Operation(SETTINGS_UPDATE, lambda user, rng: (_path(SETTINGS_UPDATE), {"json": settings_payload(rng)})),
+        Operation(DIET_LIST, lambda user, rng: (_path(DIET_LIST), {}), learn=_learn_diet_list),
+        Operation(DIET_CURRENT_WEEK, lambda user, rng: (_path(DIET_CURRENT_WEEK), {}), learn=_learn_meals),
+        Operation(DIET_CREATE, _create_diet, learn=_learn_meals, slow=True),
+        Operation(DIET_BY_ID, _with_diet(DIET_BY_ID), learn=_learn_meals),
+        Operation(DIET_GROCERY_LIST, _with_diet(DIET_GROCERY_LIST)),
+        Operation(MEAL_DETAILS, _with_meal(MEAL_DETAILS)),
+        Operation(MEAL_RECIPE, _with_meal(MEAL_RECIPE), slow=True),
+    )
+}
+
+
+def resolve_mix(name: str, overrides: Optional[str] = None) -> Dict[str, float]:
+    """
+    Weights of a built-in mix, updated with ``route=weight`` overrides separated
+    by commas (``"GET /meals/{meal_id}/recipe=0,POST /diet/create_diet=10"``).
+
+    Raises:
+        ValueError: Unknown mix or route, or a malformed override
+    """
+    if name not in MIXES:
+        raise ValueError(f"Unknown mix {name!r}, expected one of: {', '.join(MIXES)}")
+    weights = dict(MIXES[name])
+    for item in filter(None, (part.strip() for part in (overrides or "").split(","))):
+        route, sep, weight = item.rpartition("=")
+        route = route.strip()
+        if not sep or route not in OPERATIONS:
+            raise ValueError(f"Invalid weight override {item!r}, routes are: {', '.join(OPERATIONS)}")
+        weights[route] = float(weight)
+    weights = {route: weight for route, weight in weights.items() if weight > 0}
+    if not weights:
+        raise ValueError("The mix has no route with a positive weight")
+    return weights
+
+
+async def prepare_user(client: httpx.AsyncClient, user: VirtualUser, rng: Random, create_diets: bool) -> None:
+    """Give a virtual user settings and, optionally, a diet; learn its diet and meal ids"""
+    response = await client.post(_path(SETTINGS_UPDATE), json=settings_payload(rng), headers=user.headers)
+    response.raise_for_status()
+
+    response = await client.get(_path(DIET_LIST), headers=user.headers)
+    response.raise_for_status()
+    _learn_diet_list(user, response.json())
+
+    if not user.diet_ids and create_diets:
+        _, kwargs = _create_diet(user, rng)
+        response = await client.post(_path(DIET_CREATE), headers={**user.headers, **kwargs["headers"]}, timeout=None)
+        response.raise_for_status()
+        response = await client.get(_path(DIET_LIST), headers=user.headers)
+        response.raise_for_status()
+        _learn_diet_list(user, response.json())
+
+    if user.diet_ids:
+        response = await client.get(_path(DIET_BY_ID, diet_id=user.diet_ids[0]), headers=user.headers)
+        response.raise_for_status()
+        _learn_meals(user, response.json())
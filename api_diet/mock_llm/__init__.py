@@ -0,0 +1,16 @@
+"""
+Local OpenAI-compatible mock LLM server.
+
+Serves ``POST /v1/chat/completions`` with schema-valid ``DietaSettimanale``,
+``ListaSpesa`` and ``HtmlStructure`` answers, configurable latency, token
+counts and error rates, so the full generation pipeline can be load tested
+offline. Point the BAML clients at it with ``OPENAI_BASE_URL``.
+"""
+
+from .server import LatencyDistribution, MockConfig, create_app
+
+__all__ = [
+    "LatencyDistribution",
+    "MockConfig",
+    "create_app",
+]
@@ -0,0 +1,62 @@
+"""
+Run the mock LLM server.
+
+Usage (from the ``api_diet`` directory):
+
+    python -m mock_llm --port 8100 --latency lognormal:2,0.4 --latency-diet lognormal:25,0.3 \
+        --error-rate 0.01 --seed 42
+
+    OPENAI_BASE_URL=http://localhost:8100/v1 MY_OPENAI_KEY=mock uvicorn app.main:app
+"""
+
+import argparse
+import logging
+
+import uvicorn
+
+from mock_llm.generators import KIND_DIET, KIND_GROCERY, KIND_RECIPE
+from mock_llm.server import LatencyDistribution, MockConfig, create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--latency",
+        default="fixed:0",
+        help="Default delay: fixed:S, uniform:LOW,HIGH, normal:MEAN,STD or lognormal:MEDIAN,SIGMA (seconds)",
+    )
+    parser.add_argument("--latency-diet", help="Delay for GeneraDietaSettimanale")
+    parser.add_argument("--latency-grocery", help="Delay for GeneraListaSpesa")
+    parser.add_argument("--latency-recipe", help="Delay for GeneraRicetta")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Fraction of unparseable answers")
+    parser.add_argument("--prompt-tokens", type=int, help="Fixed prompt token count (default: estimated)")
+    parser.add_argument("--completion-tokens", type=int, help="Fixed completion token count (default: estimated)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    latency = {}
+    for kind, spec in ((KIND_DIET, args.latency_diet), (KIND_GROCERY, args.latency_grocery), (KIND_RECIPE, args.latency_recipe)):
+        if spec:
+            latency[kind] = LatencyDistribution.parse(spec)
+
+    config = MockConfig(
+        latency=latency,
+        default_latency=LatencyDistribution.parse(args.latency),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        invalid_rate=args.invalid_rate,
+        prompt_tokens=args.prompt_tokens,
+        completion_tokens=args.completion_tokens,
+        seed=args.seed,
+    )
+
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Schema-valid responses for the BAML functions of ``baml_src/diet.baml``.
+
+The function is recognized from the rendered prompt (BAML's output format
+block names the fields of the return type). Content is generated from a
+random generator seeded by the caller, so identical requests produce
+identical answers.
+"""
+
+import re
+from datetime import date, timedelta
+from random import Random
+from typing import Any, Dict, List, Tuple
+
+KIND_DIET = "diet"
+KIND_GROCERY = "grocery"
+KIND_RECIPE = "recipe"
+
+MEALS_PER_DAY = ("colazione", "spuntino", "pranzo", "spuntino", "cena")
+MEAL_TIMES = {"colazione": "08:00", "pranzo": "13:00", "cena": "20:00"}
+SNACK_TIMES = ("10:30", "16:30")
+
+INGREDIENTS: Dict[str, List[Tuple[str, str, int, int]]] = {
+    # (name, unit, min quantity, max quantity)
+    "colazione": [
+        ("Yogurt greco", "g", 125, 250),
+        ("Fiocchi d'avena", "g", 30, 60),
+        ("Latte parzialmente scremato", "ml", 150, 250),
+        ("Frutti di bosco", "g", 50, 120),
+        ("Miele", "g", 5, 15),
+        ("Pane integrale", "g", 40, 80),
+        ("Uova", "pezzi", 1, 2),
+    ],
+    "spuntino": [
+        ("Mela", "pezzi", 1, 1),
+        ("Mandorle", "g", 15, 30),
+        ("Banana", "pezzi", 1, 1),
+        ("Yogurt bianco", "g", 125, 125),
+        ("Gallette di riso", "pezzi", 2, 4),
+    ],
+    "pranzo": [
+        ("Pasta integrale", "g", 70, 100),
+        ("Riso basmati", "g", 70, 100),
+        ("Petto di pollo", "g", 120, 180),
+        ("Tonno al naturale", "g", 80, 120),
+        ("Ceci", "g", 60, 100),
+        ("Zucchine", "g", 150, 250),
+        ("Pomodorini", "g", 100, 200),
+        ("Olio extravergine d'oliva", "ml", 10, 15),
+    ],
+    "cena": [
+        ("Salmone", "g", 120, 180),
+        ("Merluzzo", "g", 150, 200),
+        ("Tacchino", "g", 120, 160),
+        ("Lenticchie", "g", 60, 90),
+        ("Spinaci", "g", 150, 250),
+        ("Broccoli", "g", 150, 250),
+        ("Patate", "g", 150, 250),
+        ("Olio extravergine d'oliva", "ml", 10, 15),
+    ],
+}
+
+DISHES = {
+    "colazione": ["Porridge ai frutti di bosco", "Yogurt con avena e miele", "Toast integrale con uova"],
+    "spuntino": ["Frutta e frutta secca", "Yogurt e gallette", "Spuntino energetico"],
+    "pranzo": ["Pasta con zucchine e pomodorini", "Insalata di riso al tonno", "Bowl di ceci e pollo"],
+    "cena": ["Salmone al forno con verdure", "Merluzzo in padella con spinaci", "Tacchino con patate"],
+}
+
+GROCERY_LINE = re.compile(r"^\s*-\s*(?P<name>.+?):\s*(?P<quantity>[\d.]+)\s*(?P<unit>\S+)\s*$")
+START_DATE_LINE = re.compile(r"Data inizio:\s*(\d{4}-\d{2}-\d{2})")
+RECIPE_LINE = re.compile(r"Nome ricetta:\s*(.+)")
+
+
+def detect_kind(prompt: str) -> str:
+    """BAML function behind a rendered prompt, from the fields its output format names"""
+    if re.search(r"\bh1\b", prompt):
+        return KIND_RECIPE
+    if "dataFine" in prompt:
+        return KIND_DIET
+    return KIND_GROCERY
+
+
+def _meal(rng: Random, meal_type: str, time: str) -> Dict[str, Any]:
+    choices = rng.sample(INGREDIENTS[meal_type], k=min(len(INGREDIENTS[meal_type]), rng.randint(2, 4)))
+    ingredients = [
+        {"nome": name, "quantita": float(rng.randint(low, high)), "unita": unit}
+        for name, unit, low, high in choices
+    ]
+    dish = rng.choice(DISHES[meal_type])
+    return {
+        "tipoPasto": {
+            "tipo": meal_type,
+            "orario": time,
+            "ricetta": f"{dish}: " + ", ".join(i["nome"].lower() for i in ingredients) + ".",
+        },
+        "ingredienti": ingredients,
+        "calorie": rng.randint(150, 300) if meal_type == "spuntino" else rng.randint(350, 750),
+    }
+
+
+def weekly_diet(rng: Random, prompt: str) -> Dict[str, Any]:
+    """A ``DietaSettimanale`` with five meals per day for seven days"""
+    match = START_DATE_LINE.search(prompt)
+    start = date.fromisoformat(match.group(1)) if match else date.today()
+
+    meals = []
+    for _ in range(7):
+        snacks = iter(SNACK_TIMES)
+        for meal_type in MEALS_PER_DAY:
+            time = next(snacks) if meal_type == "spuntino" else MEAL_TIMES[meal_type]
+            meals.append(_meal(rng, meal_type, time))
+
+    return {
+        "nome": f"Piano settimanale dal {start.isoformat()}",
+        "dataInizio": start.isoformat(),
+        "dataFine": (start + timedelta(days=6)).isoformat(),
+        "pasti": meals,
+    }
+
+
+def grocery_list(rng: Random, prompt: str) -> Dict[str, Any]:
+    """A ``ListaSpesa`` aggregating the ingredient lines of the prompt"""
+    totals: Dict[Tuple[str, str], float] = {}
+    for line in prompt.splitlines():
+        match = GROCERY_LINE.match(line)
+        if match:
+            key = (match.group("name"), match.group("unit"))
+            totals[key] = totals.get(key, 0.0) + float(match.group("quantity"))
+
+    if not totals:
+        for name, unit, low, high in rng.sample(INGREDIENTS["pranzo"], k=4):
+            totals[(name, unit)] = float(rng.randint(low, high) * 7)
+
+    return {
+        "ingredienti": [
+            {"nome": name, "quantita": round(quantity, 1), "unita": unit}
+            for (name, unit), quantity in sorted(totals.items())
+        ]
+    }
+
+
+def recipe(rng: Random, prompt: str) -> Dict[str, Any]:
+    """An ``HtmlStructure`` recipe for the meal in the prompt"""
+    match = RECIPE_LINE.search(prompt)
+    title = match.group(1).strip() if match else rng.choice(DISHES["pranzo"])
+    ingredients = [
+        f"{m.group('name')}: {m.group('quantity')} {m.group('unit')}"
+        for m in map(GROCERY_LINE.match, prompt.splitlines())
+        if m
+    ]
+    return {
+        "h1": title,
+        "h2": ["Ingredienti", "Preparazione", "Consigli"],
+        "p": [
+            f"Tempo di preparazione: {rng.randint(5, 20)} minuti. Cottura: {rng.randint(0, 30)} minuti.",
+            "Una ricetta semplice ed equilibrata, adatta anche ai principianti.",
+        ],
+        "ul": ingredients or ["Ingredienti del pasto"],
+        "ol": [
+            "Prepara e pesa tutti gli ingredienti.",
+            "Cuoci gli ingredienti principali secondo il metodo indicato.",
+            "Unisci il tutto, regola di sale e servi.",
+        ],
+    }
+
+
+GENERATORS = {KIND_DIET: weekly_diet, KIND_GROCERY: grocery_list, KIND_RECIPE: recipe}
@@ -0,0 +1,150 @@
+"""OpenAI-compatible chat completions endpoint returning generated BAML outputs"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from random import Random
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from mock_llm.generators import GENERATORS, detect_kind
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """Response delay in seconds: ``fixed:S``, ``uniform:LOW,HIGH``, ``normal:MEAN,STD`` or ``lognormal:MEDIAN,SIGMA``"""
+
+    kind: str
+    params: tuple
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, raw = spec.partition(":")
+        params = tuple(float(value) for value in raw.split(",") if value.strip())
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency distribution: {spec!r}")
+        return cls(kind, params)
+
+    def sample(self, rng: Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(median), sigma)
+        return max(0.0, value)
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server"""
+
+    latency: Dict[str, LatencyDistribution] = field(default_factory=dict)
+    default_latency: LatencyDistribution = LatencyDistribution("fixed", (0.0,))
+    error_rate: float = 0.0  # 500 responses
+    rate_limit_rate: float = 0.0  # 429 responses
+    invalid_rate: float = 0.0  # 200 responses whose content does not parse
+    prompt_tokens: Optional[int] = None  # Fixed counts; estimated from text length when unset
+    completion_tokens: Optional[int] = None
+    seed: int = 0
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content if isinstance(part, dict))
+    return "\n".join(parts)
+
+
+def _error(status_code: int, message: str, error_type: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "param": None, "code": None}},
+    )
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    """Build the mock server application"""
+    app = FastAPI(title="Mock LLM", docs_url=None, redoc_url=None)
+    # Latency and failures come from one sequence so a run is reproducible for a given seed
+    chaos = Random(config.seed)
+    stats: Dict[str, int] = {"requests": 0, "errors": 0}
+
+    @app.get("/health")
+    async def health() -> Dict[str, Any]:
+        return {"status": "ok", **stats}
+
+    @app.get("/v1/models")
+    async def models() -> Dict[str, Any]:
+        return {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock-llm"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        if body.get("stream"):
+            return _error(400, "Streaming is not supported by the mock server", "invalid_request_error")
+
+        prompt = _prompt_text(body.get("messages", []))
+        kind = detect_kind(prompt)
+        await asyncio.sleep(config.latency.get(kind, config.default_latency).sample(chaos))
+
+        roll = chaos.random()
+        if roll < config.error_rate:
+            stats["errors"] += 1
+            return _error(500, "Simulated upstream failure", "server_error")
+        if roll < config.error_rate + config.rate_limit_rate:
+            stats["errors"] += 1
+            return _error(429, "Simulated rate limit", "rate_limit_exceeded")
+
+        # Same prompt, same answer
+        digest = hashlib.sha256(f"{config.seed}:{prompt}".encode()).digest()
+        content_rng = Random(int.from_bytes(digest[:8], "big"))
+        if roll < config.error_rate + config.rate_limit_rate + config.invalid_rate:
+            content = "Mi dispiace, non posso generare questa risposta."
+        else:
+            content = json.dumps(GENERATORS[kind](content_rng, prompt), ensure_ascii=False)
+
+        prompt_tokens = config.prompt_tokens or _estimate_tokens(prompt)
+        completion_tokens = config.completion_tokens or _estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
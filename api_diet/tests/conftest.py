@@ -0,0 +1,168 @@
+"""
+Shared fixtures for the API tests.
+
+Tests run against ``TEST_DATABASE_URL`` (a disposable PostgreSQL database)
+when it is set, and against an in-memory SQLite database otherwise. Either
+way the tables are created once per session and emptied after each test.
+On SQLite, the Postgres advisory-lock functions always grant the lock,
+which is what Postgres does for a single client.
+"""
+
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import date, timedelta
+from random import Random
+from typing import Any, Callable, ContextManager, Iterator, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import database_manager, with_driver
+from app.config import settings
+from app.main import app
+from app.models.base import Base
+from app.observability.query_budget import QueryCounter, count_queries
+from app.repositories import UserRepository, UserSettingsRepository
+from app.services import DietService
+from baml_client.types import DietaSettimanale, ListaSpesa
+from mock_llm.generators import grocery_list, weekly_diet
+
+
+def _create_test_engine() -> Engine:
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url:
+        return create_engine(with_driver(url, settings.database_driver))
+    # One shared connection, so every session and thread sees the same in-memory database
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def add_postgres_functions(dbapi_connection, connection_record) -> None:
+        dbapi_connection.create_function("hashtext", 1, lambda key: hash(key) & 0x7FFFFFFF)
+        dbapi_connection.create_function("pg_try_advisory_xact_lock", 2, lambda namespace, key: 1)
+
+    return engine
+
+
+def _grocery_prompt(pasti: list) -> str:
+    """The ingredient lines ``GeneraListaSpesa`` renders for the meals"""
+    return "\n".join(
+        f"- {item['nome']}: {item['quantita']} {item['unita']}" for pasto in pasti for item in pasto["ingredienti"]
+    )
+
+
+@pytest.fixture(scope="session")
+def engine() -> Iterator[Engine]:
+    """The database the app's sessions use during the tests"""
+    engine = _create_test_engine()
+    Base.metadata.create_all(engine)
+
+    database_manager._engine = engine
+    database_manager._create_session_factory()
+    database_manager._is_initialized = True
+    try:
+        yield engine
+    finally:
+        database_manager._cleanup_resources()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_tables(engine: Engine) -> Iterator[None]:
+    yield
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    database_manager.read_your_writes._sticky_until.clear()
+
+
+@pytest.fixture
+def client(engine: Engine) -> TestClient:
+    """Client of the app without its lifespan, so no background tasks run"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def user_id(engine: Engine) -> str:
+    """A user with settings"""
+    user_id = str(uuid.uuid4())
+    with Session(engine) as session:
+        UserRepository(session).create_user(user_id, f"{user_id}@test.local")
+        UserSettingsRepository(session).create_user_settings(
+            str(uuid.uuid4()), user_id, weight=70.0, height=175.0, goals="Mantenimento"
+        )
+        session.commit()
+    return user_id
+
+
+@pytest.fixture
+def make_diet(engine: Engine, user_id: str) -> Callable[..., str]:
+    """Factory of generated diets for the current week, saved the way ``DietService.create_diet`` saves them"""
+
+    def make(seed: int = 0) -> str:
+        rng = Random(seed)
+        monday = date.today() - timedelta(days=date.today().weekday())
+        diet = weekly_diet(rng, f"Data inizio: {monday.isoformat()}")
+        grocery = grocery_list(rng, _grocery_prompt(diet["pasti"]))
+
+        with Session(engine) as session:
+            diet_id = DietService(session)._save_diet(
+                user_id, DietaSettimanale.model_validate(diet), ListaSpesa.model_validate(grocery)
+            )
+            session.commit()
+        return diet_id
+
+    return make
+
+
+@pytest.fixture
+def diet_id(make_diet: Callable[..., str]) -> str:
+    """A generated diet for the current week"""
+    return make_diet()
+
+
+@pytest.fixture
+def fake_llm(monkeypatch) -> None:
+    """Answer the diet service's BAML calls with the mock LLM's generators instead of an LLM"""
+
+    async def call_baml(function_name: str, *, user_id: Optional[str] = None, **arguments: Any) -> Any:
+        rng = Random(0)
+        if function_name == "GeneraDietaSettimanale":
+            return DietaSettimanale.model_validate(weekly_diet(rng, f"Data inizio: {arguments['dataInizio']}"))
+        if function_name == "GeneraListaSpesa":
+            pasti = [pasto.model_dump() for pasto in arguments["pasti"]]
+            return ListaSpesa.model_validate(grocery_list(rng, _grocery_prompt(pasti)))
+        raise AssertionError(f"Unexpected BAML call {function_name}")
+
+    monkeypatch.setattr("app.services.diet_service.call_baml", call_baml)
+
+
+@pytest.fixture
+def query_budget(engine: Engine) -> Callable[..., ContextManager[QueryCounter]]:
+    """
+    Factory of blocks failing the test when they run more than ``max_queries`` statements.
+
+    The failure lists the most repeated statement fingerprints, which points
+    at N+1 loops such as a query per ingredient. ``SET`` statements (the
+    per-transaction statement timeout on Postgres) are not counted, so a
+    budget holds on both databases.
+    """
+
+    @contextmanager
+    def budget(max_queries: int, target: Optional[Engine] = None) -> Iterator[QueryCounter]:
+        with count_queries(target or engine) as counter:
+            yield counter
+
+        count = sum(n for statement, n in counter.statements.items() if not statement.upper().startswith("SET "))
+        if count > max_queries:
+            pytest.fail(
+                f"Query budget exceeded: {count} statements executed, "
+                f"budget is {max_queries}\n{counter.describe()}",
+                pytrace=False,
+            )
+
+    return budget
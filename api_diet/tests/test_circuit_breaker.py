@@ -0,0 +1,31 @@
+"""Responses of LLM calls rejected by an open circuit."""
+
+import pytest
+
+from app.llm.resilience import ClientResilience
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def open_circuit(monkeypatch) -> ClientResilience:
+    """Resilience state whose diet client circuit has just opened"""
+    resilience = ClientResilience(
+        failure_threshold=1,
+        reset_timeout=30.0,
+        retry_budget_ratio=0.1,
+        retry_budget_burst=10.0,
+        no_retry_clients={},
+    )
+    resilience.learn_client("GeneraDietaSettimanale", "DietModel")
+    resilience.breaker("DietModel").record_failure()
+    monkeypatch.setattr("app.llm.client.client_resilience", resilience)
+    return resilience
+
+
+def test_open_circuit_response_has_retry_after(client, open_circuit, user_id):
+    response = client.post(f"{API}/diet/create_diet", headers={"X-User-Id": user_id})
+
+    assert response.status_code == 503
+    assert response.json()["error"]["details"]["retry_after"] == 30
+    assert response.headers["Retry-After"] == "30"
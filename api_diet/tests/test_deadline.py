@@ -0,0 +1,45 @@
+"""Cancellation of requests whose client disconnected."""
+
+import asyncio
+
+from app.deadline import shield_from_disconnect
+from app.middleware.deadline import CLIENT_CLOSED_REQUEST, DeadlineMiddleware
+
+ROUTE = "POST /api/v1/diet/create_diet"
+
+
+def run_disconnected(shield: bool) -> tuple:
+    """Run a slow request whose client disconnects at once; return whether it finished and the statuses sent"""
+    finished = asyncio.Event()
+    statuses = []
+
+    async def app(scope, receive, send) -> None:
+        if shield:
+            shield_from_disconnect()
+        await asyncio.sleep(0.05)
+        finished.set()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive() -> dict:
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    async def main() -> None:
+        middleware = DeadlineMiddleware(app, route_deadlines={ROUTE: 60.0}, max_deadline=60.0)
+        scope = {"type": "http", "method": "POST", "path": "/api/v1/diet/create_diet", "headers": []}
+        await middleware(scope, receive, send)
+
+    asyncio.run(main())
+    return finished.is_set(), statuses
+
+
+def test_disconnect_cancels_request():
+    assert run_disconnected(shield=False) == (False, [CLIENT_CLOSED_REQUEST])
+
+
+def test_shielded_request_finishes_after_disconnect():
+    assert run_disconnected(shield=True) == (True, [200])
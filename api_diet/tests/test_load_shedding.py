@@ -0,0 +1,25 @@
+"""Responses of requests shed under load."""
+
+import pytest
+
+from app.observability.load import load_signals
+
+API = "/api/v1"
+
+ORIGIN = "http://localhost:4200"
+
+
+@pytest.fixture
+def overloaded(monkeypatch) -> None:
+    """LLM calls in flight far above the shedding threshold, so generation is shed"""
+    monkeypatch.setattr(load_signals, "llm_in_flight", 10_000)
+
+
+def test_shed_response_has_cors_and_security_headers(client, overloaded, user_id):
+    response = client.post(f"{API}/diet/create_diet", headers={"X-User-Id": user_id, "Origin": ORIGIN})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert response.headers["Access-Control-Allow-Origin"] == ORIGIN
+    assert "Retry-After" in response.headers["Access-Control-Expose-Headers"]
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
@@ -0,0 +1,72 @@
+"""
+SQL query budgets of the ``/api/v1`` endpoints.
+
+Each budget is the number of statements the endpoint runs today. A change
+that adds a query per row (an N+1 loop over meals or ingredients) pushes it
+over and fails with the repeated statements listed.
+"""
+
+import pytest
+
+API = "/api/v1"
+
+
+def headers(user_id: str) -> dict:
+    return {"X-User-Id": user_id}
+
+
+def first_meal_id(client, user_id: str, diet_id: str) -> str:
+    response = client.get(f"{API}/diet/{diet_id}", headers=headers(user_id))
+    return response.json()["pasti"][0]["id"]
+
+
+@pytest.mark.parametrize(
+    "path, max_queries",
+    [
+        ("/diet/list", 1),
+        ("/diet/current_week", 7),
+        ("/diet/{diet_id}", 4),
+        ("/diet/{diet_id}/grocery-list", 4),
+        ("/settings/get_user_settings", 1),
+        ("/usage/summary?group_by=function", 1),
+    ],
+)
+def test_read_endpoint_query_budget(client, query_budget, user_id, diet_id, path, max_queries):
+    with query_budget(max_queries=max_queries) as counter:
+        response = client.get(API + path.format(diet_id=diet_id), headers=headers(user_id))
+
+    assert response.status_code == 200, response.text
+    assert counter.count > 0
+
+
+def test_meal_details_query_budget(client, query_budget, user_id, diet_id):
+    meal_id = first_meal_id(client, user_id, diet_id)
+
+    with query_budget(max_queries=4):
+        response = client.get(f"{API}/meals/{meal_id}", headers=headers(user_id))
+
+    assert response.status_code == 200, response.text
+
+
+def test_diet_list_budget_does_not_grow_with_diets(client, query_budget, user_id, make_diet):
+    make_diet(seed=0)
+    with query_budget(max_queries=1) as one_diet:
+        client.get(f"{API}/diet/list", headers=headers(user_id))
+
+    make_diet(seed=1)
+
+    with query_budget(max_queries=one_diet.count) as two_diets:
+        response = client.get(f"{API}/diet/list", headers=headers(user_id))
+
+    assert len(response.json()) == 2
+    assert two_diets.count == one_diet.count
+
+
+def test_create_diet_query_budget(client, query_budget, fake_llm, user_id):
+    # Previous diet, generation lock, settings, ingredient lookup, six batched
+    # inserts for the diet and four reads returning it with its meals
+    with query_budget(max_queries=14):
+        response = client.post(f"{API}/diet/create_diet", headers=headers(user_id))
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()["dieta"]["pasti"]) > 0
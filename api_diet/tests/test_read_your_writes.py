@@ -0,0 +1,101 @@
+"""Routing of read sessions between the primary and a replica after a user's write."""
+
+from typing import Iterator, List
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+import app.dependencies
+from app.database import database_manager
+from app.dependencies import resolve_user
+from app.replicas import Replica
+
+API = "/api/v1"
+
+SETTINGS = {"weight": 72.0, "height": 175.0, "goals": "Mantenimento"}
+
+
+def read_sessions(target: str) -> float:
+    return REGISTRY.get_sample_value("db_read_sessions_total", {"target": target}) or 0.0
+
+
+@pytest.fixture
+def replica(engine: Engine) -> Iterator[Replica]:
+    """A replica on the test database, so routing is observable without a second server"""
+    replica = Replica("replica-test", engine, database_manager._create_read_session_factory(engine))
+    database_manager._replicas.add(replica)
+    try:
+        yield replica
+    finally:
+        database_manager._replicas.replicas.remove(replica)
+
+
+@pytest.fixture
+def default_user(monkeypatch, user_id: str) -> str:
+    """The only user, which requests without an X-User-Id header act for"""
+    monkeypatch.setattr(app.dependencies, "_DEFAULT_USER_CACHE", None)
+    return user_id
+
+
+@pytest.fixture
+def primary_sessions(monkeypatch) -> List[Session]:
+    """Sessions opened on the primary through ``database_manager.get_session``"""
+    opened: List[Session] = []
+    factory = database_manager._session_factory
+
+    def open_session() -> Session:
+        session = factory()
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(database_manager, "_session_factory", open_session)
+    return opened
+
+
+def test_default_user_is_looked_up_in_one_short_session(default_user, primary_sessions):
+    assert resolve_user()["id"] == default_user
+    assert resolve_user()["id"] == default_user
+
+    assert len(primary_sessions) == 1
+
+
+@pytest.mark.parametrize("path", ["/diet/list", "/diet/current_week", "/settings/get_user_settings", "/usage/summary"])
+def test_read_opens_no_primary_session(client, user_id, primary_sessions, path):
+    response = client.get(API + path, headers={"X-User-Id": user_id})
+
+    assert response.status_code == 200, response.text
+    assert primary_sessions == []
+
+
+def test_read_goes_to_replica_without_recent_write(client, replica, default_user):
+    before = read_sessions("replica")
+
+    response = client.get(f"{API}/settings/get_user_settings")
+
+    assert response.status_code == 200, response.text
+    assert read_sessions("replica") == before + 1
+
+
+def test_read_after_write_without_header_goes_to_primary(client, replica, default_user):
+    response = client.post(f"{API}/settings/update_user_settings", json=SETTINGS)
+    assert response.status_code == 200, response.text
+
+    before = read_sessions("primary_sticky")
+    response = client.get(f"{API}/settings/get_user_settings")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["weight"] == SETTINGS["weight"]
+    assert read_sessions("primary_sticky") == before + 1
+
+
+def test_read_after_write_with_header_goes_to_primary(client, replica, user_id):
+    headers = {"X-User-Id": user_id}
+    response = client.post(f"{API}/settings/update_user_settings", json=SETTINGS, headers=headers)
+    assert response.status_code == 200, response.text
+
+    before = read_sessions("primary_sticky")
+    client.get(f"{API}/settings/get_user_settings", headers=headers)
+
+    assert read_sessions("primary_sticky") == before + 1
@@ -0,0 +1,19 @@
+"""Replay of recorded BAML calls."""
+
+import asyncio
+
+from app.llm.replay import MODE_RECORD, MODE_REPLAY, ReplayStore
+from baml_client.types import DietaSettimanale
+
+ARGUMENTS = {"peso": 70.0, "altezza": 175.0, "obiettivo": "Mantenimento", "altri_dati": ""}
+
+
+def test_replayed_diet_starts_on_requested_date(tmp_path):
+    recorded = DietaSettimanale(nome="Dieta", dataInizio="2026-01-05", dataFine="2026-01-11", pasti=[])
+    recorder = ReplayStore(MODE_RECORD, str(tmp_path), latency_scale=0.0)
+    asyncio.run(recorder.record("GeneraDietaSettimanale", {**ARGUMENTS, "dataInizio": "2026-01-05"}, recorded, 0.1))
+
+    replayer = ReplayStore(MODE_REPLAY, str(tmp_path), latency_scale=0.0)
+    diet = asyncio.run(replayer.replay("GeneraDietaSettimanale", {**ARGUMENTS, "dataInizio": "2026-03-02"}))
+
+    assert (diet.dataInizio, diet.dataFine) == ("2026-03-02", "2026-03-08")
@@ -0,0 +1,29 @@
+"""Route template labels of the request metrics."""
+
+import pytest
+from prometheus_client import REGISTRY
+
+API = "/api/v1"
+
+
+def requests_counted(route: str, status: str) -> float:
+    labels = {"method": "GET", "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0.0
+
+
+@pytest.mark.parametrize(
+    "path, route",
+    [
+        # Parameter values equal to a literal segment of the path
+        ("/diet/diet", "/diet/{diet_id}"),
+        ("/meals/meals", "/meals/{meal_id}"),
+        ("/diet/list/grocery-list", "/diet/{diet_id}/grocery-list"),
+    ],
+)
+def test_route_label_is_the_template(client, user_id, path, route):
+    before = requests_counted(API + route, "404")
+
+    response = client.get(API + path, headers={"X-User-Id": user_id})
+
+    assert response.status_code == 404
+    assert requests_counted(API + route, "404") == before + 1
@@ -0,0 +1,43 @@
+"""Staleness of the snapshots served by ``/health/deep`` and ``/fly/system``."""
+
+import asyncio
+import time
+from dataclasses import replace
+
+import pytest
+
+from app.observability import system
+from app.observability.system import SystemSampler, collect_snapshot
+
+
+@pytest.fixture
+def stale_sampler(monkeypatch, engine) -> SystemSampler:
+    """The app's sampler holding a snapshot older than its staleness limit, with sampling running"""
+    sampler = system.system_sampler
+    old = replace(collect_snapshot(), timestamp=time.time() - sampler.stale_after - 1)
+    monkeypatch.setattr(sampler, "_snapshot", old)
+    monkeypatch.setattr(sampler, "_task", object())
+    return sampler
+
+
+def test_stale_snapshot_fails_deep_health(client, stale_sampler):
+    response = client.get("/health/deep")
+
+    assert response.status_code == 503
+    assert response.json()["checks"]["snapshot"]["status"] == "stale"
+
+
+def test_stale_snapshot_is_flagged_in_fly_system(client, stale_sampler):
+    response = client.get("/fly/system")
+
+    assert response.status_code == 200
+    assert response.json()["stale"] is True
+
+
+def test_stale_snapshot_is_recollected_when_not_sampling(engine):
+    sampler = SystemSampler(interval=5.0)
+    sampler._snapshot = replace(collect_snapshot(), timestamp=time.time() - sampler.stale_after - 1)
+
+    snapshot = asyncio.run(sampler.get())
+
+    assert not sampler.is_stale(snapshot)